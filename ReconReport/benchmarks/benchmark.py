@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Banc d'essai de Recon Report avec des outils factices
+
+Lance reconReport.py sur 1, 10, 100 puis 1000 cibles fictives, avec les
+nmap, sslscan, whatweb et amass factices de fakebin/ en tête du PATH
+(latence et volume de sortie réglables, aucun accès réseau). Chaque taille
+est mesurée deux fois : cache vide (froid) puis cache rempli par la première
+passe (cache). Pour chaque passe : débit, percentiles de la durée par cible,
+mémoire maximale du scanner, nombre maximal de threads et de processus
+enfants simultanés.
+
+Avec --baseline, les résultats sont comparés à une mesure enregistrée
+(--json) et le script échoue si le débit baisse ou si la latence p90
+augmente au-delà de --tolerance.
+
+Usage : ./benchmark.py [--sizes 1,10,100] [--latency 0.05] [--json resultats.json] [-- options de reconReport.py]
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(os.path.dirname(HERE), "reconReport.py")
+FAKEBIN = os.path.join(HERE, "fakebin")
+
+SIZES = "1,10,100,1000"
+SAMPLE_INTERVAL = 0.05  # Intervalle de relevé des threads et processus (secondes)
+MIN_DELTA = 0.1  # Écart (secondes) en deçà duquel une différence est du bruit de mesure
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche (0 si values est vide)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def descendants(pid):
+    """Nombre de processus descendants de pid (lus dans /proc)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'rb') as f:
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    count = 0
+    pending = [pid]
+    while pending:
+        found = children.get(pending.pop(), [])
+        count += len(found)
+        pending.extend(found)
+    return count
+
+def thread_count(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+class Sampler(threading.Thread):
+    """Relevé périodique des threads et processus enfants du scanner"""
+    
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.max_threads = 0
+        self.max_processes = 0
+        self.stopped = threading.Event()
+    
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            self.max_threads = max(self.max_threads, thread_count(self.pid))
+            self.max_processes = max(self.max_processes, descendants(self.pid))
+
+def run_pass(size, targets_path, workdir, env, extra_args):
+    """Une exécution de reconReport.py sur le fichier de cibles
+
+    Returns:
+        dict: mesures de la passe
+    """
+    results_path = os.path.join(workdir, f"resultats_{size}.jsonl")
+    if os.path.exists(results_path):
+        os.unlink(results_path)
+    command = [sys.executable, SCRIPT, "-iL", targets_path, "-o", "terminal", "--no-banner",
+               "--no-checkpoint", "--progress", "plain", "--progress-file", os.path.join(workdir, "progress.log"),
+               "--jsonl", results_path, *extra_args]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, cwd=workdir, stdin=subprocess.DEVNULL,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    sampler = Sampler(process.pid)
+    sampler.start()
+    stderr = process.stderr.read()
+    # wait4 : la mémoire maximale du scanner lui-même (ru_maxrss)
+    _, status, usage = os.wait4(process.pid, 0)
+    duration = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    sampler.stopped.set()
+    sampler.join()
+    
+    durations = []
+    failures = 0
+    with open(results_path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['type'] == "target":
+                durations.append(record['duration'])
+                failures += bool(record['errors'] or record.get('partial'))
+    if len(durations) != size:
+        raise RuntimeError(f"{len(durations)} cibles terminées sur {size} (code {process.returncode})\n"
+                           f"{stderr.decode(errors='replace')[-2000:]}")
+    return {
+        'targets': size,
+        'duration': round(duration, 3),
+        'throughput': round(size / duration, 3),
+        'p50': percentile(durations, 0.50),
+        'p90': percentile(durations, 0.90),
+        'p99': percentile(durations, 0.99),
+        'max': max(durations),
+        # ru_maxrss est en Ko sous Linux
+        'peak_rss': usage.ru_maxrss * 1024,
+        'max_threads': sampler.max_threads,
+        'max_processes': sampler.max_processes,
+        'failures': failures,
+        'returncode': process.returncode,
+    }
+
+def format_size(size):
+    return f"{size / (1024 * 1024):.0f} Mo"
+
+def print_row(size, phase, result):
+    print(f"{size:>6} {phase:<6} {result['duration']:>8.2f}s {result['throughput']:>9.1f} "
+          f"{result['p50']:>6.2f}s {result['p90']:>6.2f}s {result['p99']:>6.2f}s {result['max']:>6.2f}s "
+          f"{format_size(result['peak_rss']):>8} {result['max_threads']:>7} {result['max_processes']:>9} "
+          f"{result['failures']:>6}", flush=True)
+
+def compare(results, baseline, tolerance):
+    """Régressions par rapport à une mesure de référence
+
+    Returns:
+        list: descriptions des régressions
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if result['throughput'] < reference['throughput'] * (1 - tolerance) and \
+                result['duration'] - reference['duration'] > MIN_DELTA:
+            regressions.append(f"{key} : débit {result['throughput']:.1f} cibles/s "
+                               f"(référence {reference['throughput']:.1f})")
+        if result['p90'] > reference['p90'] * (1 + tolerance) and result['p90'] - reference['p90'] > MIN_DELTA:
+            regressions.append(f"{key} : p90 {result['p90']:.2f}s (référence {reference['p90']:.2f}s)")
+    return regressions
+
+def main():
+    argv = sys.argv[1:]
+    extra_args = []
+    if "--" in argv:
+        extra_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+    parser = argparse.ArgumentParser(description="Banc d'essai de Recon Report avec des outils factices",
+                                     epilog="Les arguments après -- sont passés à reconReport.py "
+                                            "(ex: -- -w 16 --ssl-workers 8)")
+    parser.add_argument("--sizes", default=SIZES, help="Nombres de cibles mesurés (défaut : %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.05, metavar="SECONDES",
+                        help="Durée d'une exécution de chaque outil factice (défaut : %(default)s)")
+    parser.add_argument("--output-size", type=int, default=0, metavar="Ko",
+                        help="Sortie ajoutée à chaque exécution d'outil (défaut : %(default)s)")
+    parser.add_argument("--no-cache-pass", action="store_true",
+                        help="Ne pas mesurer la seconde passe servie par le cache")
+    parser.add_argument("--json", metavar="FICHIER", help="Enregistrer les résultats (référence de --baseline)")
+    parser.add_argument("--baseline", metavar="FICHIER", help="Comparer à des résultats enregistrés par --json")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Écart toléré par rapport à --baseline (défaut : %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        sizes = [int(size) for size in args.sizes.split(",")]
+    except ValueError:
+        parser.error(f"--sizes invalide : {args.sizes}")
+    
+    results = {}
+    print(f"{'CIBLES':>6} {'PASSE':<6} {'DURÉE':>9} {'CIBLES/S':>9} {'P50':>7} {'P90':>7} {'P99':>7} "
+          f"{'MAX':>7} {'RSS MAX':>8} {'THREADS':>7} {'PROCESSUS':>9} {'ÉCHECS':>6}")
+    with tempfile.TemporaryDirectory(prefix="reconreport_bench_") as workdir:
+        for size in sizes:
+            targets_path = os.path.join(workdir, f"cibles_{size}.txt")
+            with open(targets_path, 'w', encoding='utf-8') as f:
+                f.write("".join(f"host{i:04d}.bench.test\n" for i in range(size)))
+            # Cache et données propres à chaque taille : la première passe part d'un cache vide
+            env = dict(os.environ, PATH=FAKEBIN + os.pathsep + os.environ.get("PATH", ""),
+                       XDG_CACHE_HOME=os.path.join(workdir, f"cache_{size}"),
+                       XDG_DATA_HOME=os.path.join(workdir, f"data_{size}"),
+                       RECON_BENCH_LATENCY=str(args.latency), RECON_BENCH_OUTPUT=str(args.output_size * 1024))
+            phases = ["froid"] if args.no_cache_pass else ["froid", "cache"]
+            for phase in phases:
+                try:
+                    result = run_pass(size, targets_path, workdir, env, extra_args)
+                except (OSError, RuntimeError, ValueError) as e:
+                    print(f"ÉCHEC {size} cibles ({phase}) : {e}")
+                    return 1
+                results[f"{size}/{phase}"] = result
+                print_row(size, phase, result)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'latency': args.latency, 'output_size': args.output_size, 'extra_args': extra_args,
+                       'results': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            print(f"RÉGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"Aucune régression par rapport à {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Outils factices du banc d'essai : latence et volume de sortie réglables
+
+RECON_BENCH_LATENCY : durée d'une exécution en secondes (défaut : 0.05),
+RECON_BENCH_LATENCY_<OUTIL> pour un seul outil (ex: RECON_BENCH_LATENCY_NMAP).
+RECON_BENCH_OUTPUT : octets de sortie ajoutés à chaque exécution (défaut : 0).
+Aucun outil ne touche au réseau : les noms sont associés à une adresse de
+127.0.0.0/8 calculée à partir du nom.
+"""
+import os
+import sys
+import time
+import zlib
+import ipaddress
+
+def latency(tool):
+    return float(os.environ.get(f"RECON_BENCH_LATENCY_{tool.upper()}", os.environ.get("RECON_BENCH_LATENCY", "0.05")))
+
+def output_size():
+    return int(os.environ.get("RECON_BENCH_OUTPUT", "0"))
+
+def address(name):
+    """Adresse de bouclage stable pour un nom (le nom lui-même si c'est une adresse)"""
+    try:
+        return str(ipaddress.ip_address(name))
+    except ValueError:
+        value = zlib.crc32(name.encode()) & 0xffffff
+        return f"127.{value >> 16 & 0xff}.{value >> 8 & 0xff}.{max(1, value & 0xff)}"
+
+def write(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+def pad(make_line):
+    """Ajouter RECON_BENCH_OUTPUT octets de lignes make_line(i) à la sortie"""
+    size = output_size()
+    written = 0
+    lines = []
+    i = 0
+    while written < size:
+        line = make_line(i) + "\n"
+        lines.append(line)
+        written += len(line)
+        i += 1
+    if lines:
+        write("".join(lines))
+
+def sleep(tool, fraction=1.0):
+    time.sleep(latency(tool) * fraction)
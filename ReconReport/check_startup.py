@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Vérification du temps de démarrage de Recon Report
+
+Mesure reconReport.py --help et un scan entièrement servi par le cache
+(étape nmap sur 127.0.0.1, cache préparé dans un répertoire temporaire, aucun
+outil dans le PATH), et échoue si l'un dépasse son budget ou charge un module
+qui n'est pas nécessaire à ce qu'il fait.
+
+Usage : ./check_startup.py [--runs N]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "reconReport.py")
+
+HELP_BUDGET = 0.3  # Secondes
+CACHE_HIT_BUDGET = 1.5  # Secondes
+# Modules que --help ne doit pas charger
+HELP_FORBIDDEN = ["asyncio", "sqlite3", "ssl", "tempfile", "concurrent.futures", "xml.etree.ElementTree",
+                  "simple_term_menu", "reconreport.scanner"]
+# Modules qu'un scan servi par le cache ne doit pas charger
+CACHE_HIT_FORBIDDEN = ["xml.etree.ElementTree", "simple_term_menu"]
+
+def timed_run(args, runs, env=None, cwd=None):
+    """Meilleure durée de runs exécutions, et modules importés par la dernière
+
+    Returns:
+        tuple: (secondes, set des modules, CompletedProcess de la dernière exécution)
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", SCRIPT, *args], env=env, cwd=cwd,
+                                 stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    modules = {line.rsplit("|", 1)[1].strip() for line in process.stderr.splitlines()
+               if line.startswith("import time:") and "|" in line}
+    return best, modules, process
+
+def check(name, duration, budget, modules, forbidden):
+    """Afficher le résultat d'une mesure
+
+    Returns:
+        bool: True si la durée et les modules chargés sont conformes
+    """
+    loaded = [module for module in forbidden if module in modules]
+    ok = duration <= budget and not loaded
+    print(f"{'OK ' if ok else 'ÉCHEC'} {name} : {duration * 1000:.0f} ms (budget {budget * 1000:.0f} ms)"
+          + (f", modules chargés inutilement : {', '.join(loaded)}" if loaded else ""))
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérification du temps de démarrage de Recon Report")
+    parser.add_argument("--runs", type=int, default=3, help="Mesures par cas, la meilleure est gardée "
+                                                            "(défaut : %(default)s)")
+    args = parser.parse_args()
+    ok = True
+    
+    duration, modules, process = timed_run(["--help"], args.runs)
+    ok &= process.returncode == 0 and check("--help", duration, HELP_BUDGET, modules, HELP_FORBIDDEN)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.path.insert(0, HERE)
+        from reconreport import ResultCache
+        
+        cache_path = os.path.join(tmp, "cache", "reconreport", "cache.sqlite")
+        cache = ResultCache(path=cache_path)
+        cache.put("nmap", ["-sV"], "127.0.0.1", {"127.0.0.1": {"hostname": [], "ports": []}})
+        cache.close()
+        os.makedirs(os.path.join(tmp, "bin"))
+        # PATH sans outils : un échec de cache ferait échouer le scan au lieu de lancer nmap
+        env = dict(os.environ, PATH=os.path.join(tmp, "bin"), XDG_CACHE_HOME=os.path.join(tmp, "cache"),
+                   XDG_DATA_HOME=os.path.join(tmp, "data"))
+        duration, modules, process = timed_run(["127.0.0.1", "--output", "terminal", "--no-banner",
+                                                "--no-checkpoint", "--progress", "plain", "--stages", "nmap"],
+                                               args.runs, env=env, cwd=tmp)
+        if process.returncode != 0:
+            print(f"ÉCHEC scan en cache : code de sortie {process.returncode}\n{process.stdout}")
+            ok = False
+        else:
+            ok &= check("scan en cache", duration, CACHE_HIT_BUDGET, modules, CACHE_HIT_FORBIDDEN)
+    
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -62,7 +62,7 @@ if [ -f "requirements.txt" ]; then
     print_success "Dépendances Python installées"
 else
     print_warning "requirements.txt non trouvé, installation manuelle..."
-    pip3 install python-nmap nmap3 simple-term-menu --user
+    pip3 install simple-term-menu --user
 fi
 
 # Détection du système d'exploitation
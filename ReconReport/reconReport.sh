@@ -4,6 +4,7 @@
 # reconReport                                                                    #
 # Utilisation: Script d'automatisation de l'étape de reconnaissance d'un pentest #
 # Usage: ./reconReport <target> OU ./reconReport -i (Mode interactif)            #
+#        ./reconReport -l <fichier> [-p N] (Mode batch)                          #
 # Auteur: David LM <lemeurdav@gmail.com>                                         #
 # Version: V0.2                                                                  #
 # Licence: GPL                                                                   #
@@ -43,11 +44,15 @@ Options :
   -f, --file             Exporter la sortie dans un fichier au format Hote_date_heure.txt
   -t, --terminal         Afficher la sortie dans le terminal
   -i, --interactif       Exécution du script en mode interactif
+  -l, --liste <fichier>  Scanner toutes les cibles du fichier ("-" pour l'entrée standard),
+                         un rapport Hote_date_heure.txt par cible
+  -p, --parallele <N>    Nombre de cibles scannées en parallèle avec -l (défaut : 4)
 
 Exemples:
   $0 -f 8.8.8.8
   $0 -t example.com
   $0 -i
+  $0 -p 8 -l cibles.txt
 
 EOF
     exit 0
@@ -117,6 +122,58 @@ function validate_target() {
     return 0
 }
 
+# Ports TLS courants testés avant sslscan
+readonly TLS_PORTS="443,465,636,853,989,990,992,993,995,2083,2087,3269,4443,5061,5986,6443,8443,9443"
+# Nombre de sslscan simultanés
+readonly SSL_WORKERS=4
+# Ports web courants passés à whatweb (avec les services http détectés sur TLS_PORTS)
+readonly WEB_PORTS="80,81,591,3000,5000,8000,8008,8080,8081,8888,9000"
+
+function tls_fingerprint() {
+    # Empreinte SHA-256 du certificat présenté (vide si openssl est absent ou la négociation échoue)
+    command -v openssl &>/dev/null || return 0
+    echo | timeout 5 openssl s_client -connect "$1:$2" -servername "$1" 2>/dev/null | \
+        openssl x509 -noout -fingerprint -sha256 2>/dev/null | cut -d= -f2 || true
+}
+
+function scan_tls_ports() {
+    local target="$1"
+    local sslscan_opts="$2"
+    shift 2
+    local -A seen=()
+    local -a outputs=()
+    local port fingerprint output tmpdir
+    tmpdir=$(mktemp -d)
+    
+    # Un sslscan par certificat distinct, au plus SSL_WORKERS en parallèle
+    for port in "$@"; do
+        output="$tmpdir/$port.txt"
+        outputs+=("$output")
+        fingerprint=$(tls_fingerprint "$target" "$port")
+        if [ -n "$fingerprint" ] && [ -n "${seen[$fingerprint]:-}" ]; then
+            echo "Certificat identique à celui du port ${seen[$fingerprint]} : pas de nouvel sslscan" > "$output"
+            continue
+        fi
+        [ -n "$fingerprint" ] && seen["$fingerprint"]="$port"
+        while [ "$(jobs -rp | wc -l)" -ge "$SSL_WORKERS" ]; do
+            wait -n || true
+        done
+        {
+            [ -n "$fingerprint" ] && echo "Empreinte du certificat (SHA-256) : $fingerprint"
+            sslscan $sslscan_opts "$target:$port" 2>/dev/null || log_warning "Échec de sslscan ($port)"
+        } > "$output" &
+    done
+    wait || true
+    
+    # Restitution dans l'ordre des ports
+    for output in "${outputs[@]}"; do
+        port=$(basename "$output" .txt)
+        echo -e "\n### SSLSCAN (port $port) ###\n"
+        cat "$output"
+    done
+    rm -rf "$tmpdir"
+}
+
 function scanreport() {
     local target="$1"
     local no_color="${2:-}"
@@ -128,10 +185,16 @@ function scanreport() {
     
     log_info "Démarrage du scan de : $target"
     
-    # Scan du port 443
-    log_info "Vérification du port SSL (443)..."
-    local nmap_result
-    nmap_result=$(nmap -p 443 -T3 "$target" 2>/dev/null | grep "443/tcp" | awk '{print $2}')
+    # Détection des services TLS (tunnel ssl ou service *s) et web sur les ports courants
+    log_info "Détection des services TLS et web ($TLS_PORTS,$WEB_PORTS)..."
+    local services
+    local -a tls_ports=() web_urls=()
+    services=$(nmap -sV --version-light -T3 -p "$TLS_PORTS,$WEB_PORTS" -oG - "$target" 2>/dev/null | \
+        grep -o '[0-9]*/open/tcp//[^/]*' || true)
+    mapfile -t tls_ports < <(echo "$services" | \
+        grep -E '//(ssl\||https|imaps|pop3s|ldaps|smtps|ftps)' | cut -d/ -f1 || true)
+    mapfile -t web_urls < <(echo "$services" | awk -F/ -v host="$target" \
+        '$5 ~ /http/ { print ($5 ~ /^(ssl\||https)/ ? "https" : "http") "://" host ":" $1 }')
     
     # Options pour désactiver les couleurs si nécessaire
     local sslscan_opts=""
@@ -142,17 +205,24 @@ function scanreport() {
         whatweb_opts="--color=never"
     fi
     
-    # SSLSCAN (si port 443 ouvert)
-    if [ "$nmap_result" == "open" ]; then
-        echo -e "\n### SSLSCAN ###\n"
-        sslscan $sslscan_opts "$target" 2>/dev/null || log_warning "Échec de sslscan"
+    # SSLSCAN (services TLS détectés, en parallèle)
+    if [ ${#tls_ports[@]} -gt 0 ]; then
+        scan_tls_ports "$target" "$sslscan_opts" "${tls_ports[@]}"
     else
-        log_info "Service SSL absent sur cette cible (port 443 fermé/filtré)"
+        log_info "Aucun service TLS détecté sur cette cible"
     fi
     
-    # WHATWEB
+    # WHATWEB (un seul processus pour tous les services web détectés)
     echo -e "\n### WHATWEB ###\n"
-    whatweb $whatweb_opts "$target" 2>/dev/null || log_warning "Échec de whatweb"
+    if [ ${#web_urls[@]} -gt 0 ]; then
+        local url_file
+        url_file=$(mktemp)
+        printf '%s\n' "${web_urls[@]}" > "$url_file"
+        whatweb $whatweb_opts --input-file="$url_file" 2>/dev/null || log_warning "Échec de whatweb"
+        rm -f "$url_file"
+    else
+        whatweb $whatweb_opts "$target" 2>/dev/null || log_warning "Échec de whatweb"
+    fi
     
     # AMASS
     echo -e "\n### AMASS ###\n"
@@ -201,8 +271,59 @@ function interactif() {
     esac
 }
 
+function batch() {
+    local liste="$1"
+    local workers="$2"
+    local -a targets=()
+    local -A pids=()
+    local target pid status
+    local failed=0
+    
+    # Lecture des cibles (commentaires et lignes vides ignorés)
+    while IFS= read -r target || [ -n "$target" ]; do
+        target="${target%%#*}"
+        target="${target//[[:space:]]/}"
+        [ -n "$target" ] && targets+=("$target")
+    done < <(if [ "$liste" == "-" ]; then cat; else cat "$liste"; fi)
+    
+    if [ ${#targets[@]} -eq 0 ]; then
+        log_error "Aucune cible dans : $liste"
+        exit 1
+    fi
+    
+    log_info "Mode batch : ${#targets[@]} cibles, $workers en parallèle"
+    
+    # Pool borné : on attend qu'une cible se termine avant d'en lancer une autre
+    for target in "${targets[@]}"; do
+        while [ "$(jobs -rp | wc -l)" -ge "$workers" ]; do
+            wait -n || true
+        done
+        local output_file="${target}_$(date +%d%m%y-%H%M).txt"
+        scanreport "$target" "no_color" > "$output_file" 2>&1 &
+        pids["$target"]=$!
+    done
+    
+    # Résumé combiné
+    echo -e "\n### RÉSUMÉ ###\n"
+    for target in "${targets[@]}"; do
+        pid="${pids[$target]}"
+        if wait "$pid"; then
+            status="OK"
+        else
+            status="ERREUR"
+            failed=$((failed + 1))
+        fi
+        printf "%-30s %s\n" "$target" "$status"
+    done
+    
+    log_info "Scan batch terminé : $((${#targets[@]} - failed))/${#targets[@]} cibles OK"
+    [ "$failed" -eq 0 ]
+}
+
 # Programme principal
 main() {
+    local workers=4
+    
     # Vérification des dépendances
     check_dependance
     
@@ -243,6 +364,23 @@ main() {
                 interactif
                 exit 0
                 ;;
+            -p|--parallele)
+                if [[ ! "${2:-}" =~ ^[1-9][0-9]*$ ]]; then
+                    log_error "Option -p requiert un nombre de cibles"
+                    usage
+                fi
+                workers="$2"
+                shift
+                ;;
+            -l|--liste)
+                if [ -z "${2:-}" ]; then
+                    log_error "Option -l requiert un fichier de cibles"
+                    usage
+                fi
+                banner
+                batch "$2" "$workers"
+                exit $?
+                ;;
             *)
                 log_error "Option inconnue : $1"
                 usage
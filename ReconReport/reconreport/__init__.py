@@ -0,0 +1,46 @@
+"""Recon Report : reconnaissance réseau (nmap, sslscan, whatweb, amass) sous forme de bibliothèque
+
+Exemple :
+
+    from reconreport import ReconScanner, ResultList
+
+    results = ResultList()
+    with ReconScanner(result_writers=[results]) as scanner:
+        summary = scanner.scan("example.com")
+
+Les sous-modules ne sont chargés qu'au premier accès à l'un de leurs noms :
+la ligne de commande démarre sans importer asyncio, sqlite3 ni ssl.
+"""
+import importlib
+
+# Noms exportés et sous-module qui les définit
+_EXPORTS = {
+    "ReconScanner": "scanner", "expand_targets": "scanner",
+    "parse_port_spec": "network", "DnsResolver": "network",
+    "Colors": "output", "banner": "output", "ReportSink": "output", "TerminalSink": "output",
+    "FileSink": "output", "JsonSink": "output", "MultiSink": "output", "make_report_sink": "output",
+    "ResultList": "results", "JsonLinesWriter": "results", "ResultDatabase": "results",
+    "ResultCache": "cache",
+    "ProgressTracker": "progress", "make_renderer": "progress",
+    "Stage": "pipeline", "StageScheduler": "pipeline", "create_run": "pipeline", "load_run": "pipeline",
+    "Budget": "budget",
+    "Instrumentation": "instrument",
+    "close_engine": "engine",
+    "PortRecord": "ports", "PortStore": "ports",
+    "TaskQueue": "distributed", "Worker": "distributed", "Coordinator": "distributed",
+    "STAGES": "config", "STAGE_TIMEOUTS": "config", "default_cache_path": "config",
+    "default_runs_dir": "config", "default_state_dir": "config",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,66 @@
+"""Budgets de temps : échéances de l'exécution, des cibles et des étapes"""
+import time
+
+from .output import _local
+
+class Budget:
+    """Temps imparti à une exécution, une cible ou une étape
+
+    L'échéance est la plus proche entre seconds (None = illimité) et celle du
+    budget parent : une étape ne dépasse jamais sa cible, ni une cible
+    l'exécution. Les outils interrompus faute de temps le signalent par
+    cut() ; l'étape est alors marquée partielle dans le rapport. Les échecs
+    d'outils rapportés sans lever d'exception (fail()) mettent l'étape en
+    erreur : dans les deux cas, elle n'a pas de point de reprise.
+    """
+    
+    def __init__(self, seconds=None, parent=None):
+        self.parent = parent
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        if parent is not None and parent.deadline is not None:
+            self.deadline = parent.deadline if self.deadline is None else min(self.deadline, parent.deadline)
+        self.cut_short = []  # Raisons des interruptions (outils tués, étapes écourtées)
+        self.failures = []  # Échecs d'outils rapportés par les étapes qui continuent malgré tout
+    
+    def remaining(self):
+        """Secondes restantes (None = illimité)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def timeout(self, limit=None):
+        """Délai d'une commande : limit borné par le temps restant (None = illimité)"""
+        remaining = self.remaining()
+        if remaining is None:
+            return limit
+        return remaining if limit is None else min(limit, remaining)
+    
+    def cut(self, reason):
+        self.cut_short.append(reason)
+    
+    def fail(self, reason):
+        self.failures.append(reason)
+
+def current_budget():
+    """Budget de l'étape exécutée par ce thread, ou None"""
+    return getattr(_local, "budget", None)
+
+def command_timeout(limit=None):
+    """Délai d'une commande lancée par ce thread : limit borné par le budget de l'étape"""
+    budget = current_budget()
+    return limit if budget is None else budget.timeout(limit)
+
+def cut_short(reason):
+    """Signaler que l'étape en cours a été écourtée (résultat partiel)"""
+    budget = current_budget()
+    if budget is not None:
+        budget.cut(reason)
+
+def tool_failed(reason):
+    """Signaler l'échec d'un outil dont l'étape continue (étape en erreur, sans point de reprise)"""
+    budget = current_budget()
+    if budget is not None:
+        budget.fail(reason)
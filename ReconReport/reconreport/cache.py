@@ -0,0 +1,98 @@
+"""Cache persistant (SQLite) des résultats d'outils"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+from .config import CACHE_MAX_SIZE, default_cache_path
+
+# Durée de validité par défaut des résultats en cache, par outil (secondes)
+CACHE_TTL = {
+    "nmap": 24 * 3600,
+    "amass": 24 * 3600,
+    "sslscan": 6 * 3600,
+    "whatweb": 6 * 3600,
+}
+CACHE_DEFAULT_TTL = 3600
+
+class ResultCache:
+    """Cache persistant (SQLite) des résultats d'outils
+
+    Les entrées sont adressées par le contenu de l'invocation : outil,
+    arguments normalisés et cible. Chaque outil a sa durée de validité
+    (ttl) et le cache est borné en taille : les entrées les moins récemment
+    utilisées sont évincées en premier.
+    """
+    
+    def __init__(self, path=None, ttl=None, max_size=CACHE_MAX_SIZE, refresh=False):
+        self.path = path or default_cache_path()
+        self.ttl = dict(CACHE_TTL, **(ttl or {}))
+        self.max_size = max_size
+        self.refresh = refresh  # Ignorer les entrées existantes (mais enregistrer les nouvelles)
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            tool TEXT NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            size INTEGER NOT NULL,
+            value BLOB NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._db.commit()
+    
+    @staticmethod
+    def key(tool, args, target=None):
+        """Clé d'une invocation : empreinte de (outil, arguments normalisés, cible)"""
+        normalized = [str(arg).strip() for arg in args if str(arg).strip()]
+        payload = json.dumps([tool, normalized, (target or "").strip().lower()])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, tool, args, target=None):
+        """Résultat en cache encore valide, ou None"""
+        if self.refresh:
+            return None
+        key = self.key(tool, args, target)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT created, value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            created, value = row
+            if now - created > self.ttl.get(tool, CACHE_DEFAULT_TTL):
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(zlib.decompress(value))
+    
+    def put(self, tool, args, target, value):
+        """Enregistrer un résultat (sérialisable en JSON) puis évincer si besoin"""
+        blob = zlib.compress(json.dumps(value).encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                             (self.key(tool, args, target), tool, now, now, len(blob), blob))
+            self._evict()
+            self._db.commit()
+    
+    def _evict(self):
+        """Supprimer les entrées les moins récemment utilisées au-delà de max_size"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_size:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM cache ORDER BY accessed").fetchall():
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_size:
+                break
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
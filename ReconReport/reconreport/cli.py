@@ -0,0 +1,403 @@
+"""Ligne de commande de Recon Report (reconReport.py et simpleReconReport.py)
+
+Seul config est importé au chargement : le reste du paquet (asyncio, sqlite3,
+ssl...) et le menu interactif ne sont chargés qu'une fois les arguments
+analysés, pour que --help et les erreurs d'usage répondent immédiatement.
+"""
+import os
+import sys
+import argparse
+
+from .config import (STAGES, OUTPUT_MEMORY, CACHE_MAX_SIZE, JOBS, WORKERS, SWEEP_CONCURRENCY, SWEEP_TIMEOUT,
+                     SSL_WORKERS, TLS_PROBE_TIMEOUT, WEB_BATCH_SIZE, WEB_BATCH_WAIT, FANOUT_MAX_HOSTS,
+                     DNS_CONCURRENCY, DNS_TIMEOUT, STAGE_TIMEOUTS, LEASE_TIME, TASK_ATTEMPTS, default_state_dir,
+                     default_runs_dir)
+
+def menu():
+    """Choix interactif de la sortie des rapports
+
+    Returns:
+        str: "terminal" ou "file"
+    """
+    from simple_term_menu import TerminalMenu
+    from .output import Colors
+    
+    print(f"{Colors.MAGENTA}{Colors.BOLD}=== MENU ==={Colors.RESET}")
+    options = ["Afficher la sortie dans le terminal", "Exporter les résultats dans un fichier"]
+    terminal_menu = TerminalMenu(options)
+    menu_entry_index = terminal_menu.show()
+    
+    if menu_entry_index == 0:
+        output_mode = "terminal"
+        print(f"{Colors.GREEN} Vous avez choisi d'{options[menu_entry_index]}{Colors.RESET}\n")
+    else:
+        output_mode = "file"
+        print(f"{Colors.GREEN} Vous avez choisi d'{options[menu_entry_index]}{Colors.RESET}\n")
+    return output_mode
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recon Report V1.0")
+    parser.add_argument("targets", nargs="*", metavar="target",
+                        help="Cible(s) à scanner : IP, domaine ou réseau CIDR")
+    parser.add_argument("-iL", "--input-list", metavar="FICHIER",
+                        help="Fichier de cibles, une par ligne (\"-\" pour l'entrée standard)")
+    parser.add_argument("-o", "--output", choices=["terminal", "file"],
+                        help="Sortie des rapports : terminal, ou un fichier par cible ; sans cette option, "
+                             "un menu la demande si l'entrée standard est un terminal (terminal sinon)")
+    parser.add_argument("--output-dir", metavar="DOSSIER",
+                        help="Répertoire des rapports en sortie fichier (défaut : répertoire courant)")
+    parser.add_argument("--no-banner", action="store_true",
+                        help="Ne pas afficher la bannière")
+    parser.add_argument("--stages", default=",".join(STAGES), metavar="ÉTAPES",
+                        help="Étapes à exécuter, séparées par des virgules (défaut : %(default)s)")
+    parser.add_argument("--skip", default="", metavar="ÉTAPES",
+                        help="Étapes à ne pas exécuter, séparées par des virgules (ex: amass,whatweb)")
+    parser.add_argument("-j", "--jobs", type=int, default=JOBS,
+                        help="Nombre maximal d'étapes exécutées en parallèle par cible (défaut : %(default)s)")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS,
+                        help="Nombre de cibles scannées en parallèle en mode batch (défaut : %(default)s)")
+    parser.add_argument("--timeout", type=float, metavar="SECONDES",
+                        help="Délai maximal par commande d'outil ; au-delà elle est tuée (défaut : aucun)")
+    parser.add_argument("--target-timeout", type=float, metavar="SECONDES",
+                        help="Temps maximal par cible ; au-delà les étapes restantes sont écourtées ou "
+                             "ignorées et la cible marquée partielle (défaut : aucun)")
+    parser.add_argument("--run-timeout", type=float, metavar="SECONDES",
+                        help="Temps maximal de l'exécution, toutes cibles confondues (défaut : aucun)")
+    parser.add_argument("--stage-timeout", action="append", default=[], metavar="ÉTAPE=SECONDES",
+                        help="Temps maximal d'une étape (ex: nmap=600), répétable "
+                             f"(défaut : {', '.join(f'{k}={v}' for k, v in STAGE_TIMEOUTS.items())})")
+    parser.add_argument("--max-output-memory", type=int, default=OUTPUT_MEMORY // 1024, metavar="Ko",
+                        help="Sortie d'outil gardée en mémoire avant passage sur disque (défaut : %(default)s)")
+    parser.add_argument("--diff", action="store_true",
+                        help="Re-scan incrémental et rapport des différences avec le scan précédent")
+    parser.add_argument("--state-dir", default=default_state_dir(), metavar="DOSSIER",
+                        help="Répertoire des états des scans précédents (défaut : %(default)s)")
+    parser.add_argument("--runs-dir", default=default_runs_dir(), metavar="DOSSIER",
+                        help="Répertoire des points de reprise des exécutions (défaut : %(default)s)")
+    parser.add_argument("--resume", metavar="EXECUTION",
+                        help="Reprendre une exécution interrompue (identifiant ou chemin) : les étapes "
+                             "terminées ne sont pas relancées")
+    parser.add_argument("--no-checkpoint", action="store_true",
+                        help="Ne pas enregistrer de points de reprise")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignorer les résultats en cache (les nouveaux résultats sont enregistrés)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Désactiver complètement le cache des résultats")
+    parser.add_argument("--cache-ttl", action="append", default=[], metavar="OUTIL=SECONDES",
+                        help="Durée de validité du cache pour un outil (ex: nmap=3600), répétable")
+    parser.add_argument("--cache-size", type=int, default=CACHE_MAX_SIZE // (1024 * 1024), metavar="Mo",
+                        help="Taille maximale du cache en Mo (défaut : %(default)s)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Pré-balayage TCP (connexions asyncio) avant nmap : la détection de "
+                             "versions ne porte que sur les ports ouverts trouvés")
+    parser.add_argument("--sweep-ports", default="top:1000", metavar="PORTS",
+                        help="Ports du pré-balayage : liste et plages (22,80,8000-8100) ou top:N, "
+                             "les N ports les plus courants selon nmap (défaut : %(default)s)")
+    parser.add_argument("--sweep-concurrency", type=int, default=SWEEP_CONCURRENCY, metavar="N",
+                        help="Connexions simultanées du pré-balayage (défaut : %(default)s)")
+    parser.add_argument("--sweep-timeout", type=float, default=SWEEP_TIMEOUT, metavar="SECONDES",
+                        help="Délai de connexion du pré-balayage (défaut : %(default)s)")
+    parser.add_argument("--ssl-workers", type=int, default=SSL_WORKERS, metavar="N",
+                        help="Nombre de sslscan simultanés, toutes cibles confondues (défaut : %(default)s)")
+    parser.add_argument("--tls-timeout", type=float, default=TLS_PROBE_TIMEOUT, metavar="SECONDES",
+                        help="Délai du test de négociation TLS de chaque port (défaut : %(default)s)")
+    parser.add_argument("--web-batch-size", type=int, default=WEB_BATCH_SIZE, metavar="N",
+                        help="Nombre maximal d'URLs passées à un même whatweb (défaut : %(default)s)")
+    parser.add_argument("--web-batch-wait", type=float, default=WEB_BATCH_WAIT, metavar="SECONDES",
+                        help="Attente des URLs suivantes avant de lancer un lot whatweb (défaut : %(default)s)")
+    parser.add_argument("--subdomains", type=int, default=0, metavar="PROFONDEUR",
+                        help="Scanner aussi les sous-domaines trouvés par amass, jusqu'à cette "
+                             "profondeur, en dédupliquant par adresse IP (défaut : 0, désactivé)")
+    parser.add_argument("--max-hosts", type=int, default=FANOUT_MAX_HOSTS, metavar="N",
+                        help="Nombre maximal d'hôtes ajoutés par les sous-domaines (défaut : %(default)s)")
+    parser.add_argument("--dns-concurrency", type=int, default=DNS_CONCURRENCY, metavar="N",
+                        help="Résolutions DNS simultanées (défaut : %(default)s)")
+    parser.add_argument("--dns-timeout", type=float, default=DNS_TIMEOUT, metavar="SECONDES",
+                        help="Délai d'une résolution DNS (défaut : %(default)s)")
+    distributed = parser.add_mutually_exclusive_group()
+    distributed.add_argument("--coordinator", metavar="FICHIER",
+                             help="Mode distribué : découper les cibles en tâches dans cette file SQLite, "
+                                  "exécutées par des workers (--worker), et fusionner leurs résultats ; "
+                                  "relancé sur la même file, reprend l'exécution")
+    distributed.add_argument("--worker", metavar="FICHIER",
+                             help="Mode distribué : exécuter les tâches de cette file SQLite (-w tâches à la "
+                                  "fois) jusqu'à la fin de l'exécution du coordinateur")
+    parser.add_argument("--lease-time", type=float, default=LEASE_TIME, metavar="SECONDES",
+                        help="Worker : durée du bail d'une tâche, prolongé tant qu'elle tourne ; une tâche "
+                             "dont le worker s'est arrêté est reprise à son expiration (défaut : %(default)s)")
+    parser.add_argument("--task-attempts", type=int, default=TASK_ATTEMPTS, metavar="N",
+                        help="Coordinateur : tentatives d'une tâche avant abandon (défaut : %(default)s)")
+    parser.add_argument("--json-report", metavar="FICHIER",
+                        help="Écrire aussi les rapports texte en JSON Lines, section par section")
+    parser.add_argument("--jsonl", metavar="FICHIER",
+                        help="Écrire les résultats structurés au fil de l'eau au format JSON Lines")
+    parser.add_argument("--sqlite", metavar="FICHIER",
+                        help="Ajouter les résultats structurés à une base SQLite indexée")
+    parser.add_argument("--progress", choices=["auto", "tty", "json", "plain"], default="auto",
+                        help="Affichage de la progression : multi-lignes (tty), flux JSON Lines (json) "
+                             "ou messages simples (plain) ; auto choisit tty si stderr est un terminal, "
+                             "json sinon")
+    parser.add_argument("--progress-file", metavar="FICHIER",
+                        help="Écrire la progression (json, plain) dans ce fichier")
+    parser.add_argument("--timings", action="store_true",
+                        help="Afficher en fin d'exécution les temps et la consommation par étape et par outil")
+    parser.add_argument("--trace", metavar="FICHIER",
+                        help="Écrire une trace des cibles, étapes et outils au format Chrome (chrome://tracing)")
+    parser.add_argument("--metrics", metavar="FICHIER",
+                        help="Écrire les métriques de l'exécution au format texte de Prometheus "
+                             "(textfile collector)")
+    args = parser.parse_args(argv)
+    # Chargés seulement pour valider les arguments (après --help)
+    from .network import parse_port_spec
+    from .stages import check_stages
+    
+    if args.worker:
+        if args.targets or args.input_list or args.resume:
+            parser.error("--worker reçoit ses cibles du coordinateur : pas de cible, -iL ni --resume")
+    elif not args.targets and not args.input_list and not args.resume and not args.coordinator:
+        parser.error("au moins une cible ou un fichier de cibles (-iL) est requis")
+    if args.coordinator and (args.resume or args.diff):
+        parser.error("--coordinator ne prend pas en charge --resume (relancer le coordinateur sur la "
+                     "même file) ni --diff")
+    if args.worker and args.diff:
+        parser.error("--worker ne prend pas en charge --diff")
+    if args.worker and (args.sweep or args.timeout is not None or args.target_timeout is not None
+                        or args.stage_timeout):
+        parser.error("--worker applique les options de scan du coordinateur : pas de --sweep, --timeout, "
+                     "--target-timeout ni --stage-timeout")
+    if args.resume and args.no_checkpoint:
+        parser.error("--resume et --no-checkpoint sont incompatibles")
+    
+    args.ttl = {}
+    for entry in args.cache_ttl:
+        tool, _, seconds = entry.partition("=")
+        if not seconds.isdigit():
+            parser.error(f"--cache-ttl invalide : {entry} (attendu OUTIL=SECONDES)")
+        args.ttl[tool] = int(seconds)
+    
+    args.stage_timeouts = {}
+    for entry in args.stage_timeout:
+        stage, _, seconds = entry.partition("=")
+        if stage not in STAGE_TIMEOUTS or not seconds.isdigit():
+            parser.error(f"--stage-timeout invalide : {entry} (attendu ÉTAPE=SECONDES, "
+                         f"étapes : {', '.join(STAGE_TIMEOUTS)})")
+        args.stage_timeouts[stage] = int(seconds)
+    
+    try:
+        args.sweep_port_list = parse_port_spec(args.sweep_ports)
+    except ValueError as e:
+        parser.error(f"--sweep-ports invalide : {e}")
+    
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    skipped = [name.strip() for name in args.skip.split(",") if name.strip()]
+    args.stage_list = [name for name in stages if name not in skipped]
+    try:
+        check_stages(stages + skipped)
+        check_stages(args.stage_list, args.diff)
+    except ValueError as e:
+        parser.error(f"--stages/--skip invalide : {e}")
+    return args
+
+def main(argv=None):
+    """Point d'entrée de reconReport.py
+
+    Returns:
+        int: code de sortie (1 si une cible est en erreur)
+    """
+    args = parse_args(argv)
+    from .engine import close_engine
+    from .instrument import Instrumentation
+    from .output import Colors, banner, make_report_sink
+    from .pipeline import create_run, load_run
+    from .progress import ProgressTracker, make_renderer
+    from .results import JsonLinesWriter, ResultDatabase
+    from .scanner import ReconScanner, expand_targets
+    
+    try:
+        targets = expand_targets(args.targets, args.input_list)
+    except OSError as e:
+        print(f"{Colors.RED} Impossible de lire le fichier de cibles : {e}{Colors.RESET}")
+        return 1
+    run_dir = None
+    if args.resume:
+        try:
+            run_dir, run_targets = load_run(args.resume, args.runs_dir)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"{Colors.RED} Impossible de reprendre l'exécution {args.resume} : {e}{Colors.RESET}")
+            return 1
+        targets = targets or run_targets
+    queue = None
+    if args.coordinator or args.worker:
+        import sqlite3
+        from .distributed import TaskQueue
+        try:
+            queue = TaskQueue(args.coordinator or args.worker, lease_time=args.lease_time)
+        except (OSError, sqlite3.Error) as e:
+            print(f"{Colors.RED} Impossible d'ouvrir la file de tâches : {e}{Colors.RESET}")
+            return 1
+    if not targets and not args.worker and not (queue is not None and queue.targets()):
+        print(f"{Colors.RED} Aucune cible à scanner{Colors.RESET}")
+        return 1
+    
+    if not args.no_banner:
+        print(banner)
+    # Un worker transmet ses rapports au coordinateur
+    output_mode = "terminal" if args.worker else args.output or (menu() if sys.stdin.isatty() else "terminal")
+    
+    cache = None
+    # Le coordinateur n'exécute pas d'outils
+    if not args.no_cache and not args.coordinator:
+        import sqlite3  # Chargé seulement si le cache est utilisé
+        from .cache import ResultCache
+        try:
+            cache = ResultCache(ttl=args.ttl, max_size=args.cache_size * 1024 * 1024,
+                                refresh=args.refresh)
+        except (OSError, sqlite3.Error) as e:
+            print(f"{Colors.YELLOW} Cache désactivé : {e}{Colors.RESET}\n")
+    
+    # En mode distribué, la file de tâches tient lieu de points de reprise
+    if run_dir is None and not args.no_checkpoint and queue is None:
+        try:
+            run_dir = create_run(args.runs_dir, targets)
+        except OSError as e:
+            print(f"{Colors.YELLOW} Points de reprise désactivés : {e}{Colors.RESET}\n")
+    progress = ProgressTracker(make_renderer(args.progress, args.progress_file))
+    instrumentation = Instrumentation() if args.timings or args.trace or args.metrics else None
+    result_writers = []
+    capture = None
+    try:
+        if args.worker:
+            from .distributed import TaskCapture
+            report_sink = capture = TaskCapture(queue)
+            result_writers.append(capture.writer)
+        else:
+            report_sink = make_report_sink(output_mode, buffered=len(targets) > 1 or queue is not None,
+                                           json_path=args.json_report, write=progress.write,
+                                           directory=args.output_dir)
+        if args.jsonl:
+            result_writers.append(JsonLinesWriter(args.jsonl))
+    except OSError as e:
+        print(f"{Colors.RED} Impossible d'ouvrir la sortie : {e}{Colors.RESET}")
+        return 1
+    if args.sqlite:
+        import sqlite3  # Chargé seulement si la sortie SQLite est demandée
+        try:
+            result_writers.append(ResultDatabase(args.sqlite))
+        except (OSError, sqlite3.Error) as e:
+            print(f"{Colors.RED} Impossible d'ouvrir la sortie : {e}{Colors.RESET}")
+            return 1
+    
+    scanner = ReconScanner(
+        output_mode=output_mode, output_dir=args.output_dir, report_sink=report_sink, progress=progress, cache=cache,
+        result_writers=result_writers, state_dir=args.state_dir, run_dir=run_dir,
+        command_timeout=args.timeout, output_memory=args.max_output_memory * 1024,
+        jobs=args.jobs, workers=args.workers, diff=args.diff, stages=args.stage_list,
+        sweep_ports=args.sweep_port_list if args.sweep else None,
+        sweep_concurrency=args.sweep_concurrency, sweep_timeout=args.sweep_timeout,
+        ssl_workers=args.ssl_workers, tls_probe_timeout=args.tls_timeout,
+        web_batch_size=args.web_batch_size, web_batch_wait=args.web_batch_wait,
+        fanout_depth=args.subdomains, fanout_max_hosts=args.max_hosts,
+        dns_concurrency=args.dns_concurrency, dns_timeout=args.dns_timeout,
+        target_timeout=args.target_timeout, run_timeout=args.run_timeout, stage_timeouts=args.stage_timeouts,
+        instrumentation=instrumentation,
+    )
+    if queue is None:
+        progress.count('targets_total', len(targets))
+    if run_dir is not None:
+        progress.log(f"{Colors.CYAN}[*]{Colors.RESET} Exécution {os.path.basename(run_dir)} "
+                     f"(reprise : --resume {os.path.basename(run_dir)})")
+    
+    try:
+        if args.worker:
+            from .distributed import Worker
+            worker = Worker(queue, scanner, capture, threads=args.workers)
+            progress.log(f"{Colors.CYAN}[*]{Colors.RESET} Worker {worker.name} : file {args.worker}, "
+                         f"{args.workers} tâches à la fois\n")
+            stats = worker.run()
+            progress.log(f"\n Worker arrêté : {stats['done']} tâches terminées, {stats['failed']} en échec, "
+                         f"{stats['lost']} perdues (bail expiré)", Colors.GREEN)
+            return 0
+        if args.coordinator:
+            from .distributed import Coordinator
+            progress.log(f"{Colors.CYAN}[*]{Colors.RESET} Mode distribué : {len(targets)} cibles, "
+                         f"file {args.coordinator}\n")
+            summaries = Coordinator(queue, scanner, attempts=args.task_attempts).run(targets)
+            return 1 if any(summary['errors'] for summary in summaries) else 0
+        
+        if len(targets) == 1 and not args.subdomains:
+            summary = scanner.scan(targets[0])
+            progress.count('targets_done')
+            if summary['report']:
+                progress.log(f"\n Résultats sauvegardés dans : {summary['report']}", Colors.GREEN)
+            return 1 if summary['errors'] else 0
+        
+        progress.log(f"{Colors.CYAN}[*]{Colors.RESET} Mode batch : {len(targets)} cibles, "
+                     f"{args.workers} workers\n")
+        summaries = scanner.scan_many(targets)
+        return 1 if any(summary['errors'] for summary in summaries) else 0
+    
+    except KeyboardInterrupt:
+        progress.log("\n Scan interrompu", Colors.YELLOW + Colors.BOLD)
+        return 130
+    except Exception as e:
+        progress.log(f"\n Erreur lors du scan: {e}", Colors.RED + Colors.BOLD)
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        # Tuer les outils encore en cours (Ctrl-C, erreur)
+        close_engine()
+        if instrumentation is not None:
+            write_instrumentation(instrumentation, args, progress)
+        scanner.close()
+        if queue is not None:
+            queue.close()
+
+def write_instrumentation(instrumentation, args, progress):
+    """Sorties de l'instrumentation : tableau (--timings), trace (--trace), métriques (--metrics)"""
+    from .output import Colors
+    
+    if args.timings:
+        instrumentation.write_summary(progress.write)
+    for path, write, name in [(args.trace, instrumentation.write_chrome_trace, "Trace"),
+                              (args.metrics, instrumentation.write_prometheus, "Métriques")]:
+        if path:
+            try:
+                write(path)
+                progress.log(f" {name} : {path}", Colors.GREEN)
+            except OSError as e:
+                progress.log(f" {name} non enregistrées : {e}" if name == "Métriques" else
+                             f" {name} non enregistrée : {e}", Colors.RED)
+
+def simple_main(argv=None):
+    """Point d'entrée de simpleReconReport.py : une cible, étapes exécutées l'une après l'autre
+
+    Returns:
+        int: code de sortie
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    from .engine import close_engine
+    from .output import Colors, banner, make_report_sink
+    from .progress import ProgressTracker
+    from .scanner import ReconScanner
+    
+    print(banner)
+    output_mode = menu() if sys.stdin.isatty() else "terminal"
+    if not argv:
+        print(f"{Colors.RED} Usage : {sys.argv[0]} <target>{Colors.RESET}")
+        return 1
+    
+    progress = ProgressTracker()
+    scanner = ReconScanner(output_mode=output_mode, progress=progress, jobs=1,
+                           report_sink=make_report_sink(output_mode, write=progress.write))
+    try:
+        summary = scanner.scan(argv[0])
+        if summary['report']:
+            print(f"{Colors.CYAN} Résultats exportés vers : {summary['report']}{Colors.RESET}\n")
+        return 1 if summary['errors'] else 0
+    except Exception as e:
+        print(f"{Colors.RED}{Colors.BOLD}\n Erreur lors du scan: {e}{Colors.RESET}")
+        return 1
+    finally:
+        close_engine()
+        scanner.close()
@@ -0,0 +1,53 @@
+"""Réglages par défaut de Recon Report et répertoires de ses données
+
+Module sans dépendance : la ligne de commande s'en sert pour construire son
+aide sans charger le reste du paquet.
+"""
+import os
+
+# Étapes du scan d'une cible, dans l'ordre des sections du rapport
+STAGES = ("nmap", "sslscan", "whatweb", "amass")
+
+OUTPUT_MEMORY = 1024 * 1024  # Sortie gardée en mémoire (caractères) avant passage sur disque, par défaut
+CACHE_MAX_SIZE = 100 * 1024 * 1024  # Taille maximale du cache (octets)
+
+JOBS = 3  # Étapes exécutées en parallèle par cible
+WORKERS = 4  # Cibles scannées en parallèle
+SWEEP_CONCURRENCY = 500  # Connexions simultanées du pré-balayage (toutes cibles confondues)
+SWEEP_TIMEOUT = 1.0  # Délai de connexion du pré-balayage (secondes)
+SSL_WORKERS = 4  # sslscan exécutés simultanément (toutes cibles confondues)
+TLS_PROBE_TIMEOUT = 3.0  # Délai du test de négociation TLS (secondes)
+WEB_BATCH_SIZE = 32  # URLs passées à un même processus whatweb
+WEB_BATCH_WAIT = 2.0  # Attente des URLs suivantes avant de lancer un lot (secondes)
+FANOUT_MAX_HOSTS = 50  # Nombre maximal d'hôtes ajoutés par les sous-domaines
+DNS_CONCURRENCY = 64  # Résolutions DNS simultanées
+DNS_TIMEOUT = 5.0  # Délai d'une résolution DNS (secondes)
+
+# Mode distribué (file de tâches partagée entre un coordinateur et ses workers)
+LEASE_TIME = 60.0  # Durée d'un bail de tâche, prolongé par les battements de cœur du worker (secondes)
+TASK_ATTEMPTS = 3  # Tentatives d'une tâche (worker disparu ou scan en échec) avant abandon
+QUEUE_POLL_INTERVAL = 1.0  # Attente entre deux consultations de la file (secondes)
+
+# Temps maximal de chaque étape (secondes), borné par le budget de la cible
+STAGE_TIMEOUTS = {"sweep": 300, "nmap": 3600, "sslscan": 1200, "whatweb": 600, "amass": 600, "diff": 60}
+# Temps restant en deçà duquel une étape n'est pas lancée : les étapes les
+# moins prioritaires sont abandonnées les premières quand le temps manque
+STAGE_MIN_TIME = {"sslscan": 15, "whatweb": 30, "amass": 120}
+
+def data_dir():
+    """Répertoire des données : $XDG_DATA_HOME/reconreport"""
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "reconreport")
+
+def default_state_dir():
+    """Répertoire des états : $XDG_DATA_HOME/reconreport/state"""
+    return os.path.join(data_dir(), "state")
+
+def default_runs_dir():
+    """Répertoire des exécutions (points de reprise) : $XDG_DATA_HOME/reconreport/runs"""
+    return os.path.join(data_dir(), "runs")
+
+def default_cache_path():
+    """Chemin du cache : $XDG_CACHE_HOME/reconreport/cache.sqlite"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "reconreport", "cache.sqlite")
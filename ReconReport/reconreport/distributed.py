@@ -0,0 +1,730 @@
+"""Mode distribué : file de tâches partagée (SQLite), workers et fusion des résultats
+
+Le coordinateur découpe chaque cible en tâches dans une file SQLite : le scan
+de ports avec ses scans de suivi (pré-balayage, nmap, sslscan et whatweb, qui
+s'alimentent au fil de l'eau) et la recherche de sous-domaines (amass), qui
+en est indépendante. Les workers, sur une ou plusieurs machines, prennent les
+tâches sous bail et le prolongent par des battements de cœur tant qu'elles
+tournent : la tâche d'un worker arrêté est reprise par un autre à
+l'expiration de son bail. La sortie des tâches (texte des rapports et
+résultats structurés) est écrite dans la file au fil de l'eau, par blocs ;
+le coordinateur la fusionne dès que les tâches d'une cible sont terminées.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .config import STAGES, LEASE_TIME, TASK_ATTEMPTS, QUEUE_POLL_INTERVAL
+from .engine import stop_engine
+from .output import CHUNK_SIZE, Colors, Report, ReportSink, _local
+from .results import emit, write_record
+from .scanner import HostFanout, write_scan_status
+
+# Ordre des sections dans le rapport fusionné d'une cible
+SECTION_ORDER = ("sweep", *STAGES)
+# Enregistrements structurés envoyés à la file par bloc
+RECORDS_PER_CHUNK = 256
+# Options du coordinateur appliquées par les workers (attributs de ReconScanner)
+SCAN_CONFIG = ("sweep_ports", "sweep_timeout", "command_timeout", "target_timeout", "stage_timeouts")
+
+def scan_config(scanner):
+    """Configuration de scan du coordinateur transmise aux workers"""
+    return {name: getattr(scanner, name) for name in SCAN_CONFIG}
+
+def split_stages(stages, amass=True):
+    """Étapes de chaque tâche d'une cible : scan de ports et scans de suivi, puis amass
+
+    Returns:
+        list: listes d'étapes, une par tâche
+    """
+    ports = [name for name in stages if name != "amass"]
+    tasks = [ports] if ports else []
+    if amass and "amass" in stages:
+        tasks.append(["amass"])
+    return tasks
+
+class TaskQueue:
+    """File de tâches partagée dans une base SQLite
+
+    Chaque tâche est (cible, étapes). Un worker la prend sous bail (lease) :
+    il en est le seul détenteur jusqu'à l'échéance du bail, qu'il prolonge
+    par des battements de cœur (heartbeat). Une tâche dont le bail expire
+    est reprise par le prochain worker, dans la limite de ses tentatives ;
+    le résultat d'un worker qui a perdu son bail est refusé. Les baux sont
+    attribués dans des transactions BEGIN IMMEDIATE : un seul worker obtient
+    chaque tâche, même depuis plusieurs processus.
+
+    La sortie d'une tâche en cours (table output) est ajoutée par blocs sous
+    le même contrôle de bail ; celle d'une tentative précédente est effacée
+    quand la tâche est reprise, et toutes le sont une fois fusionnées.
+    """
+    
+    def __init__(self, path, lease_time=LEASE_TIME):
+        self.path = path
+        self.lease_time = lease_time
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        with self._transaction():
+            self._db.execute("""CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                target TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                depth INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                worker TEXT,
+                lease TEXT,
+                lease_until REAL,
+                started REAL,
+                finished REAL,
+                result TEXT,
+                error TEXT,
+                merged INTEGER NOT NULL DEFAULT 0)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until)")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS output (
+                task INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                section TEXT,
+                text TEXT,
+                records TEXT,
+                PRIMARY KEY (task, seq))""")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+    
+    def add(self, target, tasks, depth=0, max_attempts=TASK_ATTEMPTS):
+        """Ajouter les tâches d'une cible (listes d'étapes, voir split_stages)"""
+        with self._transaction():
+            self._db.executemany("INSERT INTO tasks (target, stages, depth, max_attempts) VALUES (?, ?, ?, ?)",
+                                 [(target, ",".join(stages), depth, max_attempts) for stages in tasks])
+    
+    def lease(self, worker):
+        """Prendre sous bail la plus ancienne tâche disponible (en attente, ou dont le bail a expiré)
+
+        Returns:
+            dict: la tâche (id, target, stages, depth, attempt, lease), ou None
+        """
+        now = time.time()
+        with self._transaction():
+            # Bail expiré à la dernière tentative : la tâche est abandonnée
+            self._db.execute("UPDATE tasks SET state = 'failed', finished = ?, lease = NULL, "
+                             "error = 'bail expiré à la dernière tentative (worker arrêté ?)' "
+                             "WHERE state = 'leased' AND lease_until < ? AND attempts >= max_attempts", (now, now))
+            row = self._db.execute("SELECT id, target, stages, depth, attempts FROM tasks "
+                                   "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+                                   "ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            lease = uuid.uuid4().hex
+            self._db.execute("UPDATE tasks SET state = 'leased', worker = ?, lease = ?, lease_until = ?, "
+                             "attempts = attempts + 1, started = ? WHERE id = ?",
+                             (worker, lease, now + self.lease_time, now, row[0]))
+            # Sortie d'une tentative précédente (worker arrêté en cours de tâche)
+            self._db.execute("DELETE FROM output WHERE task = ?", (row[0],))
+        return {'id': row[0], 'target': row[1], 'stages': row[2].split(","), 'depth': row[3],
+                'attempt': row[4] + 1, 'lease': lease}
+    
+    def _update_leased(self, task, assignments, values=()):
+        """Modifier une tâche si son bail est toujours celui de task
+
+        Returns:
+            bool: False si le bail a été perdu
+        """
+        with self._transaction():
+            cursor = self._db.execute(f"UPDATE tasks SET {assignments} WHERE id = ? AND lease = ? "
+                                      f"AND state = 'leased'", (*values, task['id'], task['lease']))
+        return cursor.rowcount == 1
+    
+    def append_output(self, task, seq, section=None, text=None, records=None):
+        """Ajouter un bloc de sortie à une tâche dont le bail est toujours celui de task
+
+        Args:
+            seq: Numéro du bloc dans la sortie de la tâche
+            section: Section du rapport du texte (None : hors section)
+            text: Texte du rapport
+            records: Enregistrements structurés (liste sérialisable en JSON)
+
+        Returns:
+            bool: False si le bail a été perdu
+        """
+        with self._transaction():
+            cursor = self._db.execute(
+                "INSERT INTO output (task, seq, section, text, records) SELECT ?, ?, ?, ?, ? WHERE EXISTS "
+                "(SELECT 1 FROM tasks WHERE id = ? AND lease = ? AND state = 'leased')",
+                (task['id'], seq, section, text, json.dumps(records, ensure_ascii=False) if records else None,
+                 task['id'], task['lease']))
+        return cursor.rowcount == 1
+    
+    def heartbeat(self, task):
+        """Prolonger le bail d'une tâche en cours"""
+        return self._update_leased(task, "lease_until = ?", (time.time() + self.lease_time,))
+    
+    def complete(self, task, result):
+        """Enregistrer le résultat (sérialisable en JSON) d'une tâche terminée"""
+        return self._update_leased(task, "state = 'done', finished = ?, result = ?, lease = NULL",
+                                   (time.time(), json.dumps(result, ensure_ascii=False)))
+    
+    def fail(self, task, error):
+        """Tâche en échec : remise en file s'il reste des tentatives, abandonnée sinon"""
+        return self._update_leased(task, "state = CASE WHEN attempts >= max_attempts THEN 'failed' "
+                                         "ELSE 'pending' END, finished = ?, error = ?, lease = NULL",
+                                   (time.time(), error))
+    
+    def release(self, task):
+        """Rendre une tâche interrompue (arrêt du worker) sans compter la tentative"""
+        return self._update_leased(task, "state = 'pending', attempts = attempts - 1, lease = NULL")
+    
+    def cancel(self, reason):
+        """Abandonner les tâches en attente ou en cours (les résultats à venir seront refusés)"""
+        with self._transaction():
+            self._db.execute("UPDATE tasks SET state = 'failed', finished = ?, error = ?, lease = NULL "
+                             "WHERE state IN ('pending', 'leased')", (time.time(), reason))
+    
+    def collect(self, skip=()):
+        """Tâches terminées ou abandonnées dont le résultat n'a pas encore été fusionné
+
+        Args:
+            skip: identifiants des tâches déjà relevées (cible pas encore complète)
+
+        Returns:
+            list: tâches (id, target, stages, state, result, error), dans l'ordre de création
+        """
+        with self._lock:
+            ids = [row[0] for row in self._db.execute("SELECT id FROM tasks WHERE state IN ('done', 'failed') "
+                                                      "AND merged = 0 ORDER BY id") if row[0] not in skip]
+            rows = [self._db.execute("SELECT id, target, stages, state, result, error FROM tasks WHERE id = ?",
+                                     (task_id,)).fetchone() for task_id in ids]
+        return [{'id': row[0], 'target': row[1], 'stages': row[2].split(","), 'state': row[3],
+                 'result': json.loads(row[4]) if row[4] else None, 'error': row[5]} for row in rows]
+    
+    def mark_merged(self, ids):
+        """Tâches fusionnées dans le rapport de leur cible : leur sortie est effacée"""
+        with self._transaction():
+            self._db.executemany("UPDATE tasks SET merged = 1 WHERE id = ?", [(task_id,) for task_id in ids])
+            self._db.executemany("DELETE FROM output WHERE task = ?", [(task_id,) for task_id in ids])
+    
+    def _output(self, columns, ids, condition="1", values=()):
+        """Lignes (task, seq, *columns) de la sortie des tâches ids, dans l'ordre d'écriture
+
+        Lues par pages : ni la sortie entière ni le verrou de la file ne sont
+        gardés pendant son parcours.
+        """
+        last = (-1, -1)
+        placeholders = ", ".join("?" * len(ids))
+        while True:
+            with self._lock:
+                rows = self._db.execute(f"SELECT task, seq, {columns} FROM output WHERE task IN ({placeholders}) "
+                                        f"AND {condition} AND (task, seq) > (?, ?) ORDER BY task, seq LIMIT 16",
+                                        (*ids, *values, *last)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][:2]
+    
+    def output_sections(self, ids):
+        """Sections du rapport présentes dans la sortie des tâches ids"""
+        placeholders = ", ".join("?" * len(ids))
+        with self._lock:
+            return {row[0] for row in self._db.execute(f"SELECT DISTINCT section FROM output WHERE task IN "
+                                                       f"({placeholders}) AND section IS NOT NULL", ids)}
+    
+    def output_header(self, task_id):
+        """Textes d'une tâche écrits avant sa première section (début du rapport)"""
+        with self._lock:
+            row = self._db.execute("SELECT MIN(seq) FROM output WHERE task = ? AND section IS NOT NULL",
+                                   (task_id,)).fetchone()
+        first = row[0] if row[0] is not None else float("inf")
+        for _, seq, text in self._output("text", [task_id], "section IS NULL AND text IS NOT NULL"):
+            if seq > first:
+                return
+            yield text
+    
+    def output_text(self, ids, section):
+        """Textes d'une section du rapport dans la sortie des tâches ids"""
+        for _, _, text in self._output("text", ids, "section = ? AND text IS NOT NULL", (section,)):
+            yield text
+    
+    def output_records(self, ids):
+        """Enregistrements structurés de la sortie des tâches ids"""
+        for _, _, records in self._output("records", ids, "records IS NOT NULL"):
+            yield from json.loads(records)
+    
+    def set_config(self, config):
+        """Enregistrer la configuration de scan du coordinateur (sérialisable en JSON)"""
+        with self._transaction():
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('config', ?)", (json.dumps(config),))
+    
+    def config(self):
+        """Configuration de scan du coordinateur, ou None"""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        return json.loads(row[0]) if row is not None else None
+    
+    def unmerged(self):
+        """{cible: (profondeur, nombre de tâches non fusionnées)}, dans l'ordre de création"""
+        with self._lock:
+            rows = self._db.execute("SELECT target, MIN(depth), COUNT(*) FROM tasks WHERE merged = 0 "
+                                    "GROUP BY target ORDER BY MIN(id)").fetchall()
+        return {target: (depth, count) for target, depth, count in rows}
+    
+    def targets(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT target FROM tasks GROUP BY target ORDER BY MIN(id)")]
+    
+    def counts(self):
+        """Nombre de tâches par état (pending, leased, done, failed)"""
+        with self._lock:
+            return dict(self._db.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+    
+    def set_closed(self, closed=True):
+        """Fermer (ou rouvrir) la file : les workers s'arrêtent quand elle est fermée et vide"""
+        with self._transaction():
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('closed', ?)", ("1" if closed else "0",))
+    
+    def closed(self):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'closed'").fetchone()
+        return row is not None and row[0] == "1"
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class TaskOutput:
+    """Sortie d'une tâche en cours : texte et enregistrements envoyés à la file par blocs
+
+    Seul le bloc en cours (au plus CHUNK_SIZE caractères d'une section,
+    RECORDS_PER_CHUNK enregistrements) est gardé en mémoire.
+    """
+    
+    def __init__(self, queue, task):
+        self.queue = queue
+        self.task = task
+        self.accepted = True  # False dès qu'un bloc est refusé (bail perdu)
+        self._seq = 0
+        self._section = None
+        self._parts = []
+        self._size = 0
+        self._records = []
+        self._lock = threading.Lock()
+    
+    def write(self, section, text):
+        with self._lock:
+            if self._parts and section != self._section:
+                self._flush()
+            self._section = section
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size >= CHUNK_SIZE:
+                self._flush()
+    
+    def add_record(self, record):
+        with self._lock:
+            self._records.append(record)
+            if len(self._records) >= RECORDS_PER_CHUNK:
+                self._flush()
+    
+    def flush(self):
+        with self._lock:
+            self._flush()
+    
+    def _flush(self):
+        if not self._parts and not self._records:
+            return
+        # Une tâche dont le bail est perdu continue sans rien envoyer
+        if self.accepted:
+            self.accepted = self.queue.append_output(self.task, self._seq, self._section if self._parts else None,
+                                                     "".join(self._parts) or None, self._records)
+        self._seq += 1
+        self._parts = []
+        self._size = 0
+        self._records = []
+
+class TaskCapture(ReportSink):
+    """Sortie des rapports d'un worker : texte par section et enregistrements de chaque tâche
+
+    Un worker traite plusieurs tâches à la fois : le thread qui traite une
+    tâche l'annonce (begin) avant d'ouvrir son rapport, dont la sortie part
+    ensuite dans la file (TaskOutput) ; take() indique si elle a été
+    acceptée en entier.
+    """
+    
+    def __init__(self, queue):
+        self.queue = queue
+        self._tasks = {}  # {thread: tâche dont il va ouvrir le rapport}
+        self._reports = {}  # {id(rapport): TaskOutput}
+        self._finished = {}  # {thread: sortie du rapport qu'il vient de fermer acceptée}
+        self._lock = threading.Lock()
+        self.writer = CaptureWriter(self)
+    
+    def begin(self, task):
+        with self._lock:
+            self._tasks[threading.get_ident()] = task
+    
+    def open(self, report):
+        with self._lock:
+            task = self._tasks.pop(threading.get_ident(), None)
+            if task is not None:
+                self._reports[id(report)] = TaskOutput(self.queue, task)
+    
+    def write(self, report, text):
+        with self._lock:
+            output = self._reports.get(id(report))
+        if output is not None:
+            output.write(report.section, text)
+    
+    def add_record(self, record):
+        report = getattr(_local, "report", None)
+        with self._lock:
+            output = self._reports.get(id(report))
+        if output is not None:
+            output.add_record(record)
+    
+    def close(self, report):
+        with self._lock:
+            output = self._reports.pop(id(report), None)
+        if output is not None:
+            output.flush()
+            with self._lock:
+                self._finished[threading.get_ident()] = output.accepted
+    
+    def take(self):
+        """Sortie du dernier rapport fermé par ce thread acceptée par la file (None : pas de rapport)"""
+        with self._lock:
+            self._tasks.pop(threading.get_ident(), None)
+            return self._finished.pop(threading.get_ident(), None)
+
+class CaptureWriter:
+    """Sortie structurée d'un worker : enregistrements rattachés au rapport de leur tâche (TaskCapture)"""
+    
+    def __init__(self, capture):
+        self.capture = capture
+    
+    def write(self, record):
+        self.capture.add_record(record)
+    
+    def close(self):
+        pass
+
+class Worker:
+    """Worker du mode distribué : traite les tâches de la file avec son scanner
+
+    threads tâches sont traitées à la fois. Un thread prolonge les baux des
+    tâches en cours ; le résultat d'une tâche dont le bail a été perdu
+    (expiré puis repris par un autre worker) est ignoré. Le worker s'arrête
+    quand le coordinateur a fermé la file.
+
+    Les options de scan du coordinateur (SCAN_CONFIG : pré-balayage, délais)
+    remplacent celles du scanner avant chaque tâche ; les ressources locales
+    (parallélisme, cache, pools) restent celles du worker.
+
+    Args:
+        queue: File de tâches (TaskQueue)
+        scanner: ReconScanner dont la sortie des rapports est capture et
+            les sorties structurées comprennent capture.writer
+        capture: TaskCapture
+        name: Nom du worker dans la file (défaut : machine:pid)
+    """
+    
+    def __init__(self, queue, scanner, capture, name=None, threads=1, poll_interval=QUEUE_POLL_INTERVAL):
+        self.queue = queue
+        self.scanner = scanner
+        self.capture = capture
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.threads = max(1, threads)
+        self.poll_interval = poll_interval
+        self.stats = {'done': 0, 'failed': 0, 'lost': 0}
+        self._active = {}  # {id: tâche en cours}
+        self._config = None  # Configuration du coordinateur appliquée au scanner
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+    
+    def run(self):
+        """Traiter les tâches jusqu'à la fermeture de la file
+
+        Returns:
+            dict: nombre de tâches terminées, en échec et perdues (bail expiré)
+        """
+        threading.Thread(target=self._heartbeat_loop, name="heartbeat", daemon=True).start()
+        pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="task")
+        try:
+            futures = [pool.submit(self._work_loop) for _ in range(self.threads)]
+            wait(futures)
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # Tuer les outils en cours : les tâches interrompues sont rendues à la file
+            self._stopped.set()
+            stop_engine()
+            raise
+        finally:
+            self._stopped.set()
+            pool.shutdown()
+        return self.stats
+    
+    def _work_loop(self):
+        while not self._stopped.is_set():
+            task = self.queue.lease(self.name)
+            if task is None:
+                if self.queue.closed():
+                    return
+                self._stopped.wait(self.poll_interval)
+                continue
+            self._process(task)
+    
+    def _configure(self):
+        """Appliquer au scanner la configuration de scan du coordinateur, si elle a changé"""
+        config = self.queue.config()
+        with self._lock:
+            if config is None or config == self._config:
+                return
+            for name in SCAN_CONFIG:
+                if name in config:
+                    setattr(self.scanner, name, config[name])
+            self._config = config
+    
+    def _process(self, task):
+        progress = self.scanner.progress
+        with self._lock:
+            self._active[task['id']] = task
+        progress.count('targets_total')
+        progress.log(f"{Colors.CYAN}[*]{Colors.RESET} Tâche {task['id']} : {task['target']} "
+                     f"({', '.join(task['stages'])}, tentative {task['attempt']})")
+        error = None
+        try:
+            self._configure()
+            self.capture.begin(task)
+            summary = self.scanner.scan(task['target'], stages=task['stages'])
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            with self._lock:
+                self._active.pop(task['id'], None)
+        output_accepted = self.capture.take()
+        
+        if self._stopped.is_set():
+            # Arrêt du worker : la tâche est rendue à la file sans compter la tentative
+            self.queue.release(task)
+            return
+        progress.count('targets_done')
+        if error is not None:
+            status = "failed"
+            accepted = self.queue.fail(task, error)
+        else:
+            status = "done"
+            # Sortie déjà dans la file : le résultat n'est que le résumé
+            accepted = output_accepted is not False and self.queue.complete(task, {'summary': summary})
+        with self._lock:
+            self.stats[status if accepted else 'lost'] += 1
+        if not accepted:
+            progress.log(f"{Colors.YELLOW}[!]{Colors.RESET} Tâche {task['id']} ({task['target']}) : "
+                         f"bail perdu, résultat ignoré")
+        elif error is not None:
+            progress.log(f"{Colors.RED}[x]{Colors.RESET} Tâche {task['id']} ({task['target']}) en échec : {error}")
+        else:
+            progress.log(f"{Colors.GREEN}[✓]{Colors.RESET} Tâche {task['id']} ({task['target']}) "
+                         f"terminée en {summary['duration']:.1f}s")
+    
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.queue.lease_time / 3):
+            with self._lock:
+                tasks = list(self._active.values())
+            for task in tasks:
+                try:
+                    if self.queue.heartbeat(task):
+                        continue
+                except sqlite3.Error as e:
+                    self.scanner.progress.log(f"{Colors.YELLOW}[!]{Colors.RESET} Battement de cœur de la "
+                                              f"tâche {task['id']} impossible : {e}")
+                    continue
+                with self._lock:
+                    self._active.pop(task['id'], None)
+                self.scanner.progress.log(f"{Colors.YELLOW}[!]{Colors.RESET} Tâche {task['id']} "
+                                          f"({task['target']}) : bail perdu")
+
+class Coordinator:
+    """Coordinateur du mode distribué : découpage des cibles en tâches et fusion des résultats
+
+    Le scanner fournit la configuration de l'exécution (étapes, scan des
+    sous-domaines, temps maximal, options de scan transmises aux workers) et
+    ses sorties (rapports, résultats structurés, progression, résumé) ; les
+    outils sont exécutés par les workers. Relancé sur une file existante, le coordinateur la reprend :
+    les cibles déjà fusionnées ne sont pas rescannées.
+    """
+    
+    def __init__(self, queue, scanner, attempts=TASK_ATTEMPTS, poll_interval=QUEUE_POLL_INTERVAL):
+        self.queue = queue
+        self.scanner = scanner
+        self.attempts = attempts
+        self.poll_interval = poll_interval
+        self._pending = {}  # {cible: tâches non fusionnées}
+        self._depths = {}
+    
+    def submit(self, target, depth=0):
+        """Ajouter les tâches d'une cible à la file
+
+        Returns:
+            bool: False si aucune étape n'est à exécuter pour cette cible
+        """
+        tasks = split_stages(self.scanner.stages, amass=depth < max(self.scanner.fanout_depth, 1))
+        if not tasks:
+            return False
+        self.queue.add(target, tasks, depth, self.attempts)
+        self._pending[target] = len(tasks)
+        self._depths[target] = depth
+        self.scanner.progress.count('targets_total')
+        return True
+    
+    def run(self, targets):
+        """Soumettre les cibles, attendre les workers et fusionner les résultats de chaque cible
+
+        Returns:
+            list: résumés des cibles, dans l'ordre de fin de scan
+        """
+        scanner, queue, progress = self.scanner, self.queue, self.scanner.progress
+        # Avant les tâches : les workers l'appliquent dès leur première tâche
+        queue.set_config(scan_config(scanner))
+        known = queue.targets()
+        for target, (depth, count) in queue.unmerged().items():
+            self._pending[target] = count
+            self._depths[target] = depth
+        if known:
+            progress.count('targets_total', len(self._pending))
+            progress.log(f"{Colors.CYAN}[*]{Colors.RESET} Reprise de la file {queue.path} : "
+                         f"{len(self._pending)} cibles en cours")
+        for target in targets:
+            if target not in known:
+                self.submit(target)
+        queue.set_closed(False)
+        fanout = HostFanout(known + [target for target in targets if target not in known], scanner.resolver,
+                            progress, scanner.fanout_depth, scanner.fanout_max_hosts) \
+            if scanner.fanout_depth else None
+        
+        summaries = []
+        results = {}  # {cible: tâches relevées}
+        collected = set()
+        cancelled = False
+        budget = scanner.run_budget
+        task = progress.start(f"Mode distribué : file {queue.path}", "")
+        while self._pending:
+            finished = queue.collect(collected)
+            for row in finished:
+                collected.add(row['id'])
+                results.setdefault(row['target'], []).append(row)
+                self._pending[row['target']] -= 1
+            for target in [target for target, count in self._pending.items() if count == 0]:
+                del self._pending[target]
+                rows = results.pop(target)
+                summary = self.merge(target, rows)
+                queue.mark_merged([row['id'] for row in rows])
+                collected.difference_update(row['id'] for row in rows)
+                summaries.append(summary)
+                progress.count('targets_done')
+                color = Colors.RED if summary['errors'] else Colors.YELLOW if summary['partial'] else Colors.GREEN
+                progress.log(f"{color}[{len(summaries)}]{Colors.RESET} {target} terminé en "
+                             f"{summary['duration']:.1f}s")
+                if fanout is not None and summary['subdomains']:
+                    for host in fanout.expand(target, summary['subdomains'], summary['depth']):
+                        self.submit(host, summary['depth'] + 1)
+            
+            if not finished:
+                if not cancelled and budget.expired():
+                    cancelled = True
+                    queue.cancel("temps maximal de l'exécution dépassé")
+                    progress.log(f"{Colors.YELLOW}[!]{Colors.RESET} Temps maximal de l'exécution dépassé : "
+                                 f"tâches restantes abandonnées")
+                    continue
+                progress.update(task, detail=self._counts())
+                time.sleep(self.poll_interval)
+        progress.finish(task, detail=self._counts())
+        # Les workers s'arrêtent
+        queue.set_closed(True)
+        scanner.write_summary(summaries)
+        return summaries
+    
+    def _counts(self):
+        counts = self.queue.counts()
+        return (f"{counts.get('pending', 0)} en attente, {counts.get('leased', 0)} en cours, "
+                f"{counts.get('done', 0)} terminées, {counts.get('failed', 0)} en échec")
+    
+    def merge(self, target, tasks):
+        """Rapport et résultats structurés d'une cible à partir des résultats de ses tâches
+
+        Le début du rapport vient de la première tâche, puis les sections
+        suivent l'ordre des étapes ; leur texte est relu dans la file au fil
+        de l'écriture. Les enregistrements "target" des tâches sont remplacés
+        par celui de la cible.
+
+        Returns:
+            dict: résumé de la cible (comme ReconScanner.scan)
+        """
+        summary = {'target': target, 'errors': {}, 'duration': 0.0, 'open_ports': 0, 'ssl_ports': 0,
+                   'report': None, 'depth': self._depths.pop(target, 0), 'subdomains': [], 'partial': {}}
+        ids = []
+        failures = []
+        for task in sorted(tasks, key=lambda task: task['id']):
+            if task['state'] == "failed" or task['result'] is None:
+                failures.append((",".join(task['stages']), task['error'] or "échec"))
+                continue
+            ids.append(task['id'])
+            task_summary = task['result']['summary']
+            summary['errors'].update(task_summary['errors'])
+            summary['partial'].update(task_summary['partial'])
+            # Tâches d'une même cible exécutées en parallèle
+            summary['duration'] = max(summary['duration'], task_summary['duration'])
+            summary['open_ports'] += task_summary['open_ports']
+            summary['ssl_ports'] += task_summary['ssl_ports']
+            summary['subdomains'].extend(name for name in task_summary.get('subdomains', [])
+                                         if name not in summary['subdomains'])
+        for name, error in failures:
+            summary['errors'][name] = error
+        
+        scanner, queue = self.scanner, self.queue
+        sections = queue.output_sections(ids) if ids else set()
+        with scanner.active():
+            previous_report = getattr(_local, "report", None)
+            report = Report(target, scanner.report_sink).open()
+            _local.report = report
+            try:
+                if ids:
+                    for text in queue.output_header(ids[0]):
+                        report.write_raw(text)
+                for name in [*SECTION_ORDER, *sorted(sections - set(SECTION_ORDER))]:
+                    if name in sections:
+                        report.begin_section(name)
+                        for text in queue.output_text(ids, name):
+                            report.write_raw(text)
+                        report.begin_section(None)
+                for name, error in failures:
+                    report.write(f"\n Tâche {name} abandonnée : {error}", Colors.RED + Colors.BOLD)
+                if ids:
+                    for record in queue.output_records(ids):
+                        if record['type'] != "target":
+                            write_record(record)
+                write_scan_status(summary['errors'], summary['partial'])
+                summary['report'] = report.filename
+                emit("target", duration=round(summary['duration'], 3), open_ports=summary['open_ports'],
+                     tls_endpoints=summary['ssl_ports'], errors=summary['errors'], partial=summary['partial'])
+            finally:
+                report.close()
+                _local.report = previous_report
+        return summary
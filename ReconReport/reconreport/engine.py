@@ -0,0 +1,311 @@
+"""Moteur d'exécution des outils (asyncio), partagé par tous les scanners du processus"""
+import os
+import sys
+import time
+import queue
+import codecs
+import signal
+import asyncio
+import threading
+from concurrent.futures import CancelledError
+
+from .output import CHUNK_SIZE, OUTPUT_MEMORY
+
+class CommandResult:
+    """Résultat structuré d'une commande exécutée par le moteur"""
+    
+    def __init__(self, command):
+        self.command = list(command)
+        self.stdout = ""
+        self.stderr = ""
+        self.returncode = None
+        self.duration = 0.0
+        self.timed_out = False
+        self.cancelled = False
+        self.output_bytes = 0  # Taille totale de stdout, même au-delà de ce qui est gardé
+        self.truncated = False  # stdout ne contient que le début de la sortie
+        self.cpu_time = None  # Temps CPU (secondes) du processus et de ses enfants terminés, si mesuré
+        self.peak_rss = None  # Mémoire résidente maximale du processus (octets), si mesurée
+    
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+SAMPLE_INTERVAL = 0.25  # Intervalle de relevé de la consommation des processus (secondes)
+
+def sample_process(pid):
+    """Consommation d'un processus en cours, lue dans /proc (Linux)
+
+    La boucle asyncio récupère elle-même les processus terminés : leur
+    rusage n'est pas accessible par commande, d'où ces relevés pendant
+    l'exécution.
+
+    Returns:
+        tuple: (temps CPU en secondes, y compris les enfants terminés ;
+                mémoire résidente maximale en octets, ou None), ou None si
+                le processus n'est plus lisible
+    """
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        # utime, stime, cutime, cstime : champs 14 à 17 (le premier après la parenthèse est le 3e)
+        cpu_time = sum(int(value) for value in fields[11:15]) / CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return None
+    peak_rss = None
+    try:
+        with open(f"/proc/{pid}/status", 'rb') as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    peak_rss = int(line.split()[1]) * 1024
+                    break
+    except (OSError, IndexError, ValueError):
+        pass
+    return cpu_time, peak_rss
+
+def kill_process_group(process):
+    """Tuer un processus et tous ceux de son groupe (créé par start_new_session)"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        process.kill()
+
+class CommandStream:
+    """Lignes de sortie standard d'une commande, lues au fil de l'eau
+
+    S'itère dans le thread appelant ; result() donne le CommandResult une
+    fois la commande terminée.
+    """
+    
+    def __init__(self, engine, command, timeout=None, keep=None):
+        self._lines = queue.Queue()
+        self.future = engine.submit(command, timeout=timeout, line_queue=self._lines, keep=keep)
+    
+    def __iter__(self):
+        return iter(self._lines.get, None)
+    
+    def result(self):
+        return self.future.result()
+    
+    def cancel(self):
+        self.future.cancel()
+
+class CommandEngine:
+    """Moteur d'exécution des outils basé sur asyncio
+
+    Une seule boucle d'événements (dans un thread dédié) pilote tous les
+    processus enfants via asyncio.create_subprocess_exec : pas de thread par
+    outil ni d'attente active. Chaque commande peut avoir un délai maximal
+    et être annulée ; son groupe de processus est alors tué (whatweb, amass
+    ou un script lancent leurs propres sous-processus).
+    """
+    
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        if sys.version_info < (3, 12) and hasattr(os, "pidfd_open"):
+            # Avant Python 3.12, l'observateur de processus par défaut crée un
+            # thread par enfant : les pidfd permettent de tout suivre dans la boucle
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(self._loop)
+            asyncio.set_child_watcher(watcher)
+        self._thread = threading.Thread(target=self._loop.run_forever, name="command-engine", daemon=True)
+        self._thread.start()
+    
+    async def run_async(self, command, timeout=None, line_queue=None, sink=None, keep=None):
+        """Exécuter une commande (coroutine)
+
+        La sortie est lue par blocs : elle peut être écrite au fil de l'eau
+        dans un sink, et seuls ses keep premiers caractères sont gardés en
+        mémoire dans le résultat.
+
+        Args:
+            command: Liste de commande à exécuter
+            timeout: Délai maximal en secondes (None = illimité)
+            line_queue: File recevant chaque ligne de stdout, puis None à la fin
+            sink: Objet recevant chaque bloc de stdout (méthode write_raw)
+            keep: Nombre maximal de caractères de stdout/stderr gardés (défaut : OUTPUT_MEMORY)
+
+        Returns:
+            CommandResult
+        """
+        result = CommandResult(command)
+        start = time.monotonic()
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.DEVNULL, start_new_session=True
+            )
+            keep = OUTPUT_MEMORY if keep is None else keep
+            monitor = asyncio.ensure_future(self._monitor(process, result))
+            try:
+                await asyncio.wait_for(self._communicate(process, result, line_queue, sink, keep), timeout)
+            finally:
+                monitor.cancel()
+        except asyncio.TimeoutError:
+            result.timed_out = True
+            result.stderr += f"\nDélai dépassé ({timeout}s)"
+        except asyncio.CancelledError:
+            result.cancelled = True
+            raise
+        except OSError as e:
+            result.stderr = str(e)
+            result.returncode = 1
+        finally:
+            if process is not None:
+                if process.returncode is None:
+                    kill_process_group(process)
+                    await process.wait()
+                result.returncode = process.returncode
+            result.duration = time.monotonic() - start
+            if line_queue is not None:
+                line_queue.put(None)
+        return result
+    
+    @staticmethod
+    def _record_sample(process, result):
+        sample = sample_process(process.pid)
+        if sample is not None:
+            cpu_time, peak_rss = sample
+            result.cpu_time = max(result.cpu_time or 0.0, cpu_time)
+            if peak_rss is not None:
+                result.peak_rss = max(result.peak_rss or 0, peak_rss)
+    
+    async def _monitor(self, process, result):
+        """Relever la consommation du processus jusqu'à sa fin"""
+        while process.returncode is None:
+            self._record_sample(process, result)
+            await asyncio.sleep(SAMPLE_INTERVAL)
+    
+    async def _communicate(self, process, result, line_queue, sink, keep):
+        """Lire stdout et stderr par blocs jusqu'à la fin du processus"""
+        async def read_stdout():
+            pending = ""
+            async for text in self._read_chunks(process.stdout, result):
+                if sink is not None:
+                    sink.write_raw(text)
+                if line_queue is not None:
+                    lines = (pending + text).split("\n")
+                    pending = lines.pop()
+                    for line in lines:
+                        line_queue.put(line + "\n")
+                yield text
+            if line_queue is not None and pending:
+                line_queue.put(pending)
+        
+        async def read_capped(chunks):
+            """Garder au plus keep caractères d'un flux, lu jusqu'au bout"""
+            head = []
+            kept = 0
+            truncated = False
+            async for text in chunks:
+                part = text[:keep - kept]
+                if part:
+                    head.append(part)
+                    kept += len(part)
+                if len(part) < len(text):
+                    truncated = True
+            return "".join(head), truncated
+        
+        (stdout, truncated), (stderr, _) = await asyncio.gather(
+            read_capped(read_stdout()), read_capped(self._read_chunks(process.stderr))
+        )
+        result.stdout = stdout
+        result.truncated = truncated
+        result.stderr = stderr
+        # Sorties fermées : dernier relevé, le processus se termine
+        self._record_sample(process, result)
+        await process.wait()
+    
+    @staticmethod
+    async def _read_chunks(stream, result=None):
+        """Blocs de texte décodés d'un flux (UTF-8, sans couper un caractère)"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            chunk = await stream.read(CHUNK_SIZE)
+            if result is not None:
+                result.output_bytes += len(chunk)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                yield text
+            if not chunk:
+                return
+    
+    def run_coroutine(self, coro):
+        """Exécuter une coroutine dans la boucle du moteur depuis n'importe quel thread
+
+        Returns:
+            concurrent.futures.Future: futur du résultat de la coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    def submit(self, command, timeout=None, line_queue=None, sink=None, keep=None):
+        """Lancer une commande depuis n'importe quel thread
+
+        Returns:
+            concurrent.futures.Future: futur du CommandResult (cancel() tue le processus)
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.run_async(command, timeout, line_queue, sink, keep), self._loop
+        )
+    
+    def run(self, command, timeout=None, sink=None, keep=None):
+        """Exécuter une commande et attendre son résultat"""
+        return self.submit(command, timeout=timeout, sink=sink, keep=keep).result()
+    
+    def stream(self, command, timeout=None, keep=None):
+        """Exécuter une commande en lisant sa sortie ligne par ligne"""
+        return CommandStream(self, command, timeout=timeout, keep=keep)
+    
+    def close(self):
+        """Annuler les commandes en cours (processus tués) et arrêter la boucle"""
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
+
+# Avant Python 3.12, l'observateur de processus enfants est propre au processus :
+# un seul moteur, partagé par tous les scanners
+_engine = None
+_engine_lock = threading.Lock()
+_stopped = False  # Exécution interrompue (Ctrl-C) : plus aucun outil n'est lancé
+
+def get_engine():
+    """Moteur d'exécution partagé (créé au premier usage)
+
+    Raises:
+        CancelledError: exécution interrompue (stop_engine)
+    """
+    global _engine
+    with _engine_lock:
+        if _stopped:
+            raise CancelledError("exécution interrompue")
+        if _engine is None:
+            _engine = CommandEngine()
+        return _engine
+
+def engine_stopped():
+    return _stopped
+
+def stop_engine():
+    """Interrompre l'exécution (Ctrl-C) : les outils en cours sont tués et aucun autre n'est lancé"""
+    global _stopped
+    with _engine_lock:
+        _stopped = True
+    close_engine()
+
+def close_engine():
+    """Arrêter le moteur partagé (fin du programme) : les outils en cours sont tués"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
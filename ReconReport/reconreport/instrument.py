@@ -0,0 +1,255 @@
+"""Instrumentation : durées et consommation des cibles, étapes et outils
+
+Chaque cible, étape et commande d'outil donne un span (durée, temps CPU et
+mémoire des outils, sortie produite, code de sortie, cache). En fin
+d'exécution : tableau récapitulatif, trace au format Chrome (chrome://tracing,
+Perfetto) et métriques Prometheus (fichier du textfile collector).
+"""
+import os
+import sys
+import json
+import time
+import threading
+
+from .output import Colors, _local, current_scanner
+from .progress import format_size
+
+class Span:
+    """Intervalle mesuré : une cible (target), une étape (stage) ou une commande (command)"""
+    
+    def __init__(self, kind, name, target=None, parent=None):
+        self.kind = kind
+        self.name = name
+        self.target = target
+        self.parent = parent  # Span de l'étape d'une commande
+        self.start = time.monotonic()
+        self.duration = 0.0
+        self.thread = threading.get_ident()
+        self.status = "ok"  # ok, error, partial ou timeout
+        self.cpu_time = None  # Temps CPU des outils (secondes)
+        self.peak_rss = None  # Mémoire résidente maximale des outils (octets)
+        self.output_bytes = 0
+        self.exit_code = None
+        self.cache = False  # Résultat servi par le cache
+    
+    def add_usage(self, cpu_time, peak_rss, output_bytes):
+        if cpu_time is not None:
+            self.cpu_time = (self.cpu_time or 0.0) + cpu_time
+        if peak_rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, peak_rss)
+        self.output_bytes += output_bytes
+    
+    def as_dict(self):
+        return {
+            'kind': self.kind, 'name': self.name, 'target': self.target, 'duration': round(self.duration, 6),
+            'status': self.status, 'cpu_time': self.cpu_time, 'peak_rss': self.peak_rss,
+            'output_bytes': self.output_bytes, 'exit_code': self.exit_code, 'cache': self.cache,
+        }
+
+class Instrumentation:
+    """Spans d'une exécution, partagés par les threads du scanner
+
+    Le temps CPU et la mémoire d'une commande sont relevés par le moteur
+    (CommandResult.cpu_time, peak_rss) et cumulés dans le span de son
+    étape ; children_usage() donne les totaux exacts de tous les outils
+    terminés du processus (getrusage).
+    """
+    
+    # Ordre des groupes du tableau récapitulatif
+    KINDS = ("target", "stage", "command")
+    KIND_LABELS = {'target': "Cibles", 'stage': "Étapes", 'command': "Outils"}
+    
+    def __init__(self):
+        self.start = time.monotonic()
+        self.started_at = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+    
+    def begin(self, kind, name, target=None, parent=None):
+        """Ouvrir un span (fermé par end)"""
+        return Span(kind, name, target, parent)
+    
+    def end(self, span, status="ok"):
+        span.duration = time.monotonic() - span.start
+        span.status = status
+        with self._lock:
+            self.spans.append(span)
+        return span
+    
+    def add_command(self, name, result=None, target=None, parent=None):
+        """Enregistrer une commande terminée (CommandResult), ou servie par le cache (result=None)"""
+        span = Span("command", name, target, parent)
+        if result is None:
+            span.cache = True
+        else:
+            span.start -= result.duration
+            span.duration = result.duration
+            span.exit_code = result.returncode
+            span.status = "timeout" if result.timed_out else "ok" if result.returncode == 0 else "error"
+            span.add_usage(result.cpu_time, result.peak_rss, result.output_bytes)
+        with self._lock:
+            self.spans.append(span)
+            if parent is not None and result is not None:
+                parent.add_usage(result.cpu_time, result.peak_rss, result.output_bytes)
+        return span
+    
+    def snapshot(self):
+        with self._lock:
+            return list(self.spans)
+    
+    @staticmethod
+    def children_usage():
+        """Temps CPU (secondes) et mémoire maximale (octets) des processus enfants terminés
+
+        Returns:
+            tuple: (cpu, peak_rss), ou None si getrusage n'est pas disponible
+        """
+        try:
+            import resource
+        except ImportError:
+            return None
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        # ru_maxrss est en Ko sous Linux, en octets sous macOS
+        peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        return usage.ru_utime + usage.ru_stime, peak_rss
+    
+    def aggregate(self):
+        """Statistiques par (type, nom) : nombre, durées, CPU, mémoire, sortie, cache, échecs"""
+        groups = {}
+        for span in self.snapshot():
+            stats = groups.setdefault((span.kind, span.name), {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'cpu_time': None, 'peak_rss': None,
+                'output_bytes': 0, 'cache_hits': 0, 'failures': 0,
+            })
+            stats['count'] += 1
+            stats['total'] += span.duration
+            stats['max'] = max(stats['max'], span.duration)
+            if span.cpu_time is not None:
+                stats['cpu_time'] = (stats['cpu_time'] or 0.0) + span.cpu_time
+            if span.peak_rss is not None:
+                stats['peak_rss'] = max(stats['peak_rss'] or 0, span.peak_rss)
+            stats['output_bytes'] += span.output_bytes
+            stats['cache_hits'] += span.cache
+            stats['failures'] += span.status != "ok"
+        return dict(sorted(groups.items(), key=lambda item: (self.KINDS.index(item[0][0]), -item[1]['total'])))
+    
+    def summary_lines(self, slowest=5):
+        """Tableau récapitulatif des temps par cible, étape et outil"""
+        wall = time.monotonic() - self.start
+        lines = [
+            "",
+            "="*60,
+            f" Temps d'exécution : {wall:.1f}s",
+            "="*60,
+            f"{'':<12} {'NOM':<10} {'N':>5} {'TOTAL':>9} {'MOYENNE':>8} {'MAX':>8} {'CPU':>8} "
+            f"{'RSS MAX':>9} {'SORTIE':>9} {'CACHE':>5} {'ÉCHECS':>6}",
+        ]
+        previous_kind = None
+        for (kind, name), stats in self.aggregate().items():
+            label = self.KIND_LABELS[kind] if kind != previous_kind else ""
+            previous_kind = kind
+            cpu = f"{stats['cpu_time']:.1f}s" if stats['cpu_time'] is not None else "-"
+            rss = format_size(stats['peak_rss']) if stats['peak_rss'] is not None else "-"
+            lines.append(f"{label:<12} {name:<10} {stats['count']:>5} {stats['total']:>8.1f}s "
+                         f"{stats['total'] / stats['count']:>7.2f}s {stats['max']:>7.2f}s {cpu:>8} {rss:>9} "
+                         f"{format_size(stats['output_bytes']):>9} {stats['cache_hits']:>5} {stats['failures']:>6}")
+        
+        commands = sum(span.duration for span in self.snapshot() if span.kind == "command")
+        lines.append("")
+        lines.append(f"Outils : {commands:.1f}s cumulées en {wall:.1f}s "
+                     f"(parallélisme moyen {commands / wall if wall else 0:.1f})")
+        usage = self.children_usage()
+        if usage is not None:
+            lines.append(f"Processus enfants terminés : {usage[0]:.1f}s CPU, "
+                         f"mémoire maximale {format_size(usage[1])}")
+        
+        targets = sorted((span for span in self.snapshot() if span.kind == "target"),
+                         key=lambda span: span.duration, reverse=True)
+        if len(targets) > 1:
+            lines.append(f"Cibles les plus lentes :")
+            for span in targets[:slowest]:
+                lines.append(f"    {span.target:<30} {span.duration:>7.1f}s {span.status}")
+        return lines
+    
+    def write_summary(self, write):
+        """Écrire le tableau récapitulatif (write : ProgressTracker.write ou équivalent)"""
+        lines = self.summary_lines()
+        write(f"{Colors.CYAN}{Colors.BOLD}" + "\n".join(lines[:4]) + Colors.RESET + "\n")
+        write("\n".join(lines[4:]) + "\n")
+    
+    def write_chrome_trace(self, path):
+        """Trace au format Chrome (Trace Event Format) : une ligne par cible, spans imbriqués par thread"""
+        pids = {}
+        events = []
+        for span in self.snapshot():
+            pid = pids.setdefault(span.target, len(pids) + 1)
+            events.append({
+                'name': span.name, 'cat': span.kind, 'ph': "X", 'pid': pid, 'tid': span.thread,
+                'ts': round((span.start - self.start) * 1e6), 'dur': round(span.duration * 1e6),
+                'args': {key: value for key, value in span.as_dict().items()
+                         if key not in ("kind", "name", "duration") and value is not None},
+            })
+        for target, pid in pids.items():
+            events.append({'name': "process_name", 'ph': "M", 'pid': pid,
+                           'args': {'name': target or "reconreport"}})
+        write_atomic(path, json.dumps({'traceEvents': events, 'displayTimeUnit': "ms",
+                                       'otherData': {'started': self.started_at}}))
+    
+    def write_prometheus(self, path):
+        """Métriques au format texte de Prometheus (écriture atomique pour le textfile collector)"""
+        metrics = [
+            ("span_seconds", "summary", "Durée des spans (cibles, étapes, outils)", None),
+            ("span_seconds_max", "gauge", "Durée maximale d'un span", 'max'),
+            ("span_cpu_seconds", "gauge", "Temps CPU des outils", 'cpu_time'),
+            ("span_peak_rss_bytes", "gauge", "Mémoire résidente maximale des outils", 'peak_rss'),
+            ("span_output_bytes", "gauge", "Sortie standard produite par les outils", 'output_bytes'),
+            ("span_cache_hits", "gauge", "Résultats servis par le cache", 'cache_hits'),
+            ("span_failures", "gauge", "Spans en échec, interrompus ou partiels", 'failures'),
+        ]
+        groups = self.aggregate()
+        lines = []
+        for name, kind, help_text, key in metrics:
+            lines.append(f"# HELP reconreport_{name} {help_text}")
+            lines.append(f"# TYPE reconreport_{name} {kind}")
+            for (span_kind, span_name), stats in groups.items():
+                labels = f'kind="{prometheus_label(span_kind)}",name="{prometheus_label(span_name)}"'
+                if key is None:
+                    lines.append(f"reconreport_{name}_sum{{{labels}}} {stats['total']:.6f}")
+                    lines.append(f"reconreport_{name}_count{{{labels}}} {stats['count']}")
+                elif stats[key] is not None:
+                    lines.append(f"reconreport_{name}{{{labels}}} {stats[key]}")
+        
+        run = [("run_duration_seconds", "Durée de l'exécution", f"{time.monotonic() - self.start:.6f}"),
+               ("run_start_timestamp_seconds", "Début de l'exécution", f"{self.started_at:.3f}")]
+        usage = self.children_usage()
+        if usage is not None:
+            run.append(("children_cpu_seconds", "Temps CPU des processus enfants terminés", f"{usage[0]:.6f}"))
+            run.append(("children_peak_rss_bytes", "Mémoire maximale d'un processus enfant", str(usage[1])))
+        for name, help_text, value in run:
+            lines.extend([f"# HELP reconreport_{name} {help_text}", f"# TYPE reconreport_{name} gauge",
+                          f"reconreport_{name} {value}"])
+        write_atomic(path, "\n".join(lines) + "\n")
+
+def prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def write_atomic(path, text):
+    """Écrire un fichier d'un bloc : les lecteurs ne voient jamais un fichier incomplet"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+def current_span():
+    """Span de l'étape exécutée par ce thread, ou None"""
+    return getattr(_local, "span", None)
+
+def record_command(name, result=None):
+    """Enregistrer une commande d'outil (result=None : servie par le cache) dans le scanner courant"""
+    instrumentation = current_scanner().instrumentation
+    if instrumentation is not None:
+        report = getattr(_local, "report", None)
+        instrumentation.add_command(name, result, target=report.target if report is not None else None,
+                                    parent=current_span())
@@ -0,0 +1,217 @@
+"""Réseau de Recon Report : ports, pré-balayage TCP, test TLS, résolution DNS et bannières"""
+import socket
+import asyncio
+import hashlib
+import ipaddress
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import SWEEP_CONCURRENCY, SWEEP_TIMEOUT, TLS_PROBE_TIMEOUT, DNS_CONCURRENCY, DNS_TIMEOUT
+from .engine import get_engine
+
+# Ports les plus courants, utilisés si la liste de nmap (nmap-services) est introuvable
+COMMON_PORTS = [
+    21, 22, 23, 25, 53, 80, 81, 88, 110, 111, 135, 139, 143, 389, 443, 445, 465, 514, 587,
+    631, 636, 873, 993, 995, 1080, 1433, 1521, 1723, 2049, 2082, 2083, 2181, 2375, 2376,
+    3000, 3128, 3268, 3306, 3389, 4443, 4848, 5000, 5060, 5432, 5601, 5672, 5900, 5985,
+    5986, 6379, 6443, 7001, 8000, 8008, 8009, 8080, 8081, 8088, 8181, 8443, 8500, 8888,
+    9000, 9090, 9092, 9200, 9300, 9443, 10000, 11211, 15672, 27017, 50000,
+]
+NMAP_SERVICES_PATHS = ["/usr/share/nmap/nmap-services", "/usr/local/share/nmap/nmap-services",
+                       "/opt/homebrew/share/nmap/nmap-services"]
+
+def nmap_top_ports(count):
+    """Les count ports TCP les plus fréquents selon nmap (comme --top-ports)"""
+    for path in NMAP_SERVICES_PATHS:
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                entries = []
+                for line in f:
+                    fields = line.split()
+                    if len(fields) >= 3 and not line.startswith("#") and fields[1].endswith("/tcp"):
+                        entries.append((float(fields[2]), int(fields[1].split("/")[0])))
+        except OSError:
+            continue
+        return sorted(port for _, port in sorted(entries, reverse=True)[:count])
+    return COMMON_PORTS[:count]
+
+def parse_port_spec(spec):
+    """Liste de ports triée à partir de "top:N" ou de "22,80,8000-8100"
+
+    Raises:
+        ValueError: spécification invalide
+    """
+    if spec.startswith("top:"):
+        return nmap_top_ports(int(spec[4:]))
+    ports = set()
+    for item in spec.split(","):
+        first, _, last = item.strip().partition("-")
+        first, last = int(first), int(last or first)
+        if not 1 <= first <= last <= 65535:
+            raise ValueError(f"plage de ports invalide : {item}")
+        ports.update(range(first, last + 1))
+    return sorted(ports)
+
+async def tcp_connect_scan(host, ports, on_open=None, concurrency=SWEEP_CONCURRENCY, timeout=SWEEP_TIMEOUT, limit=None,
+                           on_error=None):
+    """Ports TCP ouverts de host, par connexion complète (asyncio)
+
+    Le nombre de sockets ouvertes à la fois est limité par limit, un
+    sémaphore que le scanner partage entre toutes ses cibles (concurrency
+    sockets pour cet hôte seul sinon) ; un port qui ne répond pas dans
+    timeout secondes est considéré fermé ou filtré. Un port dont la socket
+    n'a pas pu être créée (trop de fichiers ouverts...) est signalé à
+    on_error(port, erreur) au lieu d'être compté comme fermé.
+    """
+    if limit is None:
+        limit = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    remaining = iter(ports)
+    open_ports = []
+    
+    async def probe_worker():
+        # Un nombre fixe de workers se partage les ports : pas une tâche par port
+        for port in remaining:
+            # La socket n'existe que sous le sémaphore : il borne les descripteurs ouverts
+            async with limit:
+                try:
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                except OSError as e:
+                    if on_error:
+                        on_error(port, e)
+                    continue
+                try:
+                    sock.setblocking(False)
+                    await asyncio.wait_for(loop.sock_connect(sock, (host, port)), timeout)
+                except (OSError, asyncio.TimeoutError):
+                    continue
+                finally:
+                    sock.close()
+            open_ports.append(port)
+            if on_open:
+                on_open(port)
+    
+    await asyncio.gather(*(probe_worker() for _ in range(min(concurrency, len(ports)))))
+    return sorted(open_ports)
+
+def is_ip_address(value):
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+def tls_context():
+    """Contexte TLS du test de négociation : aucun contrôle, anciens protocoles acceptés"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    try:
+        context.minimum_version = ssl.TLSVersion.MINIMUM_SUPPORTED
+        context.set_ciphers("ALL:@SECLEVEL=0")
+    except (ValueError, ssl.SSLError):
+        pass
+    return context
+
+_tls_context = None  # Créé au premier test TLS
+
+async def tls_probe(host, port_nb, server_name=None, timeout=TLS_PROBE_TIMEOUT):
+    """Négociation TLS rapide avec un port ouvert
+
+    Returns:
+        str: empreinte SHA-256 du certificat (vide si le serveur n'en
+        présente pas), ou None si le port ne parle pas TLS
+    """
+    global _tls_context
+    # Toujours exécutée dans la boucle du moteur : pas de création concurrente
+    if _tls_context is None:
+        _tls_context = tls_context()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, int(port_nb), ssl=_tls_context, server_hostname=server_name or host),
+            timeout
+        )
+    except (OSError, asyncio.TimeoutError):
+        return None
+    certificate = writer.get_extra_info("ssl_object").getpeercert(binary_form=True)
+    writer.transport.abort()
+    return hashlib.sha256(certificate).hexdigest() if certificate else ""
+
+class DnsResolver:
+    """Résolution DNS concurrente avec cache, partagée par toutes les cibles
+
+    Les noms sont résolus dans la boucle du moteur, au plus concurrency à la
+    fois. Une résolution en cours est partagée par tous ceux qui demandent le
+    même nom, et les échecs restent en cache pour ne pas être retentés.
+    """
+    
+    def __init__(self, concurrency=DNS_CONCURRENCY, timeout=DNS_TIMEOUT):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.lookups = 0  # Résolutions effectuées
+        self.hits = 0  # Réponses servies par le cache
+        self._cache = {}  # {nom: Future de la liste des adresses}
+        self._lock = threading.Lock()
+        self._limit = None  # Sémaphore créé dans la boucle du moteur
+    
+    async def _lookup(self, name):
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._limit:
+                infos = await asyncio.wait_for(loop.getaddrinfo(name, None, type=socket.SOCK_STREAM),
+                                               self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return []
+        # Ordre de getaddrinfo conservé : la première adresse est celle que scanne nmap
+        return list(dict.fromkeys(info[4][0] for info in infos))
+    
+    def resolve_many(self, names):
+        """Résoudre plusieurs noms en parallèle
+
+        Returns:
+            dict: {nom: [adresses]}, liste vide si le nom ne se résout pas
+        """
+        futures = {}
+        with self._lock:
+            for name in names:
+                future = self._cache.get(name.lower())
+                if future is None:
+                    self.lookups += 1
+                    future = self._cache[name.lower()] = get_engine().run_coroutine(self._lookup(name))
+                else:
+                    self.hits += 1
+                futures[name] = future
+        return {name: future.result() for name, future in futures.items()}
+    
+    def resolve(self, name):
+        return self.resolve_many([name])[name]
+
+def grab_banner(host, port_nb, timeout=1.0):
+    """Empreinte de la bannière envoyée par un service TCP à la connexion
+
+    Returns:
+        str: sha256 de la première ligne reçue (vide si le service ne parle
+        pas en premier), ou None si la connexion échoue
+    """
+    try:
+        with socket.create_connection((host, int(port_nb)), timeout=timeout) as sock:
+            try:
+                data = sock.recv(256)
+            except socket.timeout:
+                data = b""
+    except OSError:
+        return None
+    return hashlib.sha256(data.split(b"\n", 1)[0]).hexdigest()
+
+def grab_banners(open_ports, workers=32):
+    """Empreintes des bannières {ip: {port: sha256}} pour [(ip, port), ...]"""
+    banners = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (ip, port_nb), banner_hash in zip(open_ports, pool.map(lambda p: grab_banner(*p), open_ports)):
+            if banner_hash is not None:
+                banners.setdefault(ip, {})[port_nb] = banner_hash
+    return banners
@@ -0,0 +1,378 @@
+"""Sorties de Recon Report : couleurs, rapports, sections et destinations des rapports"""
+import os
+import re
+import sys
+import json
+import tempfile
+import threading
+from datetime import datetime
+
+from .config import OUTPUT_MEMORY
+
+# Codes couleur ANSI
+class Colors:
+    RESET = '\033[0m'
+    BOLD = '\033[1m'
+    RED = '\033[91m'
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    MAGENTA = '\033[95m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+
+banner = f'''{Colors.CYAN}{Colors.BOLD}
+ ______                            ______                                
+(_____ \\                          (_____ \\                           _   
+ _____) )_____  ____ ___  ____     _____) )_____ ____   ___   ____ _| |_ 
+|  __  /| ___ |/ ___) _ \\|  _ \\   |  __  /| ___ |  _ \\ / _ \\ / ___|_   _)
+| |  \\ \\| ____( (__| |_| | | | |  | |  \\ \\| ____| |_| | |_| | |     | |_ 
+|_|   |_|_____)\\____)___/|_| |_|  |_|   |_|_____)  __/ \\___/|_|      \\__)
+                                                |_|                      
+{Colors.YELLOW}Recon Report V1.0
+{Colors.GREEN}Coded by David LE MEUR{Colors.RESET}
+'''
+
+CHUNK_SIZE = 64 * 1024  # Taille des blocs lus sur la sortie des outils
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+# Scanner, section et rapport en cours d'écriture (propres à chaque thread)
+_local = threading.local()
+
+def render_line(text, color=""):
+    """Ligne du rapport avec ses codes couleur (retirés par les sorties sans couleur)"""
+    return f"{color}{text}{Colors.RESET if color else ''}\n"
+
+class AnsiStripper:
+    """Retire les codes ANSI d'un texte reçu par blocs
+
+    Un code coupé entre deux blocs est gardé jusqu'au bloc suivant.
+    """
+    
+    def __init__(self):
+        self._pending = ""
+    
+    def feed(self, text):
+        text = self._pending + text
+        self._pending = ""
+        cut = text.rfind("\x1b")
+        if cut != -1 and len(text) - cut < 16 and not ANSI_RE.match(text, cut):
+            text, self._pending = text[:cut], text[cut:]
+        return ANSI_RE.sub("", text)
+    
+    def flush(self):
+        text, self._pending = self._pending, ""
+        return ANSI_RE.sub("", text)
+
+def new_spool(max_size=OUTPUT_MEMORY):
+    """Tampon texte gardé en mémoire jusqu'à max_size caractères, puis sur disque"""
+    return tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+', encoding='utf-8')
+
+def copy_spool(spool, write):
+    """Recopier un tampon par blocs (sans le charger en mémoire) puis le fermer"""
+    spool.seek(0)
+    while True:
+        chunk = spool.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        write(chunk)
+    spool.close()
+
+class ReportSink:
+    """Sortie des rapports
+
+    Reçoit le texte de chaque rapport par blocs, avec ses codes couleur :
+    une sortie sans couleur les retire une seule fois, à la réception.
+    """
+    
+    def open(self, report):
+        """Début du rapport d'une cible"""
+    
+    def write(self, report, text):
+        """Bloc de texte du rapport (une ou plusieurs lignes complètes ou non)"""
+        raise NotImplementedError
+    
+    def close(self, report):
+        """Fin du rapport d'une cible"""
+    
+    def shutdown(self):
+        """Fin de l'exécution : libérer les ressources de la sortie"""
+
+class TerminalSink(ReportSink):
+    """Rapports affichés dans le terminal, en couleur
+
+    Avec buffered=True (plusieurs cibles en parallèle), chaque rapport est
+    gardé dans un tampon et affiché d'un bloc à la fin de sa cible, sans se
+    mélanger à ceux des autres cibles.
+    """
+    
+    def __init__(self, buffered=False, write=None):
+        self.buffered = buffered
+        # Écriture dans le terminal (ProgressTracker.write pour la coordonner avec l'affichage)
+        self._write = write or write_stdout
+        self._spools = {}
+        self._lock = threading.Lock()
+    
+    def open(self, report):
+        if self.buffered:
+            self._spools[id(report)] = new_spool()
+    
+    def write(self, report, text):
+        spool = self._spools.get(id(report))
+        if spool is not None:
+            spool.write(text)
+        else:
+            self._write(text)
+    
+    def close(self, report):
+        spool = self._spools.pop(id(report), None)
+        if spool is not None:
+            with self._lock:
+                copy_spool(spool, self._write)
+
+class FileSink(ReportSink):
+    """Un fichier texte sans couleur par cible : Cible_AAAAMMJJ_HHMM.txt"""
+    
+    def __init__(self, directory=None):
+        self.directory = directory  # None : répertoire courant
+        self._files = {}
+    
+    def open(self, report):
+        now = datetime.now()
+        report.filename = f"{safe_filename(report.target)}_{now.strftime('%Y%m%d_%H%M')}.txt"
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            report.filename = os.path.join(self.directory, report.filename)
+        output_file = open(report.filename, 'w', encoding='utf-8')
+        output_file.write(ANSI_RE.sub("", banner) + "\n")
+        output_file.write(f"Target: {report.target}\n")
+        output_file.write(f"Date: {now.strftime('%Y-%m-%d %H:%M')}\n")
+        output_file.write("="*60 + "\n\n")
+        self._files[id(report)] = (output_file, AnsiStripper())
+    
+    def write(self, report, text):
+        output_file, stripper = self._files[id(report)]
+        output_file.write(stripper.feed(text))
+    
+    def close(self, report):
+        output_file, stripper = self._files.pop(id(report))
+        output_file.write(stripper.flush())
+        output_file.close()
+
+class JsonSink(ReportSink):
+    """Rapports en JSON Lines, sans couleur
+
+    Un objet {"target", "section", "text"} par bloc restitué ; les blocs
+    d'une section se suivent, section est null hors des étapes.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._strippers = {}
+        self._lock = threading.Lock()
+    
+    def open(self, report):
+        self._strippers[id(report)] = AnsiStripper()
+    
+    def write(self, report, text):
+        text = self._strippers[id(report)].feed(text)
+        if text:
+            line = json.dumps({'target': report.target, 'section': report.section, 'text': text},
+                              ensure_ascii=False)
+            with self._lock:
+                self._file.write(line + "\n")
+    
+    def close(self, report):
+        self.write(report, "")
+        text = self._strippers.pop(id(report)).flush()
+        with self._lock:
+            if text:
+                self._file.write(json.dumps({'target': report.target, 'section': report.section, 'text': text},
+                                            ensure_ascii=False) + "\n")
+            self._file.flush()
+    
+    def shutdown(self):
+        self._file.close()
+
+class MultiSink(ReportSink):
+    """Envoi des rapports à plusieurs sorties"""
+    
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+    
+    def open(self, report):
+        for sink in self.sinks:
+            sink.open(report)
+    
+    def write(self, report, text):
+        for sink in self.sinks:
+            sink.write(report, text)
+    
+    def close(self, report):
+        for sink in self.sinks:
+            sink.close(report)
+    
+    def shutdown(self):
+        for sink in self.sinks:
+            sink.shutdown()
+
+def make_report_sink(mode, buffered=False, json_path=None, write=None, directory=None):
+    """Sortie des rapports : terminal ou fichiers (dans directory), plus JSON Lines si json_path"""
+    sinks = [FileSink(directory) if mode == "file" else TerminalSink(buffered, write)]
+    if json_path:
+        sinks.append(JsonSink(json_path))
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+
+REPORT_BUFFER = 64 * 1024  # Texte du rapport accumulé avant envoi à la sortie (caractères)
+
+class Report:
+    """Rapport d'une cible, transmis à une sortie (ReportSink)
+
+    Les écritures sont regroupées et transmises à la sortie par blocs de
+    REPORT_BUFFER caractères, et à chaque changement de section.
+    """
+    
+    def __init__(self, target, sink):
+        self.target = target
+        self.sink = sink
+        self.filename = None  # Fichier du rapport (renseigné par FileSink)
+        self.section = None  # Section en cours de restitution
+        self._buffer = []
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def open(self):
+        self.sink.open(self)
+        return self
+    
+    def write(self, text, color=""):
+        self.write_raw(render_line(text, color))
+    
+    def write_raw(self, text):
+        """Écrire du texte déjà mis en forme (ou une sortie brute d'outil)"""
+        with self._lock:
+            self._buffer.append(text)
+            self._size += len(text)
+            if self._size >= REPORT_BUFFER:
+                self._flush()
+    
+    def _flush(self):
+        if self._buffer:
+            self.sink.write(self, "".join(self._buffer))
+            self._buffer = []
+            self._size = 0
+    
+    def flush(self):
+        with self._lock:
+            self._flush()
+    
+    def begin_section(self, name):
+        """Restitution de la section d'une étape (None : hors section)"""
+        with self._lock:
+            self._flush()
+            self.section = name
+    
+    def close(self):
+        """Transmettre la fin du rapport et le fermer"""
+        with self._lock:
+            self._flush()
+            self.section = None
+            self.sink.close(self)
+
+class Section:
+    """Section du rapport produite par une étape
+
+    Les lignes sont gardées dans un tampon qui passe sur disque au-delà de
+    max_size caractères : une sortie d'outil volumineuse n'occupe pas la
+    mémoire en attendant que la section soit restituée à son tour dans le
+    rapport.
+    """
+    
+    def __init__(self, max_size=OUTPUT_MEMORY):
+        self.records = []  # Enregistrements structurés produits dans la section
+        self._spool = new_spool(max_size)
+        self._lock = threading.Lock()
+    
+    def write(self, text, color=""):
+        self.write_raw(render_line(text, color))
+    
+    def write_raw(self, text):
+        # Le moteur écrit depuis sa boucle, l'étape depuis son thread
+        with self._lock:
+            self._spool.write(text)
+    
+    def save(self, path):
+        """Copier le texte de la section dans un fichier (la section reste utilisable)"""
+        with self._lock, open(path, 'w', encoding='utf-8') as f:
+            self._spool.seek(0)
+            while True:
+                chunk = self._spool.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+            self._spool.seek(0, os.SEEK_END)
+    
+    def copy_to(self, report):
+        """Restituer la section dans le rapport et libérer le tampon"""
+        if isinstance(report, Section):
+            report.records.extend(self.records)
+        with self._lock:
+            copy_spool(self._spool, report.write_raw)
+
+class LineTee:
+    """Sink qui transmet la sortie à un autre sink et appelle on_lines avec
+    chaque bloc de lignes complètes (analyse au fil de l'eau, sans garder la
+    sortie en mémoire)"""
+    
+    def __init__(self, sink, on_lines):
+        self.sink = sink
+        self.on_lines = on_lines
+        self._pending = ""
+    
+    def write_raw(self, text):
+        self.sink.write_raw(text)
+        block, newline, self._pending = (self._pending + text).rpartition("\n")
+        if newline:
+            self.on_lines(block)
+    
+    def close(self):
+        if self._pending:
+            self.on_lines(self._pending)
+            self._pending = ""
+
+def safe_filename(name):
+    """Nom de fichier utilisable à partir d'une cible (ex: réseau CIDR)"""
+    return "".join(c if c.isalnum() or c in ".-" else "_" for c in name)
+
+def write_stdout(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+def current_scanner():
+    """Scanner (ReconScanner) dont ce thread exécute le travail"""
+    scanner = getattr(_local, "scanner", None)
+    if scanner is None:
+        raise RuntimeError("aucun scanner actif dans ce thread")
+    return scanner
+
+def current_report():
+    """Rapport de la cible traitée par ce thread"""
+    return _local.report
+
+def current_sink():
+    """Destination de la sortie dans ce thread : section de l'étape en cours, sinon rapport"""
+    return getattr(_local, "section", None) or current_report()
+
+def write_output(text, color=""):
+    """Fonction pour écrire soit dans le terminal soit dans un fichier
+
+    Si une étape est en cours dans ce thread, la ligne est écrite dans sa
+    section et sera restituée dans l'ordre du rapport.
+    """
+    current_sink().write(text, color)
+
+def write_raw(text):
+    """Comme write_output, pour la sortie brute d'un outil"""
+    current_sink().write_raw(text)
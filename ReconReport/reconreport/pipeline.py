@@ -0,0 +1,359 @@
+"""Pipeline de Recon Report : étapes, ordonnanceur, points de reprise et états des cibles"""
+import os
+import json
+from datetime import datetime
+from concurrent.futures import CancelledError, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .budget import Budget
+from .engine import engine_stopped, stop_engine
+from .output import (CHUNK_SIZE, Colors, Section, _local, current_report, current_scanner,
+                     safe_filename, write_output)
+from .results import write_record
+
+class Stage:
+    """Étape du pipeline : une fonction, ses dépendances et sa section du rapport
+
+    depends : étapes qui doivent être terminées avant de démarrer.
+    consumes : étapes productrices qui doivent seulement avoir démarré ;
+    l'étape consomme leurs résultats au fil de l'eau via une file de ctx.
+    outputs : clés de ctx produites par l'étape, enregistrées dans son point
+    de reprise (sous leur forme as_json le cas échéant) ; restore(ctx) est
+    appelée quand l'étape est reprise au lieu d'être exécutée (par exemple
+    pour reconstruire ces objets ou alimenter les files de ses consommateurs).
+    timeout : temps maximal de l'étape (secondes, None = illimité), borné par
+    le budget de la cible. min_time : temps restant en deçà duquel l'étape
+    n'est pas lancée ; les étapes les moins prioritaires ont le plus grand.
+    """
+    
+    def __init__(self, name, func, depends=(), consumes=(), outputs=(), restore=None, timeout=None, min_time=0):
+        self.name = name
+        self.func = func  # func(ctx), ctx étant le dictionnaire partagé de la cible
+        self.depends = tuple(depends)
+        self.consumes = tuple(consumes)
+        self.outputs = tuple(outputs)
+        self.restore = restore
+        self.timeout = timeout
+        self.min_time = min_time
+
+class StageScheduler:
+    """Ordonnanceur d'étapes tenant compte des dépendances
+
+    Une étape démarre dès que toutes ses dépendances sont terminées, dans la
+    limite de max_workers étapes simultanées. La sortie de chaque étape est
+    mise en tampon puis restituée dans l'ordre de déclaration des étapes,
+    quel que soit l'ordre dans lequel elles se terminent.
+
+    Avec un budget (Budget de la cible), une étape qui n'a plus assez de
+    temps (min_time) est ignorée, et chaque étape s'arrête à son échéance :
+    elle est alors marquée partielle (partial) au lieu d'être en erreur.
+
+    Après un Ctrl-C (stop_engine), les étapes en attente ne sont plus
+    lancées : elles sont en erreur, comme celles dont les outils ont été tués.
+    """
+    
+    def __init__(self, stages, max_workers=3):
+        names = [stage.name for stage in stages]
+        for stage in stages:
+            for dep in stage.depends + stage.consumes:
+                if dep not in names or names.index(dep) >= names.index(stage.name):
+                    raise ValueError(f"Dépendance invalide pour l'étape {stage.name} : {dep}")
+        self.stages = list(stages)
+        self.max_workers = max(1, max_workers)
+    
+    def _run_stage(self, stage, ctx, scanner, report, checkpoints, budget):
+        """Exécuter une étape en capturant sa section du rapport"""
+        _local.scanner = scanner
+        _local.report = report
+        _local.section = Section(scanner.output_memory)
+        _local.budget = stage_budget = Budget(stage.timeout, parent=budget)
+        instrumentation = scanner.instrumentation
+        span = _local.span = instrumentation.begin("stage", stage.name, report.target) \
+            if instrumentation is not None else None
+        error = None
+        try:
+            stage.func(ctx)
+        except CancelledError:
+            # Outils arrêtés par close_engine() (Ctrl-C, fin du programme)
+            error = RuntimeError("étape interrompue")
+            write_output(f"\n Étape {stage.name} interrompue", Colors.RED + Colors.BOLD)
+        except Exception as e:
+            error = e
+            write_output(f"\n Erreur lors de l'étape {stage.name}: {e}", Colors.RED + Colors.BOLD)
+        finally:
+            section = _local.section
+            _local.section = None
+            _local.report = None
+            _local.scanner = None
+            _local.budget = None
+            _local.span = None
+        if error is None and engine_stopped():
+            # Terminée après un Ctrl-C : son résultat peut être incomplet (file fermée, outil tué)
+            error = RuntimeError("étape interrompue")
+        if error is None and stage_budget.failures:
+            # Échecs déjà écrits dans la section par les outils
+            error = RuntimeError("; ".join(stage_budget.failures))
+        partial = stage_budget.cut_short
+        if span is not None:
+            instrumentation.end(span, "error" if error is not None else "partial" if partial else "ok")
+        if partial:
+            section.write(f"\n[PARTIEL] Étape {stage.name} écourtée : {'; '.join(partial)}",
+                          Colors.YELLOW + Colors.BOLD)
+        # Une étape écourtée ou en erreur n'a pas de point de reprise : elle sera relancée à la reprise
+        if error is None and not partial and checkpoints is not None:
+            try:
+                checkpoints.save(stage, ctx, section)
+            except (OSError, TypeError, ValueError) as e:
+                section.write(f"\n Point de reprise de l'étape {stage.name} non enregistré : {e}", Colors.YELLOW)
+        return section, error, partial
+    
+    def _restore_stage(self, stage, ctx, saved):
+        """Reprendre une étape depuis son point de reprise, sans l'exécuter"""
+        ctx.update(saved['outputs'])
+        section = checkpoints_section(saved)
+        for record in section.records:
+            write_record(record)
+        if stage.restore is not None:
+            stage.restore(ctx)
+        return section
+    
+    def _skip_stage(self, stage, reason, pending, skipped, partial, sections, progress):
+        """Ignorer une étape faute de temps : section marquée partielle, sans erreur"""
+        pending.remove(stage)
+        skipped.add(stage.name)
+        partial[stage.name] = [f"ignorée ({reason})"]
+        progress.count('stages_done')
+        sections[stage.name] = Section()
+        sections[stage.name].write(f"\n[PARTIEL] Étape {stage.name} ignorée ({reason})", Colors.YELLOW + Colors.BOLD)
+    
+    def run(self, ctx, checkpoints=None, budget=None):
+        """Exécuter toutes les étapes
+
+        Les étapes qui ont un point de reprise (checkpoints) ne sont pas
+        exécutées : leurs résultats et leur section en sont restaurés. Les
+        étapes écourtées ou ignorées faute de temps sont listées dans
+        ctx['partial'] ({étape: [raisons]}).
+
+        Returns:
+            dict: erreurs par nom d'étape (vide si tout s'est bien passé)
+        """
+        scanner = current_scanner()
+        progress = scanner.progress
+        report = current_report()
+        pending = list(self.stages)
+        started = set()
+        done = set()
+        skipped = set()  # Ignorées faute de temps
+        partial = ctx.setdefault('partial', {})
+        errors = {}
+        sections = {}
+        running = {}
+        next_flush = 0
+        progress.count('stages_total', len(self.stages))
+        
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                if engine_stopped():
+                    # Exécution interrompue : seules les étapes en cours se terminent
+                    for stage in pending:
+                        progress.count('stages_done')
+                        errors[stage.name] = RuntimeError("exécution interrompue")
+                        sections[stage.name] = Section()
+                        sections[stage.name].write(f"\nÉtape {stage.name} non lancée (exécution interrompue)",
+                                                   Colors.YELLOW)
+                    pending.clear()
+                # Lancer (ou ignorer) les étapes dont les dépendances sont résolues
+                for stage in list(pending):
+                    failed = [dep for dep in stage.depends + stage.consumes if dep in errors]
+                    if not failed and any(dep in skipped for dep in stage.consumes):
+                        # Producteur ignoré : la file de l'étape ne serait jamais alimentée
+                        reason = f"dépendance ignorée : {', '.join(d for d in stage.consumes if d in skipped)}"
+                        self._skip_stage(stage, reason, pending, skipped, partial, sections, progress)
+                    elif failed:
+                        pending.remove(stage)
+                        progress.count('stages_done')
+                        errors[stage.name] = RuntimeError(f"dépendance en échec : {', '.join(failed)}")
+                        sections[stage.name] = Section()
+                        sections[stage.name].write(f"\nÉtape {stage.name} ignorée "
+                                                   f"(dépendance en échec : {', '.join(failed)})", Colors.YELLOW)
+                    elif all(dep in done or dep in skipped for dep in stage.depends) and \
+                            all(dep in started for dep in stage.consumes):
+                        # Les producteurs sont soumis avant leurs consommateurs :
+                        # le pool étant FIFO, ils obtiennent toujours un thread
+                        saved = checkpoints.load(stage.name) if checkpoints is not None else None
+                        remaining = budget.remaining() if budget is not None else None
+                        if saved is not None:
+                            pending.remove(stage)
+                            started.add(stage.name)
+                            sections[stage.name] = self._restore_stage(stage, ctx, saved)
+                            done.add(stage.name)
+                            progress.count('stages_done')
+                        elif remaining is not None and (remaining <= 0 or remaining < stage.min_time):
+                            reason = f"temps restant insuffisant : {remaining:.0f}s" + \
+                                     (f" pour {stage.min_time}s nécessaires" if stage.min_time else "")
+                            self._skip_stage(stage, reason, pending, skipped, partial, sections, progress)
+                        else:
+                            pending.remove(stage)
+                            started.add(stage.name)
+                            running[pool.submit(self._run_stage, stage, ctx, scanner, report, checkpoints,
+                                                budget)] = stage
+                
+                if running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        stage = running.pop(future)
+                        progress.count('stages_done')
+                        section, error, cut = future.result()
+                        sections[stage.name] = section
+                        if cut:
+                            partial[stage.name] = cut
+                        if error is not None:
+                            errors[stage.name] = error
+                        else:
+                            done.add(stage.name)
+                
+                # Restituer les sections prêtes, dans l'ordre de déclaration
+                while next_flush < len(self.stages) and self.stages[next_flush].name in sections:
+                    name = self.stages[next_flush].name
+                    report.begin_section(name)
+                    sections.pop(name).copy_to(report)
+                    report.begin_section(None)
+                    next_flush += 1
+        except KeyboardInterrupt:
+            # Tuer les outils avant d'abandonner le pool : les étapes en cours se terminent aussitôt
+            stop_engine()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+        
+        # Étapes partielles dans l'ordre de déclaration, comme les sections
+        ordered = {stage.name: partial[stage.name] for stage in self.stages if stage.name in partial}
+        partial.clear()
+        partial.update(ordered)
+        return errors
+
+class Checkpoints:
+    """Points de reprise d'une cible : un par étape terminée
+
+    Pour chaque étape, sa section du rapport (<étape>.txt) puis ses
+    résultats structurés et les clés de ctx qu'elle produit (<étape>.json).
+    Le fichier JSON est écrit en dernier, de façon atomique : il n'existe
+    que si le point de reprise est complet.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, name, ext):
+        return os.path.join(self.directory, f"{name}.{ext}")
+    
+    def load_json(self, name):
+        try:
+            with open(self._path(name, "json"), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def save_json(self, name, data):
+        path = self._path(name, "json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f, default=json_default)
+        os.replace(path + ".tmp", path)
+    
+    def load(self, stage_name):
+        """Point de reprise de l'étape, ou None si elle n'est pas terminée"""
+        saved = self.load_json(stage_name)
+        if saved is not None:
+            saved['text'] = self._path(stage_name, "txt")
+        return saved
+    
+    def save(self, stage, ctx, section):
+        section.save(self._path(stage.name, "txt"))
+        self.save_json(stage.name, {
+            'stage': stage.name,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'outputs': {key: ctx[key] for key in stage.outputs if key in ctx},
+            'records': section.records,
+        })
+
+def json_default(value):
+    """Forme JSON des objets de ctx qui en ont une (as_json : PortStore, PortRecord)"""
+    if hasattr(value, "as_json"):
+        return value.as_json()
+    raise TypeError(f"{type(value).__name__} n'est pas sérialisable en JSON")
+
+def checkpoints_section(saved):
+    """Section du rapport reconstruite à partir d'un point de reprise"""
+    section = Section()
+    section.records = saved['records']
+    with open(saved['text'], encoding='utf-8') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            section.write_raw(chunk)
+    return section
+
+def create_run(runs_dir, targets):
+    """Créer le répertoire d'une nouvelle exécution
+
+    Returns:
+        str: chemin du répertoire (son nom est l'identifiant de l'exécution)
+    """
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(runs_dir, run_id)
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(runs_dir, f"{run_id}_{suffix}")
+    os.makedirs(path)
+    with open(os.path.join(path, "run.json"), 'w', encoding='utf-8') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'targets': targets}, f)
+    return path
+
+def load_run(spec, runs_dir):
+    """Exécution à reprendre, par identifiant (dans runs_dir) ou chemin
+
+    Returns:
+        tuple: (chemin, cibles de l'exécution)
+    """
+    path = spec if os.path.isdir(spec) else os.path.join(runs_dir, spec)
+    with open(os.path.join(path, "run.json"), encoding='utf-8') as f:
+        return path, json.load(f)['targets']
+
+def state_path(state_dir, target):
+    return os.path.join(state_dir, f"{safe_filename(target)}.json")
+
+def load_state(state_dir, target):
+    """État structuré du précédent scan de la cible, ou None"""
+    try:
+        with open(state_path(state_dir, target), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_state(state_dir, target, ctx):
+    """Enregistrer (de façon atomique) l'état structuré du scan de la cible
+
+    Si amass n'a pas tourné (étape ignorée, sous-domaine à la profondeur
+    maximale), les sous-domaines de l'état précédent sont gardés : le
+    prochain diff ne les voit pas disparaître puis réapparaître.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    if 'subdomains' in ctx:
+        subdomains = ctx['subdomains']
+    else:
+        previous = ctx.get('previous') or load_state(state_dir, target) or {}
+        subdomains = previous.get('subdomains', [])
+    state = {
+        'target': target,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'hosts': ctx['result'].as_dict(),
+        'subdomains': subdomains,
+        'banners': ctx.get('banners', {}),
+    }
+    path = state_path(state_dir, target)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
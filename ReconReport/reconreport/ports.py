@@ -0,0 +1,157 @@
+"""Ports relevés par nmap : enregistrements compacts et index (PortStore)
+
+Seuls les champs utilisés sont gardés (pas de raison, de CPE, d'empreinte
+de service...), et les chaînes répétées d'un port à l'autre (adresses,
+numéros, noms de service, produits, versions) sont internées : la mémoire
+croît avec le nombre de ports, pas avec la taille du XML de nmap.
+"""
+import sys
+
+# Noms de service nmap des protocoles encapsulés dans TLS
+TLS_SERVICES = {"ssl", "https", "https-alt", "imaps", "pop3s", "ldaps", "smtps", "submissions",
+                "ftps", "ftps-data", "ircs", "nntps", "telnets", "xmpps", "sips", "ms-wbt-server-ssl"}
+
+def intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class PortRecord:
+    """Port d'un hôte ; service est None tant que nmap ne l'a pas identifié"""
+    
+    __slots__ = ("ip", "port", "protocol", "state", "service", "product", "version", "tunnel")
+    
+    FIELDS = __slots__
+    
+    def __init__(self, ip, port, protocol="tcp", state="open", service=None, product=None, version=None,
+                 tunnel=None):
+        self.ip = intern(ip)
+        self.port = intern(str(port))  # Numéro en texte, comme le portid de nmap
+        self.protocol = intern(protocol)
+        self.state = intern(state)
+        self.service = intern(service or None)
+        self.product = intern(product or None)
+        self.version = intern(version or None)
+        self.tunnel = intern(tunnel or None)
+    
+    @property
+    def key(self):
+        return (self.ip, self.port)
+    
+    @property
+    def is_tls(self):
+        """Service annoncé comme TLS par nmap (champ tunnel ou nom de service)"""
+        return self.tunnel == "ssl" or self.service in TLS_SERVICES
+    
+    @property
+    def is_web(self):
+        return self.service is not None and "http" in self.service
+    
+    @property
+    def label(self):
+        return " ".join(filter(None, [self.service, self.product, self.version])) or "Unknown"
+    
+    def as_json(self):
+        return [getattr(self, name) for name in self.FIELDS]
+    
+    @classmethod
+    def from_json(cls, row):
+        """PortRecord d'une ligne as_json, ou d'un ancien (ip, port, service nmap)"""
+        if len(row) == 3:
+            ip, port, service = row
+            service = service or {}
+            return cls(ip, port, service=service.get('name'), product=service.get('product'),
+                       version=service.get('version'), tunnel=service.get('tunnel'))
+        return cls(*row)
+    
+    @classmethod
+    def from_nmap(cls, ip, port):
+        """PortRecord d'un port au format nmap ({"portid", "protocol", "state", "service": {...}})"""
+        service = port.get('service') or {}
+        return cls(ip, port.get('portid'), port.get('protocol'), port.get('state'), service.get('name'),
+                   service.get('product'), service.get('version'), service.get('tunnel'))
+    
+    def as_nmap(self):
+        service = {name: getattr(self, field) for name, field in
+                   (("name", "service"), ("product", "product"), ("version", "version"), ("tunnel", "tunnel"))
+                   if getattr(self, field) is not None}
+        return {'protocol': self.protocol, 'portid': self.port, 'state': self.state, 'service': service}
+    
+    def __repr__(self):
+        return f"PortRecord({self.ip}:{self.port}/{self.protocol} {self.state} {self.label})"
+
+class PortStore:
+    """Ports d'une cible, indexés par hôte et par état
+
+    Un port ajouté une seconde fois (détection de versions après la
+    découverte) remplace le premier. Les ports ouverts (mode diff, compte
+    du rapport) sont une lecture d'index ; les scans de suivi, eux, sont
+    choisis port par port au fil de la sortie de nmap (is_tls, is_web).
+    """
+    
+    def __init__(self):
+        self.hostnames = {}  # {ip: [noms d'hôte]}
+        self._ports = {}  # {(ip, port): PortRecord}, dans l'ordre d'ajout
+        self._by_host = {}  # {ip: {port: PortRecord}}
+        self._by_state = {}  # {état: {(ip, port): PortRecord}}
+    
+    def add_host(self, ip, hostnames=()):
+        ip = intern(ip)
+        names = self.hostnames.setdefault(ip, [])
+        names.extend(intern(name) for name in hostnames if name not in names)
+        self._by_host.setdefault(ip, {})
+    
+    def add(self, record):
+        """Ajouter (ou remplacer) un port"""
+        key = record.key
+        previous = self._ports.pop(key, None)
+        if previous is not None:
+            self._by_state[previous.state].pop(key, None)
+        self.hostnames.setdefault(record.ip, [])
+        self._ports[key] = record
+        self._by_host.setdefault(record.ip, {})[record.port] = record
+        self._by_state.setdefault(record.state, {})[key] = record
+        return record
+    
+    def get(self, ip, port):
+        return self._ports.get((ip, str(port)))
+    
+    def __iter__(self):
+        return iter(list(self._ports.values()))
+    
+    def __len__(self):
+        return len(self._ports)
+    
+    def hosts(self):
+        """[(ip, [PortRecord])] dans l'ordre de découverte des hôtes"""
+        return [(ip, list(ports.values())) for ip, ports in self._by_host.items()]
+    
+    def with_state(self, state="open"):
+        """{(ip, port): PortRecord} des ports dans cet état"""
+        return dict(self._by_state.get(state, {}))
+    
+    def open_count(self):
+        return len(self._by_state.get("open", {}))
+    
+    def as_dict(self):
+        """Forme JSON (celle de nmap : {ip: {"hostname": [...], "ports": [...]}}) : cache, états, reprises"""
+        return {ip: {'hostname': [{'name': name} for name in self.hostnames.get(ip, [])],
+                     'ports': [record.as_nmap() for record in ports.values()]}
+                for ip, ports in self._by_host.items()}
+    
+    def as_json(self):
+        return self.as_dict()
+    
+    @classmethod
+    def from_dict(cls, data):
+        """PortStore d'un résultat au format nmap (as_dict, cache, état d'un scan précédent)
+
+        Les clés qui ne sont pas des hôtes (runtime, stats, task_results des
+        anciens résultats nmap3) sont ignorées.
+        """
+        store = cls()
+        for ip, host in (data or {}).items():
+            if ip in ("runtime", "stats", "task_results") or not isinstance(host, dict):
+                continue
+            store.add_host(ip, [name.get('name') for name in host.get('hostname', []) if name.get('name')])
+            for port in host.get('ports', []):
+                store.add(PortRecord.from_nmap(ip, port))
+        return store
@@ -0,0 +1,364 @@
+"""Suivi et affichage de la progression des scans"""
+import sys
+import json
+import time
+import shutil
+import threading
+import contextlib
+
+from .output import Colors, ANSI_RE, _local
+
+class ProgressTask:
+    """Tâche suivie par le ProgressTracker (une commande d'outil)"""
+    
+    def __init__(self, task_id, target, desc):
+        self.id = task_id
+        self.target = target
+        self.desc = desc
+        self.started = time.monotonic()
+        self.updated = self.started  # Dernière activité (progression ou sortie reçue)
+        self.percent = None  # Avancement mesuré, None si l'outil n'en donne pas
+        self.eta = None  # Temps restant estimé par l'outil (texte)
+        self.phase = None
+        self.detail = ""
+        self.output_bytes = 0
+        self.status = "running"
+    
+    def elapsed(self):
+        return time.monotonic() - self.started
+    
+    def idle(self):
+        return time.monotonic() - self.updated
+    
+    def as_dict(self):
+        return {
+            'task': self.id, 'target': self.target, 'desc': self.desc, 'status': self.status,
+            'percent': self.percent, 'eta': self.eta, 'phase': self.phase, 'detail': self.detail,
+            'output_bytes': self.output_bytes, 'elapsed': round(self.elapsed(), 1),
+            'idle': round(self.idle(), 1),
+        }
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def format_size(size):
+    for unit in ("o", "Ko", "Mo"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} Go"
+
+class ProgressTracker:
+    """Suivi de la progression réelle du scan
+
+    Les informations viennent des outils eux-mêmes (statistiques de nmap,
+    ports analysés, sortie reçue) et du pipeline (étapes et cibles
+    terminées). Un renderer les affiche : messages simples, affichage
+    multi-lignes pour un terminal, ou flux JSON Lines.
+    """
+    
+    def __init__(self, renderer=None):
+        self.renderer = renderer or PlainRenderer()
+        self.tasks = {}
+        self.started = time.monotonic()
+        self.counters = {'targets_total': 0, 'targets_done': 0, 'stages_total': 0, 'stages_done': 0}
+        self._lock = threading.Lock()
+        self._next_id = 0
+    
+    def start(self, desc, target=None):
+        """Démarrer le suivi d'une tâche"""
+        if target is None:
+            report = getattr(_local, "report", None)
+            target = report.target if report is not None else ""
+        with self._lock:
+            self._next_id += 1
+            task = ProgressTask(self._next_id, target, desc)
+            self.tasks[task.id] = task
+        self.renderer.event("start", task, self)
+        return task
+    
+    def update(self, task, **fields):
+        """Mettre à jour l'avancement d'une tâche (percent, eta, phase, detail)"""
+        for name, value in fields.items():
+            setattr(task, name, value)
+        task.updated = time.monotonic()
+        self.renderer.event("update", task, self)
+    
+    def output(self, task, size):
+        """Signaler de la sortie reçue (activité, sans avancement mesuré)"""
+        task.output_bytes += size
+        task.updated = time.monotonic()
+        self.renderer.event("output", task, self)
+    
+    def finish(self, task, status="done", detail=None):
+        """Terminer une tâche (status : done, cache, failed, timeout)"""
+        task.status = status
+        if detail is not None:
+            task.detail = detail
+        with self._lock:
+            self.tasks.pop(task.id, None)
+        self.renderer.event("finish", task, self)
+    
+    @contextlib.contextmanager
+    def track(self, desc, target=None):
+        """Suivre une tâche le temps d'un bloc (échec si une exception en sort)"""
+        task = self.start(desc, target)
+        try:
+            yield task
+        except BaseException:
+            self.finish(task, "failed")
+            raise
+        if task.status == "running":
+            self.finish(task)
+    
+    def nmap_stats(self, task):
+        """Callback on_stats de stream_nmap mettant à jour la tâche"""
+        return lambda stats: self.update(task, percent=stats['percent'], eta=stats['eta'],
+                                         phase=stats['phase'])
+    
+    def count(self, counter, amount=1):
+        """Compteurs du pipeline : cibles et étapes lancées / terminées"""
+        with self._lock:
+            self.counters[counter] += amount
+        self.renderer.event("counters", None, self)
+    
+    def log(self, message, color=""):
+        """Message d'état (hors rapport)"""
+        self.renderer.log(message, color, self)
+    
+    def write(self, text):
+        """Sortie du rapport dans le terminal, coordonnée avec l'affichage"""
+        self.renderer.write(text)
+    
+    def running(self):
+        with self._lock:
+            return list(self.tasks.values())
+    
+    def close(self):
+        self.renderer.close(self)
+
+class PlainRenderer:
+    """Messages de début et de fin de tâche, sans affichage dynamique"""
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+    
+    def event(self, kind, task, tracker):
+        if kind == "start":
+            self.log(f"{task.desc}...", "", tracker, symbol=f"{Colors.CYAN}[*]{Colors.RESET}")
+        elif kind == "finish":
+            labels = {"done": ("[✓]", Colors.GREEN, f"terminé ({task.elapsed():.1f}s)"),
+                      "cache": ("[✓]", Colors.GREEN, "(cache)"),
+                      "timeout": ("[!]", Colors.RED, "délai dépassé"),
+                      "failed": ("[!]", Colors.RED, "échec")}
+            symbol, color, label = labels.get(task.status, labels["done"])
+            detail = f" - {task.detail}" if task.detail else ""
+            self.log(f"{task.desc} {label}{detail}", "", tracker, symbol=f"{color}{symbol}{Colors.RESET}")
+    
+    def log(self, message, color, tracker, symbol=None):
+        line = f"{symbol} {message}" if symbol else f"{color}{message}{Colors.RESET if color else ''}"
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+    
+    def write(self, text):
+        with self._lock:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+    
+    def close(self, tracker):
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+class TerminalRenderer(PlainRenderer):
+    """Affichage multi-lignes rafraîchi en place (terminal interactif)
+
+    Une ligne par tâche en cours, avec l'avancement mesuré quand l'outil en
+    donne un, sinon le temps écoulé et la sortie reçue ; une tâche sans
+    activité depuis STALL_AFTER secondes est signalée. L'en-tête donne le
+    nombre de cibles et d'étapes terminées.
+    """
+    
+    STALL_AFTER = 60
+    MAX_LINES = 12
+    
+    def __init__(self, stream=None, interval=0.5):
+        super().__init__(stream or sys.stderr)
+        self.interval = interval
+        self._drawn = 0  # Nombre de lignes d'affichage actuellement à l'écran
+        self._at_line_start = True
+        self._tracker = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def event(self, kind, task, tracker):
+        if self._thread is None:
+            self._tracker = tracker
+            self._thread = threading.Thread(target=self._refresh_loop, name="progress", daemon=True)
+            self._thread.start()
+        if kind == "finish":
+            # Garder une trace des tâches terminées au-dessus de l'affichage
+            super().event(kind, task, tracker)
+    
+    def log(self, message, color, tracker, symbol=None):
+        with self._lock:
+            self._erase()
+        super().log(message, color, tracker, symbol)
+    
+    def write(self, text):
+        # Le rapport (stdout) partage le terminal avec l'affichage (stderr) :
+        # effacer l'affichage avant d'écrire, il est redessiné au tick suivant
+        with self._lock:
+            self._erase()
+            self.stream.flush()
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            if text:
+                self._at_line_start = text.endswith("\n")
+    
+    def _erase(self):
+        if self._drawn:
+            self.stream.write(f"\x1b[{self._drawn}F\x1b[J")
+            self._drawn = 0
+    
+    def _bar(self, percent, width=20):
+        filled = int(percent / 100 * width)
+        return '━' * filled + '░' * (width - filled)
+    
+    def _lines(self, tracker):
+        columns = shutil.get_terminal_size().columns
+        counters = tracker.counters
+        header = (f"{Colors.CYAN}{Colors.BOLD}Progression{Colors.RESET} "
+                  f"{format_duration(time.monotonic() - tracker.started)} | "
+                  f"étapes {counters['stages_done']}/{counters['stages_total']}")
+        if counters['targets_total'] > 1:
+            header += f" | cibles {counters['targets_done']}/{counters['targets_total']}"
+        lines = [header]
+        
+        tasks = tracker.running()
+        for task in tasks[:self.MAX_LINES]:
+            if task.percent is not None:
+                state = f"{self._bar(task.percent)} {task.percent:5.1f}%"
+                if task.eta:
+                    state += f" reste {task.eta}"
+            else:
+                state = f"{format_duration(task.elapsed())}"
+            if task.phase:
+                state += f" [{task.phase}]"
+            if task.detail:
+                state += f" {task.detail}"
+            elif task.output_bytes:
+                state += f" {format_size(task.output_bytes)}"
+            stalled = task.idle() > self.STALL_AFTER
+            if stalled:
+                state = f"inactif depuis {format_duration(task.idle())} | {state}"
+            # Tronquer à la largeur du terminal : une ligne repliée fausserait l'effacement
+            line = f"  {task.target[:18]:<18} {task.desc[:30]:<30} {state}"[:columns - 1]
+            lines.append(f"{Colors.RED}{line}{Colors.RESET}" if stalled else line)
+        if len(tasks) > self.MAX_LINES:
+            lines.append(f"  ... et {len(tasks) - self.MAX_LINES} autres tâches")
+        return lines
+    
+    def _refresh_loop(self):
+        while not self._stop.wait(self.interval):
+            self._redraw()
+    
+    def _redraw(self):
+        with self._lock:
+            if not self._at_line_start:
+                return
+            self._erase()
+            lines = self._lines(self._tracker)
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+            self._drawn = len(lines)
+    
+    def close(self, tracker):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._erase()
+            self.stream.flush()
+        super().close(tracker)
+
+class JsonRenderer(PlainRenderer):
+    """Flux de progression JSON Lines (usage non interactif)
+
+    Un objet JSON par ligne : début et fin de tâche, avancement (au plus
+    une mise à jour par tâche et par seconde), compteurs et messages, plus
+    l'état de toutes les tâches en cours toutes les HEARTBEAT secondes
+    (champ idle : secondes sans activité, pour repérer une étape bloquée).
+    """
+    
+    UPDATE_INTERVAL = 1.0
+    HEARTBEAT = 10.0
+    
+    def __init__(self, stream=None):
+        super().__init__(stream or sys.stderr)
+        self._last_update = {}
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _heartbeat_loop(self, tracker):
+        while not self._stop.wait(self.HEARTBEAT):
+            self._emit({'event': "tasks", 'tasks': [task.as_dict() for task in tracker.running()]})
+    
+    def close(self, tracker):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        super().close(tracker)
+    
+    def _emit(self, record):
+        record = dict(record, ts=round(time.time(), 3))
+        with self._lock:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.stream.flush()
+    
+    def event(self, kind, task, tracker):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._heartbeat_loop, args=(tracker,),
+                                            name="progress", daemon=True)
+            self._thread.start()
+        if kind == "counters":
+            self._emit(dict(event="counters", **tracker.counters))
+            return
+        if kind in ("update", "output"):
+            now = time.monotonic()
+            if now - self._last_update.get(task.id, 0) < self.UPDATE_INTERVAL:
+                return
+            self._last_update[task.id] = now
+            kind = "update"
+        elif kind == "finish":
+            self._last_update.pop(task.id, None)
+        self._emit(dict(event=kind, **task.as_dict()))
+    
+    def log(self, message, color, tracker, symbol=None):
+        self._emit({'event': "log", 'message': ANSI_RE.sub("", message).strip()})
+    
+
+class ProgressSink:
+    """Sink qui signale au ProgressTracker la sortie reçue d'une tâche"""
+    
+    def __init__(self, sink, task, tracker):
+        self.sink = sink
+        self.task = task
+        self.tracker = tracker
+    
+    def write_raw(self, text):
+        self.tracker.output(self.task, len(text))
+        self.sink.write_raw(text)
+
+def make_renderer(mode, progress_file=None):
+    """Renderer de progression : auto, tty, json ou plain"""
+    if mode == "auto":
+        mode = "json" if progress_file or not sys.stderr.isatty() else "tty"
+    if mode == "tty":
+        return TerminalRenderer()
+    stream = open(progress_file, 'a', encoding='utf-8') if progress_file else None
+    if mode == "json":
+        return JsonRenderer(stream)
+    return PlainRenderer(stream)
@@ -0,0 +1,187 @@
+"""Résultats structurés : enregistrements, rendu texte et sorties (JSON Lines, SQLite)"""
+import json
+import threading
+from datetime import datetime
+
+from .output import Colors, Section, current_report, current_scanner, current_sink
+
+# Modèle de résultats structuré
+#
+# Chaque résultat est un enregistrement {"type", "target", champs...} :
+# le rapport texte en est le rendu, et les mêmes enregistrements partent vers
+# les sorties structurées (JSON Lines, SQLite).
+RECORD_FIELDS = {
+    'host': ["ip", "hostnames"],
+    'port': ["ip", "port", "protocol", "state", "service", "product", "version", "tunnel"],
+    'tls': ["ip", "port", "fingerprint", "duplicate_of", "protocols", "ciphers", "subject", "issuer", "not_after"],
+    'web': ["url", "status", "title", "plugins"],
+    'subdomain': ["name"],
+    'target': ["duration", "open_ports", "tls_endpoints", "errors", "partial"],
+}
+
+def render_host(record, sink):
+    sink.write(f"\n{'='*60}", Colors.CYAN)
+    sink.write(f"====== IP: {record['ip']} ======", Colors.CYAN + Colors.BOLD)
+    sink.write(f"{'='*60}", Colors.CYAN)
+    sink.write(f"\n###*** SCAN DE PORTS ***###", Colors.MAGENTA + Colors.BOLD)
+
+def render_port(record, sink):
+    def field(name):
+        return record[name] if record[name] is not None else "Unknown"
+    
+    sink.write(f"\n------ PORT {record['port']} ------", Colors.YELLOW + Colors.BOLD)
+    # Couleur selon l'état du port
+    sink.write(f"STATUT : {record['state']}", Colors.GREEN if record['state'] == "open" else Colors.RED)
+    sink.write(f"SERVICE : {field('service')}", Colors.WHITE)
+    sink.write(f"TYPE : {field('product')}", Colors.WHITE)
+    sink.write(f"VERSION : {field('version')}", Colors.WHITE)
+
+def render_tls(record, sink):
+    if record['duplicate_of']:
+        sink.write(f"Certificat identique à celui de {record['duplicate_of']} "
+                   f"(SHA-256 {record['fingerprint'][:16]}...) : pas de nouvel sslscan", Colors.YELLOW)
+        return
+    enabled = [name for name, on in (record['protocols'] or {}).items() if on]
+    if enabled:
+        sink.write(f"Protocoles actifs : {', '.join(enabled)}", Colors.WHITE)
+    if record['fingerprint']:
+        sink.write(f"Empreinte du certificat (SHA-256) : {record['fingerprint']}", Colors.WHITE)
+
+# Rendu texte de chaque type d'enregistrement (les autres types n'apparaissent
+# dans le rapport texte qu'à travers la sortie brute de l'outil)
+RECORD_RENDERERS = {
+    'host': render_host,
+    'port': render_port,
+    'tls': render_tls,
+}
+
+def emit(kind, sink=None, target=None, **fields):
+    """Enregistrer un résultat structuré et l'écrire dans le rapport texte
+
+    Args:
+        kind: Type d'enregistrement (clé de RECORD_FIELDS)
+        sink: Destination du rendu texte (défaut : current_sink())
+        target: Cible du résultat (défaut : celle du rapport en cours)
+
+    Returns:
+        dict: l'enregistrement
+    """
+    record = {'type': kind, 'target': target if target is not None else current_report().target}
+    for name in RECORD_FIELDS[kind]:
+        record[name] = fields.get(name)
+    
+    sink = sink or current_sink()
+    renderer = RECORD_RENDERERS.get(kind)
+    if renderer is not None:
+        renderer(record, sink)
+    if isinstance(sink, Section):
+        # Gardé avec la section pour le point de reprise de l'étape
+        sink.records.append(record)
+    write_record(record)
+    return record
+
+def write_record(record):
+    """Transmettre un enregistrement aux sorties structurées du scanner actif"""
+    for writer in current_scanner().result_writers:
+        writer.write(record)
+
+class ResultList(list):
+    """Sortie structurée en mémoire : les enregistrements dans une liste"""
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+    
+    def write(self, record):
+        with self._lock:
+            self.append(record)
+    
+    def close(self):
+        pass
+
+class JsonLinesWriter:
+    """Sortie structurée au format JSON Lines (un enregistrement par ligne, au fil de l'eau)"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+    
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+# Tables SQLite des enregistrements et index des colonnes interrogées le plus souvent
+RECORD_TABLES = {'host': "hosts", 'port': "ports", 'tls': "tls", 'web': "web",
+                 'subdomain': "subdomains", 'target': "targets"}
+RECORD_INDEXES = [("hosts", "ip"), ("ports", "ip"), ("ports", "port"), ("ports", "service"),
+                  ("ports", "state"), ("tls", "fingerprint"), ("web", "url"), ("subdomains", "name")]
+INTEGER_COLUMNS = {"port", "status", "open_ports", "tls_endpoints"}
+
+class ResultDatabase:
+    """Sortie structurée dans une base SQLite indexée
+
+    Les enregistrements sont insérés par lots (BATCH_SIZE, ou à la
+    fermeture) dans une table par type. Chaque exécution a son numéro (table
+    runs, colonne run) : plusieurs exécutions peuvent alimenter la même base.
+    Les champs composés (listes, dictionnaires) sont stockés en JSON. Les
+    colonnes ajoutées depuis la création d'une base existante y sont ajoutées
+    à l'ouverture.
+    """
+    
+    BATCH_SIZE = 500
+    
+    def __init__(self, path):
+        import sqlite3  # Chargé seulement si la sortie SQLite est demandée
+        
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = []
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, started TEXT)")
+            for kind, table in RECORD_TABLES.items():
+                columns = ", ".join(f"{name} {'INTEGER' if name in INTEGER_COLUMNS else 'TEXT'}"
+                                    for name in RECORD_FIELDS[kind])
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (run INTEGER, target TEXT, {columns})")
+                existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                for name in RECORD_FIELDS[kind]:
+                    if name not in existing:
+                        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} "
+                                           f"{'INTEGER' if name in INTEGER_COLUMNS else 'TEXT'}")
+            for table, column in RECORD_INDEXES:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})")
+            self.run = self._conn.execute("INSERT INTO runs (started) VALUES (?)",
+                                          (datetime.now().isoformat(timespec='seconds'),)).lastrowid
+    
+    def write(self, record):
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self.BATCH_SIZE:
+                self._flush()
+    
+    def _flush(self):
+        batches = {}
+        for record in self._pending:
+            values = [record[name] for name in RECORD_FIELDS[record['type']]]
+            values = [json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+                      for value in values]
+            batches.setdefault(record['type'], []).append((self.run, record['target'], *values))
+        self._pending = []
+        with self._conn:
+            for kind, rows in batches.items():
+                columns = ", ".join(["run", "target", *RECORD_FIELDS[kind]])
+                placeholders = ", ".join("?" * (len(RECORD_FIELDS[kind]) + 2))
+                self._conn.executemany(f"INSERT INTO {RECORD_TABLES[kind]} ({columns}) VALUES ({placeholders})",
+                                       rows)
+    
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
@@ -0,0 +1,464 @@
+"""Scanner Recon Report : configuration, sorties et ressources d'une exécution (ReconScanner)"""
+import os
+import sys
+import time
+import queue
+import asyncio
+import ipaddress
+import threading
+import contextlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .config import (STAGES, OUTPUT_MEMORY, JOBS, WORKERS, SWEEP_CONCURRENCY, SWEEP_TIMEOUT, SSL_WORKERS,
+                     TLS_PROBE_TIMEOUT, WEB_BATCH_SIZE, WEB_BATCH_WAIT, FANOUT_MAX_HOSTS, DNS_CONCURRENCY,
+                     DNS_TIMEOUT)
+from .budget import Budget
+from .engine import stop_engine
+from .network import DnsResolver
+from .output import Colors, Report, _local, make_report_sink, safe_filename, write_output
+from .pipeline import StageScheduler, Checkpoints, load_state, save_state
+from .progress import ProgressTracker
+from .results import emit
+from .stages import build_stages, check_stages, count_open_ports
+
+def expand_targets(specs, input_list=None):
+    """Liste des cibles à partir des arguments et d'un fichier de cibles
+
+    Les réseaux CIDR sont développés en adresses d'hôtes, "-" lit les cibles
+    sur l'entrée standard. Les lignes vides et les commentaires (#) sont
+    ignorés et les doublons supprimés en conservant l'ordre.
+    """
+    lines = list(specs)
+    if input_list:
+        if input_list == "-":
+            lines.extend(sys.stdin.read().splitlines())
+        else:
+            with open(input_list, encoding='utf-8') as f:
+                lines.extend(f.read().splitlines())
+    
+    targets = []
+    seen = set()
+    for line in lines:
+        for spec in line.split("#", 1)[0].split():
+            try:
+                network = ipaddress.ip_network(spec, strict=False)
+                hosts = [str(network.network_address)] if network.num_addresses == 1 \
+                    else [str(host) for host in network.hosts()]
+            except ValueError:
+                hosts = [spec]
+            for host in hosts:
+                if host not in seen:
+                    seen.add(host)
+                    targets.append(host)
+    return targets
+
+def write_scan_status(errors, partial):
+    """Fin du rapport d'une cible : succès, erreurs ({étape: erreur}) ou scan partiel"""
+    if errors:
+        write_output(f"\n{'='*60}", Colors.RED)
+        write_output(f" Scan terminé avec des erreurs ({', '.join(errors)})", Colors.RED + Colors.BOLD)
+        write_output(f"{'='*60}", Colors.RED)
+    elif partial:
+        write_output(f"\n{'='*60}", Colors.YELLOW)
+        write_output(f" Scan partiel : temps écoulé ({', '.join(partial)})", Colors.YELLOW + Colors.BOLD)
+        write_output(f"{'='*60}", Colors.YELLOW)
+    else:
+        write_output(f"\n{'='*60}", Colors.GREEN)
+        write_output(f" Scan terminé avec succès!", Colors.GREEN + Colors.BOLD)
+        write_output(f"{'='*60}", Colors.GREEN)
+
+class HostFanout:
+    """Sous-domaines découverts par amass renvoyés dans le pipeline de scan
+
+    Les noms sont résolus par le resolver du scanner et dédupliqués par
+    adresse : un sous-domaine dont une adresse est déjà scannée (cible
+    donnée, hébergement mutualisé, alias) n'est pas re-scanné. Au plus
+    max_hosts hôtes sont ajoutés, jusqu'à la profondeur max_depth.
+    """
+    
+    def __init__(self, targets, resolver, progress, max_depth=1, max_hosts=50):
+        self.resolver = resolver
+        self.progress = progress
+        self.max_depth = max_depth
+        self.max_hosts = max_hosts
+        self.added = 0
+        self.names = {target.lower() for target in targets}
+        self.addresses = {}  # {adresse: premier hôte scanné à cette adresse}
+        self._pending_roots = list(targets)
+    
+    def _claim(self, name, addresses):
+        for address in addresses:
+            self.addresses.setdefault(address, name)
+    
+    def expand(self, parent, subdomains, depth):
+        """Nouveaux hôtes à scanner parmi les sous-domaines d'une cible
+
+        Args:
+            parent: cible dont amass a trouvé les sous-domaines
+            depth: profondeur de cette cible (0 pour une cible donnée)
+
+        Returns:
+            list: noms des hôtes à scanner à la profondeur depth + 1
+        """
+        if depth >= self.max_depth:
+            return []
+        if self._pending_roots:
+            # Adresses des cibles données, résolues au premier usage
+            for name, addresses in self.resolver.resolve_many(self._pending_roots).items():
+                self._claim(name, addresses)
+            self._pending_roots = []
+        
+        candidates = [name for name in subdomains if name.lower() not in self.names]
+        resolved = self.resolver.resolve_many(candidates)
+        hosts = []
+        shared = unresolved = over_limit = 0
+        for name in candidates:
+            self.names.add(name.lower())
+            addresses = resolved[name]
+            if not addresses:
+                unresolved += 1
+            elif any(address in self.addresses for address in addresses):
+                shared += 1
+            elif self.added >= self.max_hosts:
+                over_limit += 1
+            else:
+                self._claim(name, addresses)
+                self.added += 1
+                hosts.append(name)
+                self.progress.log(f"{Colors.GREEN}[+]{Colors.RESET} Sous-domaine {name} ({addresses[0]}) "
+                                  f"ajouté aux cibles (profondeur {depth + 1})")
+        
+        if candidates:
+            self.progress.log(f"{Colors.CYAN}[*]{Colors.RESET} Sous-domaines de {parent} : {len(candidates)} "
+                              f"nouveaux noms, {len(hosts)} hôtes ajoutés, {shared} à une adresse déjà "
+                              f"scannée, {unresolved} non résolus"
+                              + (f", {over_limit} au-delà de la limite de {self.max_hosts} hôtes"
+                                 if over_limit else ""))
+        return hosts
+
+class ReconScanner:
+    """Scanner Recon Report : sa configuration, ses sorties et ses ressources
+
+    Tout l'état d'une exécution est porté par l'instance : plusieurs
+    scanners peuvent tourner en même temps dans un processus, depuis des
+    threads ou des tâches asyncio (scan_async). Seul le moteur d'exécution
+    des commandes (get_engine) est partagé par le processus.
+
+    Args:
+        output_mode: "terminal" ou "file" (sortie des rapports par défaut)
+        output_dir: Répertoire des rapports et du résumé en mode fichier (défaut : répertoire courant)
+        report_sink: Sortie des rapports (ReportSink), remplace output_mode
+        progress: Suivi de la progression (ProgressTracker)
+        cache: Cache des résultats d'outils (ResultCache), None si désactivé
+        result_writers: Sorties structurées (JsonLinesWriter, ResultDatabase, ResultList)
+        state_dir: Répertoire des états par cible (mode diff), None si désactivé
+        run_dir: Répertoire des points de reprise de l'exécution, None si désactivé
+        command_timeout: Délai maximal par commande (secondes), None = illimité
+        output_memory: Sortie d'outil gardée en mémoire (caractères) avant passage sur disque
+        jobs: Nombre maximal d'étapes exécutées en parallèle par cible
+        workers: Nombre de cibles scannées en parallèle (scan_many)
+        diff: Re-scan incrémental par rapport à l'état précédent des cibles
+        stages: Étapes exécutées, parmi STAGES (toutes par défaut)
+        sweep_ports: Ports du pré-balayage TCP avant nmap -sV, None = désactivé
+        sweep_concurrency: Connexions simultanées du pré-balayage (toutes cibles confondues)
+        sweep_timeout: Délai de connexion du pré-balayage (secondes)
+        ssl_workers: sslscan exécutés simultanément (toutes cibles confondues)
+        tls_probe_timeout: Délai du test de négociation TLS (secondes)
+        web_batch_size: URLs passées à un même processus whatweb
+        web_batch_wait: Attente des URLs suivantes avant de lancer un lot (secondes)
+        fanout_depth: Profondeur de scan des sous-domaines découverts par amass, 0 = désactivé
+        fanout_max_hosts: Nombre maximal d'hôtes ajoutés par les sous-domaines
+        dns_concurrency: Résolutions DNS simultanées
+        dns_timeout: Délai d'une résolution DNS (secondes)
+        target_timeout: Temps maximal du scan d'une cible (secondes), None = illimité
+        run_timeout: Temps maximal de l'exécution, compté dès le premier scan (secondes), None = illimité
+        stage_timeouts: Temps maximaux par étape ({étape: secondes}), remplacent ceux de STAGE_TIMEOUTS
+        instrumentation: Relevé des durées et de la consommation (Instrumentation), None si désactivé
+
+    Quand le temps manque, les étapes les moins prioritaires ne sont pas
+    lancées et les outils en cours sont interrompus : la cible est marquée
+    partielle (résumé, enregistrement "target") au lieu d'être en erreur.
+
+    Raises:
+        ValueError: sélection d'étapes invalide (check_stages)
+    """
+    
+    def __init__(self, output_mode="terminal", output_dir=None, report_sink=None, progress=None, cache=None,
+                 result_writers=(), state_dir=None, run_dir=None, command_timeout=None,
+                 output_memory=OUTPUT_MEMORY, jobs=JOBS, workers=WORKERS, diff=False, stages=STAGES,
+                 sweep_ports=None, sweep_concurrency=SWEEP_CONCURRENCY, sweep_timeout=SWEEP_TIMEOUT,
+                 ssl_workers=SSL_WORKERS, tls_probe_timeout=TLS_PROBE_TIMEOUT, web_batch_size=WEB_BATCH_SIZE,
+                 web_batch_wait=WEB_BATCH_WAIT, fanout_depth=0, fanout_max_hosts=FANOUT_MAX_HOSTS,
+                 dns_concurrency=DNS_CONCURRENCY, dns_timeout=DNS_TIMEOUT, target_timeout=None,
+                 run_timeout=None, stage_timeouts=None, instrumentation=None):
+        check_stages(stages, diff)
+        self.output_mode = output_mode
+        self.output_dir = output_dir
+        self.progress = progress or ProgressTracker()
+        # Par défaut les rapports sont mis en tampon : plusieurs cibles peuvent être scannées à la fois
+        self.report_sink = report_sink or make_report_sink(output_mode, buffered=True,
+                                                           write=self.progress.write, directory=output_dir)
+        self.cache = cache
+        self.result_writers = list(result_writers)
+        self.state_dir = state_dir
+        self.run_dir = run_dir
+        self.command_timeout = command_timeout
+        self.output_memory = output_memory
+        self.jobs = jobs
+        self.workers = workers
+        self.diff = diff
+        self.stages = tuple(stages)
+        self.sweep_ports = sweep_ports
+        self.sweep_concurrency = sweep_concurrency
+        self.sweep_timeout = sweep_timeout
+        self.ssl_workers = ssl_workers
+        self.tls_probe_timeout = tls_probe_timeout
+        self.web_batch_size = web_batch_size
+        self.web_batch_wait = web_batch_wait
+        self.fanout_depth = fanout_depth
+        self.fanout_max_hosts = fanout_max_hosts
+        self.resolver = DnsResolver(concurrency=dns_concurrency, timeout=dns_timeout)
+        self.target_timeout = target_timeout
+        self.run_timeout = run_timeout
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self._run_budget = None
+        self.instrumentation = instrumentation
+        self._tls_certificates = {}  # {empreinte: premier point d'accès qui l'a présentée}
+        self._ssl_pool = None
+        self._sweep_limit = None
+        self._lock = threading.Lock()
+    
+    @property
+    def ssl_pool(self):
+        """Pool des sslscan, partagé par toutes les cibles du scanner (créé au premier usage)"""
+        with self._lock:
+            if self._ssl_pool is None:
+                self._ssl_pool = ThreadPoolExecutor(max_workers=max(1, self.ssl_workers),
+                                                    thread_name_prefix="sslscan")
+            return self._ssl_pool
+    
+    @property
+    def sweep_limit(self):
+        """Sémaphore du pré-balayage, partagé par toutes les cibles du scanner"""
+        with self._lock:
+            if self._sweep_limit is None:
+                self._sweep_limit = asyncio.Semaphore(self.sweep_concurrency)
+            return self._sweep_limit
+    
+    @property
+    def run_budget(self):
+        """Budget de l'exécution, démarré au premier scan"""
+        with self._lock:
+            if self._run_budget is None:
+                self._run_budget = Budget(self.run_timeout)
+            return self._run_budget
+    
+    def first_endpoint(self, fingerprint, endpoint):
+        """Premier point d'accès ayant présenté ce certificat (endpoint s'il est nouveau)"""
+        with self._lock:
+            return self._tls_certificates.setdefault(fingerprint, endpoint)
+    
+    @contextlib.contextmanager
+    def active(self, report=None):
+        """Rendre le scanner actif dans ce thread (current_scanner)
+
+        report, s'il est donné, devient aussi le rapport courant : les
+        enregistrements émis depuis un rappel du moteur restent rattachés à
+        leur cible (et à la tâche d'un worker).
+        """
+        previous = getattr(_local, "scanner", None), getattr(_local, "report", None)
+        _local.scanner = self
+        if report is not None:
+            _local.report = report
+        try:
+            yield self
+        finally:
+            _local.scanner, _local.report = previous
+    
+    def scan(self, target, depth=0, stages=None):
+        """Pipeline complet d'une cible, avec son propre rapport
+
+        Avec diff, la cible est re-scannée de façon incrémentale par rapport
+        à son état précédent (scan complet s'il n'y en a pas). depth est la
+        profondeur d'un sous-domaine ajouté par HostFanout (0 pour les cibles
+        données) : amass n'est lancé qu'en deçà de fanout_depth. stages
+        remplace pour cette cible les étapes du scanner (tâche d'un worker).
+
+        Returns:
+            dict: résumé du scan de la cible
+
+        Raises:
+            ValueError: sélection d'étapes invalide (check_stages)
+        """
+        if stages is not None:
+            check_stages(stages, self.diff)
+        with self.active():
+            previous_report = getattr(_local, "report", None)
+            target_report = Report(target, self.report_sink).open()
+            _local.report = target_report
+            try:
+                return self._scan(target, target_report, depth, self.stages if stages is None else tuple(stages))
+            finally:
+                target_report.close()
+                _local.report = previous_report
+    
+    def _scan(self, target, target_report, depth, names):
+        start = time.time()
+        budget = Budget(self.target_timeout, parent=self.run_budget)
+        span = self.instrumentation.begin("target", "scan", target) if self.instrumentation is not None else None
+        ctx = {
+            'target': target,
+            'lock': threading.Lock(),
+            'ssl_queue': queue.Queue(),
+            'web_queue': queue.Queue(),
+            'ssl_ports': [],
+            'tls_state': {},
+            'tls_hinted': set(),
+            'web_urls': [],
+            'followups': [],
+        }
+        checkpoints = Checkpoints(os.path.join(self.run_dir, safe_filename(target))) \
+            if self.run_dir is not None else None
+        
+        write_output(f"\n Démarrage du scan de {target}...\n", Colors.CYAN + Colors.BOLD)
+        if self.diff:
+            # À la reprise, comparer au même état précédent qu'au premier lancement
+            saved = checkpoints.load_json("previous") if checkpoints is not None else None
+            if saved is not None:
+                ctx['previous'] = saved['state']
+            else:
+                ctx['previous'] = load_state(self.state_dir, target) if self.state_dir is not None else None
+                if checkpoints is not None:
+                    checkpoints.save_json("previous", {'state': ctx['previous']})
+            if ctx['previous'] is None:
+                write_output(f" Aucun état précédent pour {target} : scan complet\n", Colors.YELLOW)
+        stages = build_stages(diff=ctx.get('previous') is not None, amass=depth < max(self.fanout_depth, 1),
+                              sweep=self.sweep_ports is not None, names=names, timeouts=self.stage_timeouts)
+        errors = StageScheduler(stages, max_workers=self.jobs).run(ctx, checkpoints, budget)
+        partial = ctx['partial']
+        # Un état incomplet fausserait le prochain diff (ports non scannés vus comme fermés,
+        # sous-domaines d'un amass interrompu ou en échec vus comme disparus)
+        if self.state_dir is not None and 'result' in ctx and not errors and not {"nmap", "amass"} & set(partial):
+            save_state(self.state_dir, target, ctx)
+        
+        write_scan_status(errors, partial)
+        
+        summary = {
+            'target': target,
+            'errors': {name: str(error) for name, error in errors.items()},
+            'duration': time.time() - start,
+            'open_ports': count_open_ports(ctx.get('result')),
+            'ssl_ports': len(ctx.get('ssl_ports', [])),
+            'report': target_report.filename,
+            'depth': depth,
+            'subdomains': ctx.get('subdomains', []),
+            'partial': partial,
+        }
+        if span is not None:
+            self.instrumentation.end(span, "error" if errors else "partial" if partial else "ok")
+        emit("target", duration=round(summary['duration'], 3), open_ports=summary['open_ports'],
+             tls_endpoints=summary['ssl_ports'], errors=summary['errors'], partial=partial)
+        return summary
+    
+    async def scan_async(self, target):
+        """scan() depuis une tâche asyncio, sans bloquer la boucle de l'appelant"""
+        return await asyncio.to_thread(self.scan, target)
+    
+    def scan_many(self, targets):
+        """Scanner plusieurs cibles avec un pool de workers borné
+
+        Chaque cible est traitée indépendamment : un hôte lent n'occupe qu'un
+        worker et les rapports sont restitués dès qu'une cible est terminée.
+        Avec fanout_depth, les sous-domaines trouvés par amass sont ajoutés aux
+        cibles au fur et à mesure (HostFanout).
+
+        Returns:
+            list: résumés des cibles, dans l'ordre de fin de scan
+        """
+        progress = self.progress
+        summaries = []
+        fanout = HostFanout(targets, self.resolver, progress, self.fanout_depth,
+                            self.fanout_max_hosts) if self.fanout_depth else None
+        total = len(targets)
+        pool = ThreadPoolExecutor(max_workers=max(1, self.workers))
+        try:
+            futures = {pool.submit(self.scan, target): (target, 0) for target in targets}
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    target, depth = futures.pop(future)
+                    try:
+                        summary = future.result()
+                    except Exception as e:
+                        summary = {'target': target, 'errors': {'scan': str(e)}, 'duration': 0.0,
+                                   'open_ports': 0, 'ssl_ports': 0, 'report': None, 'partial': {}}
+                    summaries.append(summary)
+                    progress.count('targets_done')
+                    color = Colors.RED if summary['errors'] else Colors.YELLOW if summary['partial'] else Colors.GREEN
+                    progress.log(f"{color}[{len(summaries)}/{total}]{Colors.RESET} {target} "
+                                 f"terminé en {summary['duration']:.1f}s")
+                    
+                    if fanout is not None and summary.get('subdomains'):
+                        for host in fanout.expand(target, summary['subdomains'], depth):
+                            futures[pool.submit(self.scan, host, depth + 1)] = (host, depth + 1)
+                            total += 1
+                            progress.count('targets_total')
+        except KeyboardInterrupt:
+            # Tuer les outils avant d'abandonner le pool : les cibles en attente ne sont pas lancées
+            stop_engine()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+        
+        self.write_summary(summaries)
+        return summaries
+    
+    def write_summary(self, summaries):
+        """Résumé combiné d'un scan batch (terminal, et fichier en mode fichier)"""
+        lines = [
+            "",
+            "="*60,
+            f" Résumé : {len(summaries)} cibles",
+            "="*60,
+            f"{'CIBLE':<30} {'STATUT':<8} {'PORTS':>5} {'SSL':>4} {'DURÉE':>8}",
+        ]
+        for summary in summaries:
+            status = "ERREUR" if summary['errors'] else "PARTIEL" if summary['partial'] else "OK"
+            lines.append(f"{summary['target']:<30} {status:<8} {summary['open_ports']:>5} "
+                         f"{summary['ssl_ports']:>4} {summary['duration']:>7.1f}s")
+            for name, error in summary['errors'].items():
+                lines.append(f"    {name} : {error}")
+            for name, reasons in summary['partial'].items():
+                lines.append(f"    {name} (partiel) : {'; '.join(reasons)}")
+        
+        self.progress.write(f"{Colors.CYAN}{Colors.BOLD}" + "\n".join(lines[:4]) + Colors.RESET + "\n")
+        self.progress.write("\n".join(lines[4:]) + "\n")
+        
+        if self.output_mode == "file":
+            filename = os.path.join(self.output_dir or "", f"summary_{datetime.now().strftime('%Y%m%d_%H%M')}.txt")
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+                for summary in summaries:
+                    if summary['report']:
+                        f.write(f"{summary['target']} : {summary['report']}\n")
+            self.progress.log(f"\n Résumé sauvegardé dans : {filename}", Colors.GREEN)
+    
+    def close(self):
+        """Libérer les ressources du scanner : pool sslscan, cache, sorties"""
+        with self._lock:
+            pool, self._ssl_pool = self._ssl_pool, None
+        if pool is not None:
+            pool.shutdown()
+        if self.cache is not None:
+            self.cache.close()
+        for writer in self.result_writers:
+            writer.close()
+        self.report_sink.shutdown()
+        self.progress.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,476 @@
+"""Étapes du scan d'une cible : pré-balayage, nmap, TLS, web, sous-domaines et différences"""
+import time
+import queue
+from concurrent.futures import Future, TimeoutError
+
+from .budget import command_timeout, current_budget, cut_short
+from .config import STAGES, STAGE_TIMEOUTS, STAGE_MIN_TIME
+from .engine import get_engine
+from .instrument import current_span, record_command
+from .network import tcp_connect_scan, is_ip_address, tls_probe, grab_banners
+from .output import Colors, Section, _local, current_report, current_scanner, current_sink, write_output
+from .pipeline import Stage
+from .ports import PortRecord, PortStore
+from .results import emit
+from .tools import scan_ssl, stream_nmap, write_host_ports, scan_whatweb, scan_amass_domain
+
+def web_url(host, port):
+    """URL d'un service web (PortRecord), ou None si le port n'est pas un service web
+
+    Sans information de service (port tout juste découvert), on se fie au
+    numéro de port ; sinon au nom de service détecté par nmap.
+    """
+    if port.service is None:
+        if port.port in ["80", "8080"]:
+            return f"http://{host}:{port.port}"
+        if port.port in ["443", "8443"]:
+            return f"https://{host}:{port.port}"
+        return None
+    if not port.is_web:
+        return None
+    https = port.tunnel == "ssl" or port.service in ("https", "https-alt")
+    return f"{'https' if https else 'http'}://{host}:{port.port}"
+
+def queue_followups(ctx, port):
+    """Mettre en file les scans de suivi d'un port ouvert (PortRecord, sans doublon)
+
+    Tout port ouvert passe par le test TLS. Un port que nmap annonce comme
+    TLS après un test négatif est remis en file : sslscan tranchera.
+    """
+    key = port.key
+    with ctx['lock']:
+        # Rejouées à la reprise si l'étape productrice est restaurée
+        ctx['followups'].append(port)
+        if port.is_tls:
+            ctx['tls_hinted'].add(key)
+        state = ctx['tls_state'].get(key)
+        if state is None or (state == "no" and key in ctx['tls_hinted']):
+            ctx['tls_state'][key] = "pending"
+            ctx['ssl_queue'].put(key)
+        
+        url = web_url(ctx['target'], port)
+        if url and url not in ctx['web_urls']:
+            ctx['web_urls'].append(url)
+            ctx['web_queue'].put(url)
+
+def drain_queue(work_queue):
+    """Itérer sur une file de suivi jusqu'à sa fermeture (None)
+
+    L'attente s'arrête aussi à l'échéance de l'étape : les éléments non
+    encore produits ne sont alors pas traités (étape écourtée).
+    """
+    while True:
+        try:
+            item = work_queue.get(timeout=command_timeout())
+        except queue.Empty:
+            cut_short("temps écoulé avant la fin du scan de ports")
+            return
+        if item is None:
+            return
+        yield item
+
+def drain_batches(work_queue, size, wait):
+    """Itérer sur une file de suivi par lots d'au plus size éléments
+
+    Un lot part quand il est plein, quand la file est fermée (None) ou wait
+    secondes après son premier élément.
+    """
+    for item in drain_queue(work_queue):
+        batch = [item]
+        deadline = time.monotonic() + wait
+        while len(batch) < size:
+            try:
+                item = work_queue.get(timeout=command_timeout(max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+            if item is None:
+                yield batch
+                return
+            batch.append(item)
+        yield batch
+
+def scan_sweep(ctx):
+    """Pré-balayage TCP : ports ouverts de la cible avant la détection de versions"""
+    scanner = current_scanner()
+    progress = scanner.progress
+    target = ctx['target']
+    addresses = scanner.resolver.resolve(target)
+    if not addresses:
+        raise OSError(f"impossible de résoudre {target}")
+    # nmap scanne la première adresse résolue : le pré-balayage aussi
+    ip = addresses[0]
+    
+    with progress.track(f"Pré-balayage TCP de {target}", target) as task:
+        found = []
+        
+        def on_open(port):
+            found.append(port)
+            progress.update(task, detail=f"{len(found)} ports ouverts")
+        
+        untested = []
+        
+        def on_error(port, error):
+            untested.append((port, error))
+        
+        start = time.monotonic()
+        future = get_engine().run_coroutine(tcp_connect_scan(
+            ip, scanner.sweep_ports, on_open, scanner.sweep_concurrency, scanner.sweep_timeout,
+            limit=scanner.sweep_limit, on_error=on_error
+        ))
+        try:
+            ports = future.result(timeout=command_timeout())
+        except TimeoutError:
+            # Échéance de l'étape : garder les ports déjà trouvés
+            future.cancel()
+            ports = sorted(found)
+            cut_short(f"pré-balayage interrompu après {time.monotonic() - start:.0f}s")
+        if untested:
+            # Ports non testés : le pré-balayage est incomplet, pas l'étape entière en échec
+            cut_short(f"pré-balayage : {len(untested)} ports non testés ({untested[0][1]})")
+        duration = time.monotonic() - start
+        task.detail = f"{len(ports)} ports ouverts sur {len(scanner.sweep_ports)}"
+    
+    ctx['sweep'] = {'ip': ip, 'ports': [str(port) for port in ports]}
+    write_output(f"\n###*** PRÉ-BALAYAGE TCP ({ip}) ***###", Colors.MAGENTA + Colors.BOLD)
+    write_output(f"{len(scanner.sweep_ports)} ports testés en {duration:.1f}s : "
+                 f"{', '.join(map(str, ports)) or 'aucun port ouvert'}", Colors.WHITE)
+
+def scan_ports(ctx):
+    """Scan Nmap en flux : chaque port ouvert déclenche aussitôt ses scans de suivi"""
+    scanner = current_scanner()
+    cache, progress = scanner.cache, scanner.progress
+    target = ctx['target']
+    task = progress.start(f"Scan Nmap de {target}", target)
+    found = {'ports': 0, 'hosts': 0}
+    announced = set()
+    
+    def on_port(ip, port_nb, protocol):
+        # Les ports du pré-balayage sont redécouverts par nmap : une seule annonce
+        if (ip, port_nb) in announced:
+            return
+        announced.add((ip, port_nb))
+        found['ports'] += 1
+        progress.update(task, detail=f"{found['ports']} ports ouverts")
+        progress.log(f"{Colors.GREEN}[+]{Colors.RESET} Port ouvert {port_nb}/{protocol} sur {ip}")
+        queue_followups(ctx, PortRecord(ip, port_nb, protocol))
+    
+    def on_host(ip, hostnames, ports):
+        found['hosts'] += 1
+        write_host_ports(ip, hostnames, ports)
+        for port in ports:
+            if port.state == "open":
+                queue_followups(ctx, port)
+    
+    status = "failed"
+    args = ("-sV",)
+    try:
+        if 'sweep' in ctx:
+            # Détection de versions limitée aux ports trouvés par le pré-balayage
+            ip, ports = ctx['sweep']['ip'], ctx['sweep']['ports']
+            for port_nb in ports:
+                on_port(ip, port_nb, "tcp")
+            if not ports:
+                write_output(f"\nAucun port ouvert détecté par le pré-balayage : "
+                             f"pas de détection de versions", Colors.YELLOW)
+                ctx['result'] = PortStore()
+                status = "done"
+                return
+            args = ("-sV", "-p", ",".join(ports))
+        
+        cached = cache.get("nmap", list(args), target) if cache is not None else None
+        if cached is not None:
+            # Rejouer le résultat en cache comme s'il arrivait de nmap
+            record_command("nmap")
+            ctx['result'] = PortStore.from_dict(cached)
+            for ip, ports in ctx['result'].hosts():
+                on_host(ip, ctx['result'].hostnames[ip], ports)
+            status = "cache"
+        else:
+            ctx['result'] = stream_nmap(target, on_port=on_port, on_host=on_host, args=args,
+                                        on_stats=progress.nmap_stats(task))
+            budget = current_budget()
+            # Un résultat partiel (nmap interrompu) n'est pas mis en cache
+            if cache is not None and not (budget is not None and budget.cut_short):
+                cache.put("nmap", list(args), target, ctx['result'].as_dict())
+            status = "done"
+    finally:
+        progress.finish(task, status, f"{found['hosts']} hôtes, "
+                                      f"{count_open_ports(ctx.get('result'))} ports ouverts")
+        # Fermer les files pour libérer les étapes de suivi, même en cas d'échec
+        ctx['ssl_queue'].put(None)
+        ctx['web_queue'].put(None)
+
+def run_sslscan_job(scanner, report, budget, span, ip, port_nb, fingerprint):
+    """Tâche du pool : scan_ssl écrit dans sa propre section du rapport
+
+    Le budget et le span sont ceux de l'étape sslscan de la cible : une
+    tâche qui démarre après son échéance est abandonnée sans lancer sslscan.
+    """
+    _local.scanner = scanner
+    _local.report = report
+    _local.section = Section(scanner.output_memory)
+    _local.budget = budget
+    _local.span = span
+    try:
+        if budget is not None and budget.expired():
+            write_output(f"\n###*** SCAN SSL (Port {port_nb}) ***###", Colors.MAGENTA + Colors.BOLD)
+            write_output(f"Pas d'exécution de sslscan sur {ip}:{port_nb} (temps écoulé)", Colors.YELLOW)
+            cut_short(f"sslscan non lancé sur {ip}:{port_nb}")
+        else:
+            scan_ssl(ip, port_nb, fingerprint)
+    finally:
+        section = _local.section
+        _local.section = None
+        _local.report = None
+        _local.scanner = None
+        _local.budget = None
+        _local.span = None
+    return section
+
+def check_tls_endpoint(ctx, report, ip, port_nb):
+    """Test TLS d'un port ouvert, puis sslscan dans le pool partagé
+
+    Un certificat déjà analysé (même empreinte, par exemple derrière un
+    répartiteur de charge) n'est pas repassé à sslscan : la section renvoie
+    au premier point d'accès qui l'a présenté.
+
+    Returns:
+        Future: section du rapport, ou None si le port ne parle pas TLS
+    """
+    scanner = current_scanner()
+    budget = current_budget()
+    span = current_span()
+    done = Future()
+    key = (ip, port_nb)
+    endpoint = f"{ip}:{port_nb}"
+    server_name = None if is_ip_address(ctx['target']) else ctx['target']
+    
+    def on_scanned(job):
+        if job.exception() is not None:
+            done.set_exception(job.exception())
+        else:
+            done.set_result(job.result())
+    
+    def on_probe(probe):
+        fingerprint = probe.result() if not probe.cancelled() and probe.exception() is None else None
+        with ctx['lock']:
+            if fingerprint is None and key not in ctx['tls_hinted']:
+                ctx['tls_state'][key] = "no"
+                done.set_result(None)
+                return
+            ctx['tls_state'][key] = "tls"
+            ctx['ssl_ports'].append(key)
+        
+        if fingerprint:
+            first = scanner.first_endpoint(fingerprint, endpoint)
+            if first != endpoint:
+                section = Section(scanner.output_memory)
+                section.write(f"\n###*** SCAN SSL (Port {port_nb}) ***###", Colors.MAGENTA + Colors.BOLD)
+                # Rappel exécuté dans la boucle du moteur : activer le scanner et le rapport de la cible
+                with scanner.active(report):
+                    emit("tls", sink=section, target=report.target, ip=ip, port=int(port_nb),
+                         fingerprint=fingerprint, duplicate_of=first)
+                done.set_result(section)
+                return
+        scanner.ssl_pool.submit(run_sslscan_job, scanner, report, budget, span, ip, port_nb,
+                                fingerprint).add_done_callback(on_scanned)
+    
+    get_engine().run_coroutine(
+        tls_probe(ip, port_nb, server_name, scanner.tls_probe_timeout)
+    ).add_done_callback(on_probe)
+    return done
+
+def scan_ssl_ports(ctx):
+    """Tester TLS sur les ports ouverts au fur et à mesure de leur découverte
+
+    Les sslscan tournent dans un pool partagé par toutes les cibles ; les
+    sections sont restituées dans l'ordre de découverte des ports.
+    """
+    report = current_report()
+    checks = [check_tls_endpoint(ctx, report, ip, port_nb) for ip, port_nb in drain_queue(ctx['ssl_queue'])]
+    
+    found = False
+    for check in checks:
+        section = check.result()
+        if section is not None:
+            found = True
+            section.copy_to(current_sink())
+    
+    if not found:
+        write_output(f"\nAucun service TLS détecté", Colors.YELLOW)
+        write_output(f"Pas d'exécution de sslscan", Colors.YELLOW)
+
+def scan_web(ctx):
+    """Empreintes web des services découverts, par lots (scan_whatweb)"""
+    scanner = current_scanner()
+    found = False
+    for urls in drain_batches(ctx['web_queue'], scanner.web_batch_size, scanner.web_batch_wait):
+        found = True
+        scan_whatweb(urls)
+    
+    if not found:
+        write_output(f"\nAucun service web détecté", Colors.YELLOW)
+        write_output(f"Pas d'exécution de whatweb", Colors.YELLOW)
+
+def scan_ports_incremental(ctx):
+    """Re-scan incrémental par rapport à l'état précédent de la cible
+
+    Une passe rapide (états des ports, sans détection de versions) et une
+    prise d'empreinte des bannières repèrent les ports nouveaux, fermés ou
+    dont la bannière a changé. Seuls ces ports passent par nmap -sV et par
+    les scans de suivi (sslscan, whatweb) ; les autres reprennent les
+    informations de service de l'état précédent.
+    """
+    progress = current_scanner().progress
+    target = ctx['target']
+    previous = ctx['previous']
+    previous_ports = PortStore.from_dict(previous['hosts']).with_state("open")
+    previous_banners = previous.get('banners', {})
+    
+    try:
+        if 'sweep' in ctx:
+            # Le pré-balayage TCP tient lieu de passe rapide
+            ip = ctx['sweep']['ip']
+            quick_ports = {(ip, port_nb): PortRecord(ip, port_nb) for port_nb in ctx['sweep']['ports']}
+        else:
+            with progress.track(f"Passe rapide Nmap de {target}", target) as task:
+                quick_ports = stream_nmap(target, args=(), on_stats=progress.nmap_stats(task)).with_state("open")
+                task.detail = f"{len(quick_ports)} ports ouverts"
+        ctx['banners'] = grab_banners(list(quick_ports))
+        
+        # Ports à re-scanner : nouveaux, ou bannière différente de la précédente
+        rescan = {}
+        for ip, port_nb in quick_ports:
+            old_banner = previous_banners.get(ip, {}).get(port_nb)
+            new_banner = ctx['banners'].get(ip, {}).get(port_nb)
+            if (ip, port_nb) not in previous_ports or \
+                    (old_banner is not None and new_banner is not None and old_banner != new_banner):
+                rescan.setdefault(ip, []).append(port_nb)
+        
+        rescanned = {}
+        for ip, ports in rescan.items():
+            with progress.track(f"Scan Nmap de {ip} (ports {','.join(ports)})", target) as task:
+                rescanned.update(stream_nmap(ip, args=("-sV", "-p", ",".join(ports)),
+                                             on_stats=progress.nmap_stats(task)).with_state("open"))
+        
+        # Fusion : ports re-scannés, sinon informations de l'état précédent
+        result = PortStore()
+        diff = {'new': [], 'closed': [], 'changed': []}
+        for key in sorted(quick_ports, key=lambda k: (k[0], int(k[1]))):
+            ip, port_nb = key
+            port = result.add(rescanned.get(key) or previous_ports.get(key) or quick_ports[key])
+            if key not in previous_ports:
+                diff['new'].append((ip, port_nb, port.label))
+            elif key in rescanned:
+                diff['changed'].append((ip, port_nb, previous_ports[key].label, port.label))
+        for key in sorted(set(previous_ports) - set(quick_ports), key=lambda k: (k[0], int(k[1]))):
+            diff['closed'].append((key[0], key[1], previous_ports[key].label))
+        
+        ctx['result'] = result
+        ctx['diff'] = diff
+        for ip, ports in result.hosts():
+            write_host_ports(ip, result.hostnames[ip], ports)
+        for port in rescanned.values():
+            queue_followups(ctx, port)
+        progress.log(f"{Colors.GREEN}[✓]{Colors.RESET} Re-scan de {target} terminé : "
+                     f"{len(rescanned)} ports re-scannés sur {len(quick_ports)}")
+    finally:
+        ctx['ssl_queue'].put(None)
+        ctx['web_queue'].put(None)
+
+def write_diff(ctx):
+    """Section du rapport : différences avec le scan précédent"""
+    diff = ctx.get('diff')
+    if diff is None:
+        # Scan de ports ignoré faute de temps
+        diff = {'new': [], 'closed': [], 'changed': []}
+        write_output(f"\nScan de ports non effectué : différences de ports non calculées", Colors.YELLOW)
+    elif 'nmap' in ctx.get('partial', {}):
+        write_output(f"\nScan de ports partiel : les ports non scannés apparaissent comme fermés",
+                     Colors.YELLOW + Colors.BOLD)
+    new_subdomains = sorted(set(ctx.get('subdomains', [])) - set(ctx['previous'].get('subdomains', [])))
+    
+    write_output(f"\n{'='*60}", Colors.CYAN)
+    write_output(f"====== DIFFÉRENCES depuis le {ctx['previous'].get('date', '?')} ======", Colors.CYAN + Colors.BOLD)
+    write_output(f"{'='*60}", Colors.CYAN)
+    
+    sections = [
+        ("Nouveaux ports", Colors.GREEN, [f"+ {ip}:{port_nb} {label}" for ip, port_nb, label in diff['new']]),
+        ("Ports fermés", Colors.RED, [f"- {ip}:{port_nb} {label}" for ip, port_nb, label in diff['closed']]),
+        ("Ports modifiés", Colors.YELLOW, [f"~ {ip}:{port_nb} {old} -> {new}"
+                                           for ip, port_nb, old, new in diff['changed']]),
+        ("Nouveaux sous-domaines", Colors.GREEN, [f"+ {name}" for name in new_subdomains]),
+    ]
+    for title, color, lines in sections:
+        write_output(f"\n###*** {title.upper()} ({len(lines)}) ***###", Colors.MAGENTA + Colors.BOLD)
+        for line in lines:
+            write_output(line, color)
+    
+    if not any(lines for _, _, lines in sections):
+        write_output("\nAucun changement détecté", Colors.GREEN)
+
+def build_stages(diff=False, amass=True, sweep=False, names=STAGES, timeouts=None):
+    """Étapes du scan d'une cible et leurs dépendances
+
+    En mode diff, le scan de ports est incrémental et une section finale
+    liste les différences avec le scan précédent. Avec le pré-balayage TCP
+    (sweep=True), nmap attend ses résultats pour ne traiter que les ports
+    ouverts. amass=False retire la recherche de sous-domaines (sous-domaine
+    scanné à la profondeur maximale). names restreint les étapes exécutées
+    (voir check_stages). timeouts remplace des temps maximaux par étape
+    ({étape: secondes}, None = illimité) de STAGE_TIMEOUTS.
+    """
+    timeouts = {**STAGE_TIMEOUTS, **(timeouts or {})}
+    # Le pré-balayage ne sert qu'à nmap
+    sweep = sweep and "nmap" in names
+    
+    def stage_amass(ctx):
+        ctx['subdomains'] = scan_amass_domain(ctx['target'])
+    
+    def restore_nmap(ctx):
+        # Le point de reprise garde la forme JSON des ports
+        if 'result' in ctx:
+            ctx['result'] = PortStore.from_dict(ctx['result'])
+        # Rejouer les scans de suivi pour les étapes consommatrices non restaurées
+        followups, ctx['followups'] = ctx['followups'], []
+        for row in followups:
+            queue_followups(ctx, PortRecord.from_json(row))
+        ctx['ssl_queue'].put(None)
+        ctx['web_queue'].put(None)
+    
+    stages = [
+        Stage("nmap", scan_ports_incremental if diff else scan_ports, depends=["sweep"] if sweep else [],
+              outputs=["result", "followups", "banners", "diff"], restore=restore_nmap),
+        Stage("sslscan", scan_ssl_ports, consumes=["nmap"], outputs=["ssl_ports"]),
+        Stage("whatweb", scan_web, consumes=["nmap"]),
+    ]
+    if amass:
+        stages.append(Stage("amass", stage_amass, outputs=["subdomains"]))
+    stages = [stage for stage in stages if stage.name in names]
+    if sweep:
+        stages.insert(0, Stage("sweep", scan_sweep, outputs=["sweep"]))
+    if diff:
+        stages.append(Stage("diff", write_diff, depends=[stage.name for stage in stages
+                                                         if stage.name in ("nmap", "amass")]))
+    for stage in stages:
+        stage.timeout = timeouts.get(stage.name)
+        stage.min_time = STAGE_MIN_TIME.get(stage.name, 0)
+    return stages
+
+def check_stages(names, diff=False):
+    """Vérifier une sélection d'étapes (noms de STAGES)
+
+    Raises:
+        ValueError: étape inconnue, ou étape sans l'étape nmap dont elle dépend
+    """
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise ValueError(f"étape inconnue : {', '.join(unknown)} (étapes : {', '.join(STAGES)})")
+    if "nmap" not in names:
+        dependent = [name for name in ("sslscan", "whatweb") if name in names] + (["diff"] if diff else [])
+        if dependent:
+            raise ValueError(f"{', '.join(dependent)} nécessite l'étape nmap")
+
+def count_open_ports(scan_result):
+    """Nombre de ports ouverts d'un PortStore (0 sans résultat)"""
+    return scan_result.open_count() if scan_result is not None else 0
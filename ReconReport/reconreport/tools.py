@@ -0,0 +1,458 @@
+"""Exécution des outils (nmap, sslscan, whatweb, amass) et analyse de leur sortie"""
+import os
+import re
+import shutil
+import tempfile
+import urllib.parse
+from concurrent.futures import CancelledError
+
+from .budget import command_timeout, cut_short, tool_failed
+from .engine import get_engine
+from .instrument import record_command
+from .config import OUTPUT_MEMORY
+from .output import ANSI_RE, Colors, LineTee, Section, current_scanner, current_sink, write_output
+from .ports import PortRecord, PortStore
+from .progress import ProgressSink
+from .results import emit
+
+def if_installed(program):
+    return shutil.which(program) is not None
+
+def run_command_with_progress(command, desc, target=None, sink=None):
+    """
+    Exécute une commande subprocess en suivant sa progression (ProgressTracker)
+    
+    La sortie standard est écrite au fil de l'eau dans le rapport (section de
+    l'étape en cours, ou sink) ; seul son début (output_memory caractères)
+    est gardé en mémoire et renvoyé pour analyse.
+    
+    Le cache est consulté avant l'exécution ; seuls les résultats complets
+    des commandes réussies y sont enregistrés.
+    
+    Args:
+        command: Liste de commande à exécuter
+        desc: Description du scan
+        target: Cible de la commande (clé de cache)
+        sink: Destination de la sortie (défaut : current_sink())
+    
+    Returns:
+        tuple: (stdout, stderr, returncode)
+    """
+    scanner = current_scanner()
+    cache = scanner.cache
+    sink = sink or current_sink()
+    if cache is not None:
+        cached = cache.get(command[0], command[1:], target)
+        if cached is not None:
+            scanner.progress.finish(scanner.progress.start(desc), "cache")
+            record_command(command[0])
+            sink.write_raw(cached['stdout'] + "\n")
+            return cached['stdout'], cached['stderr'], cached['returncode']
+    
+    result = _run_command_with_progress(command, desc, sink)
+    sink.write_raw("\n")
+    if cache is not None and result.ok and not result.truncated:
+        cache.put(command[0], command[1:], target,
+                  {'stdout': result.stdout, 'stderr': result.stderr, 'returncode': result.returncode})
+    return result.stdout, result.stderr, result.returncode
+
+def _run_command_with_progress(command, desc, sink):
+    """Exécution effective de run_command_with_progress (sans cache)"""
+    scanner = current_scanner()
+    progress = scanner.progress
+    task = progress.start(desc)
+    timeout = command_timeout(scanner.command_timeout)
+    future = get_engine().submit(command, timeout=timeout, sink=ProgressSink(sink, task, progress),
+                                 keep=scanner.output_memory)
+    result = future.result()
+    record_command(command[0], result)
+    if result.timed_out:
+        progress.finish(task, "timeout", f"limite {timeout:.0f}s")
+        cut_short(f"{command[0]} interrompu après {timeout:.0f}s")
+    elif result.returncode != 0:
+        progress.finish(task, "failed", f"code {result.returncode}")
+        reason = f"{command[0]} a échoué (code {result.returncode})"
+        stderr = result.stderr.strip().splitlines()
+        write_output(reason + (f" : {stderr[-1]}" if stderr else ""), Colors.RED)
+        tool_failed(reason)
+    else:
+        progress.finish(task)
+    return result
+
+# Sortie de sslscan : protocoles, suites acceptées et certificat
+SSLSCAN_PROTOCOL_RE = re.compile(r"^(SSLv[23]|TLSv1\.[0-3])\s+(enabled|disabled)", re.MULTILINE)
+SSLSCAN_CIPHER_RE = re.compile(r"^(?:Preferred|Accepted)\s+(\S+)\s+(\d+) bits\s+(\S+)", re.MULTILINE)
+SSLSCAN_CERT_RE = re.compile(r"^(Subject|Issuer|Not valid after):\s+(.+?)\s*$", re.MULTILINE)
+
+def parse_sslscan(output):
+    """Protocoles, suites et certificat cités dans la sortie de sslscan"""
+    output = ANSI_RE.sub("", output)
+    certificate = {name: value for name, value in SSLSCAN_CERT_RE.findall(output)}
+    return {
+        'protocols': {name: state == "enabled" for name, state in SSLSCAN_PROTOCOL_RE.findall(output)},
+        'ciphers': [{'protocol': protocol, 'bits': int(bits), 'name': name}
+                    for protocol, bits, name in SSLSCAN_CIPHER_RE.findall(output)],
+        'subject': certificate.get("Subject"),
+        'issuer': certificate.get("Issuer"),
+        'not_after': certificate.get("Not valid after"),
+    }
+
+def scan_ssl(ip, port_number, fingerprint=None):
+    """Scan SSL sur le port spécifié"""
+    write_output(f"\n###*** SCAN SSL (Port {port_number}) ***###", Colors.MAGENTA + Colors.BOLD)
+    write_output(f"Exécution de sslscan sur {ip}:{port_number}", Colors.YELLOW)
+    
+    if if_installed("sslscan"):
+        try:
+            stdout, stderr, returncode = run_command_with_progress(
+                ["sslscan", f"{ip}:{port_number}"],
+                f"Scan SSL {ip}:{port_number}",
+                target=f"{ip}:{port_number}"
+            )
+            emit("tls", ip=ip, port=int(port_number), fingerprint=fingerprint, **parse_sslscan(stdout))
+        
+        except (CancelledError, KeyboardInterrupt):
+            raise
+        except Exception as e:
+            write_output(f"Erreur lors de l'exécution de sslscan: {e}", Colors.RED)
+            tool_failed(f"sslscan : {e}")
+    else:
+        write_output("sslscan n'est pas installé", Colors.RED)
+
+def parse_nmap_host(host):
+    """Convertir un élément <host> du XML nmap en (ip, noms d'hôte, [PortRecord])
+
+    Seuls les champs utilisés par les étapes et le rapport sont gardés.
+    """
+    ip = None
+    for address in host.findall("address"):
+        if address.get("addrtype") in ("ipv4", "ipv6"):
+            ip = address.get("addr")
+            break
+    
+    hostnames = [name.get("name") for name in host.findall("hostnames/hostname") if name.get("name")]
+    ports = []
+    for port in host.findall("ports/port"):
+        state = port.find("state")
+        service = port.find("service")
+        if service is None:
+            service = {}
+        ports.append(PortRecord(ip, port.get("portid"), port.get("protocol"),
+                                state.get("state") if state is not None else None, service.get("name"),
+                                service.get("product"), service.get("version"), service.get("tunnel")))
+    return ip, hostnames, ports
+
+# Ligne de la sortie verbeuse de nmap annonçant un port ouvert
+DISCOVERED_PORT_RE = re.compile(r"Discovered open port (\d+)/(\w+) on (\S+)")
+# Statistiques périodiques de nmap (--stats-every)
+NMAP_STATS_RE = re.compile(r"Stats: \S+ elapsed; (\d+) hosts completed \((\d+) up\), (\d+) undergoing (.+)")
+NMAP_TIMING_RE = re.compile(r"(.+) Timing: About ([\d.]+)% done(?:; ETC: \S+ \((\S+) remaining\))?")
+
+def stream_nmap(target, on_port=None, on_host=None, args=("-sV",), on_stats=None):
+    """Scan Nmap (détection de versions par défaut) lu au fil de l'eau
+
+    nmap écrit son XML dans un fichier temporaire, relu et analysé de façon
+    incrémentale pendant le scan, et annonce les ports ouverts sur sa sortie
+    verbeuse dès leur découverte (avant la détection de versions).
+
+    Args:
+        target: Cible à scanner
+        on_port: Appelée avec (ip, port, protocole) pour chaque port ouvert découvert
+        on_host: Appelée avec (ip, noms d'hôte, [PortRecord]) pour chaque hôte terminé
+        args: Options de scan nmap
+        on_stats: Appelée avec un dict (hosts_done, hosts_up, phase, percent,
+            eta) à chaque statistique publiée par nmap
+
+    Si le délai (commande ou budget de l'étape) est dépassé, nmap est tué et
+    les hôtes terminés jusque-là sont renvoyés : l'étape est marquée partielle.
+
+    Returns:
+        PortStore: ports de tous les hôtes terminés
+    """
+    import xml.etree.ElementTree as ET  # Chargé au premier scan nmap (absent des exécutions en cache)
+    
+    scanner = current_scanner()
+    result = PortStore()
+    stats = {}
+    parser = ET.XMLPullParser(events=("end",))
+    xml_fd, xml_path = tempfile.mkstemp(prefix="reconreport_", suffix=".xml")
+    os.close(xml_fd)
+    
+    def feed_xml(xml_file):
+        """Analyser les nouveaux octets du XML et signaler les hôtes terminés"""
+        chunk = xml_file.read()
+        if not chunk:
+            return
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if elem.tag != "host":
+                continue
+            ip, hostnames, ports = parse_nmap_host(elem)
+            elem.clear()
+            if ip is None:
+                continue
+            result.add_host(ip, hostnames)
+            for port in ports:
+                result.add(port)
+            if on_host:
+                on_host(ip, hostnames, ports)
+    
+    stream = None
+    timeout = command_timeout(scanner.command_timeout)
+    try:
+        with open(xml_path, 'rb') as xml_file:
+            stream = get_engine().stream(
+                ["nmap", *args, "-v", "--stats-every", "5s", "-oX", xml_path, target],
+                timeout=timeout, keep=scanner.output_memory
+            )
+            # Chaque ligne de nmap (découvertes, statistiques, fin d'hôte) est
+            # l'occasion de relire le XML
+            for line in stream:
+                match = DISCOVERED_PORT_RE.search(line)
+                if match and on_port:
+                    on_port(match.group(3), match.group(1), match.group(2))
+                elif on_stats:
+                    parse_nmap_stats(line, stats, on_stats)
+                feed_xml(xml_file)
+            command_result = stream.result()
+            record_command("nmap", command_result)
+            feed_xml(xml_file)
+            
+            if command_result.timed_out:
+                cut_short(f"nmap interrompu après {timeout:.0f}s ({len(result.hostnames)} hôtes terminés)")
+            elif command_result.returncode != 0:
+                raise RuntimeError(f"nmap a échoué ({command_result.returncode}) : "
+                                   f"{command_result.stderr.strip()}")
+    finally:
+        # Arrêter nmap si la lecture a été interrompue (erreur dans un callback)
+        if stream is not None:
+            stream.cancel()
+        os.unlink(xml_path)
+    
+    return result
+
+def parse_nmap_stats(line, stats, on_stats):
+    """Mettre à jour les statistiques de nmap à partir d'une ligne de sa sortie
+
+    nmap publie deux lignes : le nombre d'hôtes terminés et la phase en
+    cours (« Stats: »), puis l'avancement de cette phase (« Timing: »).
+    """
+    match = NMAP_STATS_RE.search(line)
+    if match:
+        stats.update(hosts_done=int(match.group(1)), hosts_up=int(match.group(2)),
+                     phase=match.group(4).strip())
+        return
+    match = NMAP_TIMING_RE.search(line)
+    if match:
+        stats.update(phase=match.group(1).strip(), percent=float(match.group(2)), eta=match.group(3))
+        on_stats(dict(stats))
+
+def write_host_ports(ip, hostnames, ports):
+    """Enregistrer les ports (PortRecord) d'un hôte (rendus dans le rapport)"""
+    emit("host", ip=ip, hostnames=list(hostnames))
+    for port in ports:
+        emit("port", ip=ip, port=int(port.port), protocol=port.protocol, state=port.state, service=port.service,
+             product=port.product, version=port.version, tunnel=port.tunnel)
+
+def web_origin(url):
+    """(schéma, hôte, port) d'une URL, port par défaut du schéma compris"""
+    try:
+        parts = urllib.parse.urlsplit(url)
+        return parts.scheme, (parts.hostname or "").lower(), parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        return None
+
+class WhatwebSplitter:
+    """Sink qui répartit la sortie d'un whatweb à plusieurs URLs par service
+
+    Chaque ligne est rattachée à l'URL par laquelle elle commence : une URL
+    demandée, ou la cible d'une redirection (RedirectLocation) suivie par
+    whatweb, rattachée à l'URL qui a redirigé. Les autres lignes vont à l'URL
+    demandée de même origine, ou dans others (autre hôte).
+
+    Les lignes de chaque URL vont dans sa section (tampon qui passe sur
+    disque au-delà de max_size caractères) ; seules les sorties d'URL qui
+    tiennent dans max_size sont aussi gardées en texte pour le cache
+    (head), les autres sont dans truncated.
+    """
+    
+    URL_RE = re.compile(r"https?://\S+")
+    REDIRECT_RE = re.compile(r"RedirectLocation\[([^\]]+)\]")
+    
+    def __init__(self, urls, max_size=OUTPUT_MEMORY):
+        self.max_size = max_size
+        self.sections = {url: Section(max_size) for url in urls}
+        self.others = Section(max_size)
+        self.other_lines = 0
+        self.head = {url: [] for url in urls}  # {URL: lignes}, tant que la sortie tient dans max_size
+        self.truncated = set()
+        self._sizes = dict.fromkeys(urls, 0)
+        self._owners = {url.rstrip("/"): url for url in urls}  # {URL affichée par whatweb: URL demandée}
+        self._origins = {web_origin(url): url for url in urls}
+        self._pending = ""
+    
+    def _route(self, line):
+        text = ANSI_RE.sub("", line)
+        match = self.URL_RE.match(text) or self.URL_RE.search(text)
+        url = None
+        if match:
+            url = self._owners.get(match.group(0).rstrip("/")) or self._origins.get(web_origin(match.group(0)))
+        if url is None:
+            self.others.write_raw(line + "\n")
+            self.other_lines += 1
+            return
+        self.sections[url].write_raw(line + "\n")
+        if url not in self.truncated:
+            self._sizes[url] += len(line) + 1
+            if self._sizes[url] > self.max_size:
+                self.truncated.add(url)
+                self.head[url] = []
+            else:
+                self.head[url].append(line)
+        if match.start() == 0:
+            for location in self.REDIRECT_RE.findall(text):
+                target = urllib.parse.urljoin(match.group(0), location).rstrip("/")
+                self._owners.setdefault(target, url)
+    
+    def write_raw(self, text):
+        *lines, self._pending = (self._pending + text).split("\n")
+        for line in lines:
+            if line:
+                self._route(line)
+    
+    def close(self):
+        if self._pending:
+            self._route(self._pending)
+            self._pending = ""
+
+def scan_whatweb(urls):
+    """Scan WhatWeb d'un lot d'URLs
+
+    Un seul processus whatweb (--input-file) pour tout le lot : le démarrage
+    de Ruby n'est payé qu'une fois. La sortie est répartie par URL et chaque
+    URL garde sa propre entrée de cache (sauf si sa sortie dépasse
+    output_memory : elle n'est alors qu'écrite dans le rapport).
+    """
+    if not if_installed("whatweb"):
+        write_output(f"\nPas d'exécution de whatweb sur {', '.join(urls)} (non installé)", Colors.YELLOW)
+        return
+    
+    scanner = current_scanner()
+    cache = scanner.cache
+    outputs = {}
+    for url in urls:
+        cached = cache.get("whatweb", ["--color=never", url], url) if cache is not None else None
+        if cached is not None:
+            scanner.progress.finish(scanner.progress.start(f"Scan WhatWeb {url}"), "cache")
+            record_command("whatweb")
+            outputs[url] = cached['stdout']
+    
+    missing = [url for url in urls if url not in outputs]
+    others = None
+    if missing:
+        splitter = WhatwebSplitter(missing, scanner.output_memory)
+        try:
+            with tempfile.NamedTemporaryFile('w', prefix="whatweb_", suffix=".txt") as url_file:
+                url_file.write("\n".join(missing) + "\n")
+                url_file.flush()
+                desc = f"Scan WhatWeb {missing[0]}" + (f" (+{len(missing) - 1} URLs)" if len(missing) > 1 else "")
+                result = _run_command_with_progress(
+                    ["whatweb", "--color=never", f"--input-file={url_file.name}"], desc, splitter)
+            splitter.close()
+            for url in missing:
+                outputs[url] = splitter.sections[url]
+                if cache is not None and result.ok and url not in splitter.truncated:
+                    cache.put("whatweb", ["--color=never", url], url,
+                              {'stdout': "\n".join(splitter.head[url]), 'stderr': "", 'returncode': 0})
+            if splitter.other_lines:
+                others = splitter.others
+        except (CancelledError, KeyboardInterrupt):
+            raise
+        except Exception as e:
+            write_output(f"Erreur lors de l'exécution de whatweb: {e}", Colors.RED)
+            tool_failed(f"whatweb : {e}")
+    
+    for url in urls:
+        if url in outputs:
+            write_output(f"\n###*** SCAN WHATWEB ({url}) ***###", Colors.MAGENTA + Colors.BOLD)
+            write_whatweb(outputs[url])
+    if others is not None:
+        write_output(f"\n###*** SCAN WHATWEB (autres hôtes) ***###", Colors.MAGENTA + Colors.BOLD)
+        write_whatweb(others)
+
+def write_whatweb(output):
+    """Recopier une sortie de whatweb (texte du cache ou Section) dans le rapport, empreintes comprises
+
+    Les empreintes sont relevées bloc par bloc pendant la copie : une sortie
+    passée sur disque n'est pas rechargée en mémoire.
+    """
+    def on_lines(block):
+        for fingerprint in parse_whatweb(block):
+            emit("web", **fingerprint)
+    
+    tee = LineTee(current_sink(), on_lines)
+    if isinstance(output, Section):
+        output.copy_to(tee)
+    else:
+        tee.write_raw(output + "\n")
+    tee.close()
+
+# Ligne de whatweb : "URL [statut] Plugin[valeur], Plugin, ..."
+WHATWEB_LINE_RE = re.compile(r"^(\S+) \[(\d{3})[^\]]*\]\s*(.*)$", re.MULTILINE)
+WHATWEB_PLUGIN_RE = re.compile(r"\s*([^,\[\]]+?)((?:\[[^\]]*\])*)\s*(?:,|$)")
+
+def parse_whatweb(output):
+    """Empreintes web de la sortie de whatweb : une par URL visitée (redirections comprises)"""
+    fingerprints = []
+    for url, status, plugins_text in WHATWEB_LINE_RE.findall(ANSI_RE.sub("", output)):
+        plugins = {}
+        for match in WHATWEB_PLUGIN_RE.finditer(plugins_text):
+            if match.group(1):
+                plugins[match.group(1)] = re.findall(r"\[([^\]]*)\]", match.group(2))
+        title = plugins.get("Title")
+        fingerprints.append({'url': url, 'status': int(status), 'title': title[0] if title else None,
+                             'plugins': plugins})
+    return fingerprints
+
+def parse_amass_subdomains(output, domain):
+    """Sous-domaines de domain cités dans la sortie d'amass (triés, sans doublon)"""
+    output = output.lower()
+    domain = domain.lower()
+    if domain not in output:
+        return []
+    pattern = re.compile(r"(?<![a-z0-9_.-])(?:[a-z0-9_-]+\.)+" + re.escape(domain) + r"(?![a-z0-9_-])")
+    return sorted({match.group(0) for match in pattern.finditer(output)})
+
+def scan_amass_domain(target):
+    """Scan Amass avec barre de progression
+
+    Returns:
+        list: sous-domaines découverts
+    """
+    subdomains = set()
+    if if_installed("amass"):
+        write_output(f"\n###*** SCAN AMASS ***###", Colors.MAGENTA + Colors.BOLD)
+        
+        try:
+            cmd = ["amass", "enum", "-max-depth", "2", "-timeout", "1", "-d", target]
+            # Les sous-domaines sont relevés ligne par ligne pendant que la
+            # sortie part dans le rapport
+            tee = LineTee(current_sink(), lambda lines: subdomains.update(parse_amass_subdomains(lines, target)))
+            stdout, stderr, returncode = run_command_with_progress(
+                cmd,
+                f"Scan Amass {target}",
+                target=target,
+                sink=tee
+            )
+            tee.close()
+        
+        except (CancelledError, KeyboardInterrupt):
+            raise
+        except Exception as e:
+            write_output(f"Erreur lors de l'exécution de amass: {e}", Colors.RED)
+            tool_failed(f"amass : {e}")
+    else:
+        write_output(f"\nPas d'exécution de amass (non installé)", Colors.YELLOW)
+    for name in sorted(subdomains):
+        emit("subdomain", name=name)
+    return sorted(subdomains)
@@ -0,0 +1,5 @@
+"""Configuration des tests de Recon Report : le paquet est importé depuis ce dépôt"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+"""Tests du cache des résultats d'outils : clés, durée de validité et éviction LRU"""
+import json
+import types
+import zlib
+
+import pytest
+
+from reconreport import cache as cache_module
+from reconreport.cache import ResultCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge du cache réglée par le test (now[0], en secondes)"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+@pytest.fixture
+def cache(tmp_path):
+    result_cache = ResultCache(str(tmp_path / "cache.sqlite"), ttl={'nmap': 60})
+    yield result_cache
+    result_cache.close()
+
+def blob_size(value):
+    return len(zlib.compress(json.dumps(value).encode('utf-8')))
+
+def test_key_normalization(cache, clock):
+    cache.put("nmap", ["-sV", " -p ", "22"], "Example.COM ", {'stdout': "ok"})
+    assert cache.get("nmap", ["-sV", "", "-p", "22"], "example.com") == {'stdout': "ok"}
+    assert cache.get("nmap", ["-sV", "-p", "80"], "example.com") is None
+    assert cache.get("sslscan", ["-sV", "-p", "22"], "example.com") is None
+
+def test_ttl_expiry(cache, clock):
+    cache.put("nmap", ["-sV"], "example.com", {'stdout': "nmap"})
+    cache.put("whatweb", [], "http://example.com", {'stdout': "whatweb"})
+    clock[0] += 59
+    assert cache.get("nmap", ["-sV"], "example.com") == {'stdout': "nmap"}
+    clock[0] += 2
+    # Durée de l'outil (60s) dépassée ; celle de whatweb (CACHE_TTL) ne l'est pas
+    assert cache.get("nmap", ["-sV"], "example.com") is None
+    assert cache.get("whatweb", [], "http://example.com") == {'stdout': "whatweb"}
+    # Entrée expirée supprimée : elle ne revient pas si l'horloge recule
+    clock[0] -= 30
+    assert cache.get("nmap", ["-sV"], "example.com") is None
+
+def test_lru_eviction(cache, clock):
+    values = {name: {'stdout': name * 10} for name in ("a", "b", "c")}
+    cache.max_size = 2 * blob_size(values["a"])
+    cache.put("nmap", [], "a", values["a"])
+    clock[0] += 1
+    cache.put("nmap", [], "b", values["b"])
+    clock[0] += 1
+    # a est lue après l'écriture de b : b devient la moins récemment utilisée
+    assert cache.get("nmap", [], "a") == values["a"]
+    clock[0] += 1
+    cache.put("nmap", [], "c", values["c"])
+    assert cache.get("nmap", [], "b") is None
+    assert cache.get("nmap", [], "a") == values["a"]
+    assert cache.get("nmap", [], "c") == values["c"]
+
+def test_refresh_ignores_entries(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    with_entry = ResultCache(path)
+    with_entry.put("nmap", [], "example.com", {'stdout': "ancien"})
+    with_entry.close()
+    refreshed = ResultCache(path, refresh=True)
+    assert refreshed.get("nmap", [], "example.com") is None
+    refreshed.put("nmap", [], "example.com", {'stdout': "nouveau"})
+    refreshed.close()
+    reopened = ResultCache(path)
+    assert reopened.get("nmap", [], "example.com") == {'stdout': "nouveau"}
+    reopened.close()
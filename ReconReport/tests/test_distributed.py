@@ -0,0 +1,75 @@
+"""Tests de la file de tâches partagée : baux, expiration et tentatives"""
+import types
+
+import pytest
+
+from reconreport import distributed
+from reconreport.distributed import TaskQueue
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge de la file réglée par le test (now[0], en secondes)"""
+    now = [1000.0]
+    monkeypatch.setattr(distributed, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+@pytest.fixture
+def task_queue(tmp_path, clock):
+    return TaskQueue(str(tmp_path / "queue.sqlite"), lease_time=10)
+
+def test_lease_is_exclusive(task_queue):
+    task_queue.add("example.com", [["nmap"], ["amass"]])
+    first = task_queue.lease("w1")
+    second = task_queue.lease("w2")
+    assert (first['target'], first['stages'], first['attempt']) == ("example.com", ["nmap"], 1)
+    assert second['stages'] == ["amass"]
+    assert task_queue.lease("w3") is None
+
+def test_expired_lease_is_taken_over(task_queue, clock):
+    task_queue.add("example.com", [["nmap"]])
+    lost = task_queue.lease("w1")
+    clock[0] += 9
+    assert task_queue.lease("w2") is None
+    clock[0] += 2
+    retry = task_queue.lease("w2")
+    assert retry['id'] == lost['id'] and retry['attempt'] == 2
+    # Le worker qui a perdu son bail ne peut plus rien écrire
+    assert not task_queue.append_output(lost, 0, text="sortie périmée")
+    assert not task_queue.heartbeat(lost)
+    assert not task_queue.complete(lost, {'open_ports': 1})
+    assert task_queue.complete(retry, {'open_ports': 2})
+    collected = task_queue.collect()
+    assert [(task['state'], task['result']) for task in collected] == [("done", {'open_ports': 2})]
+
+def test_heartbeat_extends_lease(task_queue, clock):
+    task_queue.add("example.com", [["nmap"]])
+    task = task_queue.lease("w1")
+    clock[0] += 8
+    assert task_queue.heartbeat(task)
+    clock[0] += 8
+    assert task_queue.lease("w2") is None
+    clock[0] += 3
+    assert task_queue.lease("w2")['attempt'] == 2
+
+def test_expiry_at_last_attempt_fails_task(task_queue, clock):
+    task_queue.add("example.com", [["nmap"]], max_attempts=1)
+    task_queue.lease("w1")
+    clock[0] += 11
+    assert task_queue.lease("w2") is None
+    [task] = task_queue.collect()
+    assert task['state'] == "failed"
+    assert "bail expiré" in task['error']
+
+def test_fail_requeues_until_attempts_exhausted(task_queue):
+    task_queue.add("example.com", [["nmap"]], max_attempts=2)
+    assert task_queue.fail(task_queue.lease("w1"), "nmap a échoué")
+    assert task_queue.collect() == []
+    assert task_queue.fail(task_queue.lease("w1"), "nmap a échoué")
+    assert task_queue.lease("w1") is None
+    [task] = task_queue.collect()
+    assert (task['state'], task['error']) == ("failed", "nmap a échoué")
+
+def test_release_does_not_count_attempt(task_queue):
+    task_queue.add("example.com", [["nmap"]], max_attempts=1)
+    assert task_queue.release(task_queue.lease("w1"))
+    assert task_queue.lease("w2")['attempt'] == 1
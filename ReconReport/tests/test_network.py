@@ -0,0 +1,84 @@
+"""Tests du pré-balayage TCP contre des ports en écoute sur 127.0.0.1"""
+import socket
+import asyncio
+
+import pytest
+
+from reconreport.network import tcp_connect_scan, parse_port_spec
+
+@pytest.fixture
+def listeners():
+    """Trois ports en écoute et un port fermé (ouvert puis libéré)"""
+    servers = [socket.create_server(("127.0.0.1", 0)) for _ in range(3)]
+    closed = socket.create_server(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+    yield sorted(server.getsockname()[1] for server in servers), closed_port
+    for server in servers:
+        server.close()
+
+def test_sweep_finds_listeners(listeners):
+    open_ports, closed_port = listeners
+    announced = []
+    found = asyncio.run(tcp_connect_scan("127.0.0.1", open_ports + [closed_port], announced.append, concurrency=2))
+    assert found == open_ports
+    assert sorted(announced) == open_ports
+
+def test_sweep_shared_limit_bounds_sockets(listeners, monkeypatch):
+    open_ports, closed_port = listeners
+    real_socket = socket.socket
+    live = {'now': 0, 'max': 0}
+    
+    class CountedSocket(real_socket):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            live['now'] += 1
+            live['max'] = max(live['max'], live['now'])
+        
+        def close(self):
+            if self.fileno() != -1:
+                live['now'] -= 1
+            super().close()
+    
+    ports = (open_ports + [closed_port]) * 20
+    
+    async def sweep_all():
+        # Remplacé une fois la boucle créée : ses propres sockets ne comptent pas
+        monkeypatch.setattr(socket, "socket", CountedSocket)
+        # Plusieurs cibles et beaucoup de workers, un seul sémaphore partagé
+        limit = asyncio.Semaphore(3)
+        return await asyncio.gather(*(tcp_connect_scan("127.0.0.1", ports, concurrency=50, limit=limit)
+                                      for _ in range(4)))
+    
+    assert all(sorted(set(found)) == open_ports for found in asyncio.run(sweep_all()))
+    assert live['max'] <= 3
+    assert live['now'] == 0
+
+def test_sweep_socket_error_is_per_port(listeners, monkeypatch):
+    open_ports, _ = listeners
+    real_socket = socket.socket
+    calls = []
+    
+    def failing_socket(*args, **kwargs):
+        # Un descripteur sur deux manque : les autres ports sont quand même testés
+        calls.append(None)
+        if len(calls) % 2:
+            raise OSError(24, "Too many open files")
+        return real_socket(*args, **kwargs)
+    
+    errors = []
+    
+    async def sweep():
+        monkeypatch.setattr(socket, "socket", failing_socket)
+        return await tcp_connect_scan("127.0.0.1", open_ports * 2, concurrency=1,
+                                      on_error=lambda port, error: errors.append(port))
+    
+    found = asyncio.run(sweep())
+    assert found == open_ports
+    assert sorted(errors) == open_ports
+
+def test_parse_port_spec():
+    assert parse_port_spec("22,80,8000-8002") == [22, 80, 8000, 8001, 8002]
+    assert len(parse_port_spec("top:10")) == 10
+    with pytest.raises(ValueError):
+        parse_port_spec("0-10")
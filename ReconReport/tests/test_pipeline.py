@@ -0,0 +1,127 @@
+"""Tests de l'ordonnanceur d'étapes (depends, consumes, interruption) et de l'état des cibles"""
+import json
+import queue
+import threading
+import time
+
+import pytest
+
+from reconreport import engine
+from reconreport.output import Report, ReportSink, write_output
+from reconreport.pipeline import Stage, StageScheduler, load_state, save_state, state_path
+from reconreport.ports import PortStore
+from reconreport.scanner import ReconScanner
+
+class TextSink(ReportSink):
+    """Sortie qui garde le texte des rapports"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, report, text):
+        self.chunks.append(text)
+    
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+@pytest.fixture
+def sink():
+    """Scanner actif et rapport de la cible courante ; la sortie du rapport est renvoyée"""
+    sink = TextSink()
+    with ReconScanner(report_sink=sink) as scanner:
+        report = Report("example.com", sink).open()
+        with scanner.active(report):
+            yield sink
+        report.close()
+
+def test_depends_waits_for_completion(sink):
+    events = []
+    
+    def slow(ctx):
+        time.sleep(0.2)
+        events.append("a")
+        write_output("section A")
+    
+    def after_a(ctx):
+        events.append("b")
+        write_output("section B")
+    
+    def independent(ctx):
+        events.append("c")
+        write_output("section C")
+    
+    stages = [Stage("a", slow), Stage("b", after_a, depends=["a"]), Stage("c", independent)]
+    errors = StageScheduler(stages, max_workers=3).run({})
+    assert errors == {}
+    # c n'attend pas a ; b attend la fin de a
+    assert events == ["c", "a", "b"]
+    # Sections restituées dans l'ordre de déclaration, pas de fin
+    text = sink.text
+    assert text.index("section A") < text.index("section B") < text.index("section C")
+
+def test_consumes_starts_with_producer(sink):
+    ctx = {'queue': queue.Queue()}
+    received = threading.Event()
+    
+    def producer(ctx):
+        ctx['queue'].put("premier")
+        # Le consommateur doit tourner pendant que le producteur est encore en cours
+        assert received.wait(5), "consommateur non démarré avant la fin du producteur"
+        ctx['queue'].put(None)
+    
+    def consumer(ctx):
+        items = []
+        for item in iter(ctx['queue'].get, None):
+            items.append(item)
+            received.set()
+        ctx['items'] = items
+    
+    stages = [Stage("producer", producer), Stage("consumer", consumer, consumes=["producer"])]
+    assert StageScheduler(stages, max_workers=2).run(ctx) == {}
+    assert ctx['items'] == ["premier"]
+
+def test_failed_dependency_skips_stage(sink):
+    ran = []
+    
+    def failing(ctx):
+        raise OSError("outil introuvable")
+    
+    stages = [Stage("a", failing), Stage("b", lambda ctx: ran.append("b"), depends=["a"]),
+              Stage("c", lambda ctx: ran.append("c"), consumes=["b"])]
+    errors = StageScheduler(stages).run({})
+    assert ran == []
+    assert set(errors) == {"a", "b", "c"}
+    assert "dépendance en échec : a" in str(errors["b"])
+    assert "Erreur lors de l'étape a: outil introuvable" in sink.text
+
+def test_invalid_dependency():
+    with pytest.raises(ValueError):
+        StageScheduler([Stage("a", lambda ctx: None, depends=["b"]), Stage("b", lambda ctx: None)])
+
+def test_interrupted_run_launches_no_more_stages(sink, monkeypatch):
+    # Le drapeau d'interruption du moteur est rétabli après le test
+    monkeypatch.setattr(engine, "_stopped", False)
+    ran = []
+    
+    def interrupted(ctx):
+        ran.append("a")
+        engine.stop_engine()  # Comme un Ctrl-C pendant l'étape
+    
+    stages = [Stage("a", interrupted), Stage("b", lambda ctx: ran.append("b"), depends=["a"]),
+              Stage("c", lambda ctx: ran.append("c"), depends=["a"])]
+    errors = StageScheduler(stages, max_workers=1).run({})
+    assert ran == ["a"]
+    assert str(errors["a"]) == "étape interrompue"
+    assert str(errors["b"]) == str(errors["c"]) == "exécution interrompue"
+    assert "Étape b non lancée (exécution interrompue)" in sink.text
+
+def test_save_state_keeps_subdomains_without_amass(tmp_path):
+    result = PortStore.from_dict({"127.0.0.1": {"hostname": [], "ports": []}})
+    save_state(str(tmp_path), "example.com", {'result': result, 'subdomains': ["www.example.com"]})
+    # Scan suivant sans amass : les sous-domaines connus sont gardés
+    save_state(str(tmp_path), "example.com", {'result': result})
+    assert load_state(str(tmp_path), "example.com")['subdomains'] == ["www.example.com"]
+    save_state(str(tmp_path), "example.com", {'result': result, 'subdomains': []})
+    with open(state_path(str(tmp_path), "example.com"), encoding='utf-8') as f:
+        assert json.load(f)['subdomains'] == []
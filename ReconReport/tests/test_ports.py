@@ -0,0 +1,57 @@
+"""Tests des ports relevés par nmap : PortRecord et index de PortStore"""
+from reconreport.ports import PortRecord, PortStore
+
+NMAP_RESULT = {
+    "10.0.0.1": {"hostname": [{"name": "www.example.com"}], "ports": [
+        {"protocol": "tcp", "portid": "22", "state": "open", "service": {"name": "ssh", "product": "OpenSSH"}},
+        {"protocol": "tcp", "portid": "443", "state": "open", "service": {"name": "http", "tunnel": "ssl"}},
+        {"protocol": "tcp", "portid": "25", "state": "filtered", "service": {"name": "smtp"}},
+    ]},
+    "10.0.0.2": {"hostname": [], "ports": [
+        {"protocol": "tcp", "portid": "8080", "state": "open", "service": {"name": "http-proxy"}},
+    ]},
+    "runtime": {"elapsed": "1.0"},
+}
+
+def test_state_index():
+    store = PortStore.from_dict(NMAP_RESULT)
+    assert len(store) == 4
+    assert store.open_count() == 3
+    assert sorted(store.with_state("open")) == [("10.0.0.1", "22"), ("10.0.0.1", "443"), ("10.0.0.2", "8080")]
+    assert list(store.with_state("filtered")) == [("10.0.0.1", "25")]
+    assert store.with_state("closed") == {}
+
+def test_replaced_port_leaves_old_state():
+    store = PortStore()
+    store.add(PortRecord("10.0.0.1", 80))
+    # Détection de versions : même port, nouvel état et service
+    store.add(PortRecord("10.0.0.1", "80", state="closed", service="http"))
+    assert len(store) == 1
+    assert store.with_state("open") == {}
+    assert store.get("10.0.0.1", 80).service == "http"
+    assert [ip for ip, _ in store.hosts()] == ["10.0.0.1"]
+
+def test_hosts_and_round_trip():
+    store = PortStore.from_dict(NMAP_RESULT)
+    assert [(ip, [record.port for record in records]) for ip, records in store.hosts()] == \
+        [("10.0.0.1", ["22", "443", "25"]), ("10.0.0.2", ["8080"])]
+    assert store.hostnames["10.0.0.1"] == ["www.example.com"]
+    data = store.as_dict()
+    assert "runtime" not in data
+    again = PortStore.from_dict(data)
+    assert [record.as_json() for record in again] == [record.as_json() for record in store]
+
+def test_record_service_kinds():
+    store = PortStore.from_dict(NMAP_RESULT)
+    assert store.get("10.0.0.1", 443).is_tls
+    assert store.get("10.0.0.1", 443).is_web
+    assert not store.get("10.0.0.1", 22).is_tls
+    assert store.get("10.0.0.2", 8080).is_web
+    assert store.get("10.0.0.1", 22).label == "ssh OpenSSH"
+    assert PortRecord("10.0.0.1", 1).label == "Unknown"
+
+def test_record_from_old_followup_row():
+    record = PortRecord.from_json(["10.0.0.1", "993", {"name": "imaps", "product": "Dovecot"}])
+    assert record.key == ("10.0.0.1", "993")
+    assert record.is_tls and record.product == "Dovecot"
+    assert PortRecord.from_json(record.as_json()).as_json() == record.as_json()